@@ -1,16 +1,24 @@
 import os
+import sys
 import numpy as np
 import xarray as xr
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 from glob import glob
-from sklearn.mixture import GaussianMixture
-from sklearn.preprocessing import StandardScaler
+from model_selection import best_bics, gmm_sweep
+from persist import model_from_sweep, predict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from eof import pca_scores
+from paths import ROOT
 
 # === CONFIG === #
-PHASE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-SAVE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/clusters_fulltimeseries/"
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+SAVE_DIR = os.path.join(ROOT, "results/figures/clusters_fulltimeseries/")
+CACHE_DIR = os.path.join(ROOT, "results/cache/gmm/")
+MODEL_DIR = os.path.join(ROOT, "results/cluster_models/")
+N_PCS = None  # e.g. 8 to cluster on leading principal components instead of every year
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 # === LOAD STACKS === #
@@ -39,18 +47,17 @@ def prepare_combined_features(adv, ret):
     flat_ret = ret.transpose("year", "y", "x").values.reshape(len(ret.year), -1).T
     valid = np.all(np.isfinite(flat_adv), axis=1) & np.all(np.isfinite(flat_ret), axis=1)
     X_combined = np.concatenate([flat_adv[valid], flat_ret[valid]], axis=1)
+    if N_PCS:
+        X_combined, explained = pca_scores(X_combined, N_PCS)
+        print(f"🔹 {N_PCS} PCs explain {100 * explained.sum():.1f}% of the variance")
     return X_combined, valid
 
 X_comb, valid_comb = prepare_combined_features(advance, retreat)
 
 # === BIC PLOT FOR COMBINED === #
-def gmm_bic(X, feature_name):
-    bics = []
-    Ks = range(2, 12)
-    for k in Ks:
-        gmm = GaussianMixture(n_components=k, covariance_type='full', random_state=0)
-        gmm.fit(X)
-        bics.append(gmm.bic(X))
+def gmm_bic(sweep, feature_name):
+    Ks = sweep["ks"]
+    bics = best_bics(sweep)
 
     plt.figure(figsize=(6, 4))
     plt.plot(Ks, bics, marker='o')
@@ -65,13 +72,15 @@ def gmm_bic(X, feature_name):
     print(f"✅ Saved {outname}")
 
 # === CLUSTER + PLOT === #
-def cluster_and_plot(X, valid, base_data, feature_name, n_clusters=6):
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-
-    gmm = GaussianMixture(n_components=n_clusters, covariance_type='full', random_state=0)
-    gmm.fit(X_scaled)
-    labels = gmm.predict(X_scaled)
+def cluster_and_plot(sweep, X, valid, base_data, feature_name, n_clusters=6):
+    # Same fitted model (scaled features, best seed) that produced the BIC curve,
+    # persisted with labels ordered like the previous revision
+    if N_PCS:
+        columns = [f"pc{m + 1}" for m in range(N_PCS)]
+    else:
+        columns = [f"advance_{year}" for year in years] + [f"retreat_{year}" for year in years]
+    model = model_from_sweep(sweep, n_clusters, columns, MODEL_DIR, "gmm_combined_fulltimeseries")
+    labels = predict(model, X)
 
     label_map = np.full(base_data.shape[1] * base_data.shape[2], np.nan)
     label_map[valid] = labels
@@ -95,14 +104,14 @@ def cluster_and_plot(X, valid, base_data, feature_name, n_clusters=6):
     print(f"✅ Saved {outname}")
 
 # === RUN EVERYTHING === #
-print("🔹 Combined Advance + Retreat: BIC Selection")
-gmm_bic(X_comb, feature_name="Advance+Retreat")
+print("🔹 Combined Advance + Retreat: GMM sweep + BIC Selection")
+sweep_comb = gmm_sweep(X_comb, cache_dir=CACHE_DIR)
+gmm_bic(sweep_comb, feature_name="Advance+Retreat")
 
 # Set manually after BIC review
 n_clusters_combined = 6
 
 print("🔹 Clustering Combined Advance + Retreat...")
-cluster_and_plot(X_comb, valid_comb, advance, feature_name="Advance+Retreat", n_clusters=n_clusters_combined)
+cluster_and_plot(sweep_comb, X_comb, valid_comb, advance, feature_name="Advance+Retreat", n_clusters=n_clusters_combined)
 
 print("✅ GMM clustering complete for combined phase features.")
-
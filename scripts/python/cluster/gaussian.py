@@ -1,17 +1,25 @@
 import os
+import sys
 import numpy as np
 import xarray as xr
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 from glob import glob
-from sklearn.mixture import GaussianMixture
-from sklearn.preprocessing import StandardScaler
+from model_selection import best_bics, gmm_sweep
+from persist import model_from_sweep, predict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from eof import pca_scores
+from paths import ROOT
 from matplotlib.colors import BoundaryNorm
 
 # === CONFIG === #
-PHASE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-SAVE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/clusters_fulltimeseries/"
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+SAVE_DIR = os.path.join(ROOT, "results/figures/clusters_fulltimeseries/")
+CACHE_DIR = os.path.join(ROOT, "results/cache/gmm/")
+MODEL_DIR = os.path.join(ROOT, "results/cluster_models/")
+N_PCS = None  # e.g. 8 to cluster on leading principal components instead of every year
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 # === LOAD STACKS === #
@@ -38,19 +46,19 @@ retreat["year"] = years
 def prepare_features(data):
     flat = data.transpose("year", "y", "x").values.reshape(len(data.year), -1).T  # (pixels, years)
     valid = np.all(np.isfinite(flat), axis=1)
+    if N_PCS:
+        X, explained = pca_scores(flat[valid], N_PCS)
+        print(f"🔹 {N_PCS} PCs explain {100 * explained.sum():.1f}% of the variance")
+        return X, valid
     return flat[valid], valid
 
 X_adv, valid_adv = prepare_features(advance)
 X_ret, valid_ret = prepare_features(retreat)
 
 # === BIC-BASED CLUSTER SELECTION === #
-def gmm_bic(X, feature_name):
-    bics = []
-    Ks = range(2, 12)
-    for k in Ks:
-        gmm = GaussianMixture(n_components=k, covariance_type='full', random_state=0)
-        gmm.fit(X)
-        bics.append(gmm.bic(X))
+def gmm_bic(sweep, feature_name):
+    Ks = sweep["ks"]
+    bics = best_bics(sweep)
 
     plt.figure(figsize=(6, 4))
     plt.plot(Ks, bics, marker='o')
@@ -65,13 +73,15 @@ def gmm_bic(X, feature_name):
     print(f"✅ Saved {outname}")
 
 # === CLUSTERING + PLOTTING FUNCTION === #
-def cluster_and_plot(X, valid, base_data, feature_name, n_clusters):
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-
-    gmm = GaussianMixture(n_components=n_clusters, covariance_type='full', random_state=0)
-    gmm.fit(X_scaled)
-    labels = gmm.predict(X_scaled)
+def cluster_and_plot(sweep, X, valid, base_data, feature_name, n_clusters):
+    # Same fitted model (scaled features, best seed) that produced the BIC curve,
+    # persisted with labels ordered like the previous revision
+    if N_PCS:
+        columns = [f"{feature_name.lower()}_pc{m + 1}" for m in range(N_PCS)]
+    else:
+        columns = [f"{feature_name.lower()}_{year}" for year in years]
+    model = model_from_sweep(sweep, n_clusters, columns, MODEL_DIR, f"gmm_{feature_name.lower()}_fulltimeseries")
+    labels = predict(model, X)
 
     label_map = np.full(base_data.shape[1] * base_data.shape[2], np.nan)
     label_map[valid] = labels
@@ -103,20 +113,22 @@ def cluster_and_plot(X, valid, base_data, feature_name, n_clusters):
     print(f"✅ Saved {outname}")
 
 # === RUN EVERYTHING === #
-print("🔹 Advance: BIC Selection")
-gmm_bic(X_adv, feature_name="Advance")
+print("🔹 Advance: GMM sweep + BIC Selection")
+sweep_adv = gmm_sweep(X_adv, cache_dir=CACHE_DIR)
+gmm_bic(sweep_adv, feature_name="Advance")
 
-print("🔹 Retreat: BIC Selection")
-gmm_bic(X_ret, feature_name="Retreat")
+print("🔹 Retreat: GMM sweep + BIC Selection")
+sweep_ret = gmm_sweep(X_ret, cache_dir=CACHE_DIR)
+gmm_bic(sweep_ret, feature_name="Retreat")
 
 # Set manually after reviewing BIC plots
 n_clusters_adv = 6
 n_clusters_ret = 8
 
 print("🔹 Clustering Advance...")
-cluster_and_plot(X_adv, valid_adv, advance, feature_name="Advance", n_clusters=n_clusters_adv)
+cluster_and_plot(sweep_adv, X_adv, valid_adv, advance, feature_name="Advance", n_clusters=n_clusters_adv)
 
 print("🔹 Clustering Retreat...")
-cluster_and_plot(X_ret, valid_ret, retreat, feature_name="Retreat", n_clusters=n_clusters_ret)
+cluster_and_plot(sweep_ret, X_ret, valid_ret, retreat, feature_name="Retreat", n_clusters=n_clusters_ret)
 
 print("✅ GMM clustering complete for full time series.")
@@ -0,0 +1,180 @@
+import os
+import sys
+
+import numpy as np
+import xarray as xr
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
+from phase_io import phase_files, season_fields
+
+# Out-of-core clustering backend for large phase grids (e.g. AMSR 12.5 km).
+# Pixels are streamed from the per-season phase files in blocks of grid rows:
+#   pass 1  scaler statistics
+#   pass 2  mini-batch k-means on scaled batches + a uniform reservoir sample
+#   (fit)   full-covariance GMM on a k-means-stratified sample, seeded with the centres;
+#           mixing weights re-estimated on the uniform sample
+#   pass 3  labels for every pixel
+# Peak memory is one batch plus the sample, independent of the grid size.
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/AMSRE_phase/")
+OUT_FILE = os.path.join(ROOT, "results/clusters/phase_clusters_AMSRE_minibatch.nc")
+SENSOR = "AMSRE"
+FEATURES = ("advance", "retreat", "duration")
+N_CLUSTERS = 6
+BATCH_ROWS = 32
+SAMPLE_SIZE = 200_000
+MIN_PER_CLUSTER = 2_000
+STRATUM_FRACTION = 0.5  # share of each k-means stratum kept for the GMM fit
+SEED = 0
+
+DERIVED = ("advance", "retreat", "duration")
+
+
+# === PHASE CUBE READER === #
+class PhaseCubeReader:
+    # Features are per-season: the derived advance/retreat/duration fields, or any
+    # other per-season variable stored as <name>_<year> in the phase files.
+
+    def __init__(self, phase_dir, sensor="SMMR", features=FEATURES, year_start=None, year_end=None):
+        self.files = phase_files(phase_dir, sensor, year_start, year_end)
+        if not self.files:
+            raise RuntimeError(f"❌ No phase files found in {phase_dir}")
+        self.features = tuple(features)
+        self.years = [year for year, _ in self.files]
+        with xr.open_dataset(self.files[0][1]) as ds:
+            self.x = ds.x.values
+            self.y = ds.y.values
+        self.shape = (self.y.size, self.x.size)
+        self.columns = [f"{name}_{year}" for year in self.years for name in self.features]
+        # lazily opened handles; only the requested rows are ever read
+        self._datasets = [xr.open_dataset(path) for _, path in self.files]
+
+    def close(self):
+        for ds in self._datasets:
+            ds.close()
+
+    def read_rows(self, y0, y1):
+        # (pixels in rows y0:y1, n_features) matrix and its all-finite mask
+        cols = []
+        for year, ds in zip(self.years, self._datasets):
+            block = ds.isel(y=slice(y0, y1))
+            derived = None
+            if any(name in DERIVED for name in self.features):
+                derived = season_fields(block[f"advance_{year}"].load(), block[f"retreat_{year}"].load())
+            for name in self.features:
+                da = derived[name] if name in DERIVED else block[f"{name}_{year}"]
+                cols.append(np.asarray(da.values, dtype="float64").ravel())
+        X = np.stack(cols, axis=1)
+        valid = np.all(np.isfinite(X), axis=1)
+        return X, valid
+
+    def iter_batches(self, batch_rows=BATCH_ROWS):
+        for y0 in range(0, self.shape[0], batch_rows):
+            y1 = min(y0 + batch_rows, self.shape[0])
+            X, valid = self.read_rows(y0, y1)
+            yield y0, y1, X, valid
+
+
+# === STREAMING FIT === #
+def _reservoir_update(sample, keys, X_new, rng, size):
+    # Keep the rows with the smallest random keys seen so far (uniform sample)
+    new_keys = rng.random(len(X_new))
+    keys = np.concatenate([keys, new_keys])
+    sample = np.concatenate([sample, X_new]) if len(sample) else X_new
+    if len(keys) > size:
+        keep = np.argpartition(keys, size)[:size]
+        keys, sample = keys[keep], sample[keep]
+    return sample, keys
+
+
+def stratified_sample(sample, strata, n_clusters, min_per_cluster, rng):
+    # Proportional to cluster size, but with a floor so small clusters keep enough rows
+    # for a full-covariance estimate.
+    idx = []
+    for c in range(n_clusters):
+        members = np.flatnonzero(strata == c)
+        if members.size == 0:
+            continue
+        n = max(min_per_cluster, int(round(members.size * STRATUM_FRACTION)))
+        idx.append(rng.choice(members, size=min(n, members.size), replace=False))
+    return sample[np.concatenate(idx)]
+
+
+def fit_streaming(reader, n_clusters=N_CLUSTERS, batch_rows=BATCH_ROWS, sample_size=SAMPLE_SIZE,
+                  min_per_cluster=MIN_PER_CLUSTER, seed=SEED):
+    rng = np.random.default_rng(seed)
+
+    # --- pass 1: scaler --- #
+    scaler = StandardScaler()
+    for _, _, X, valid in reader.iter_batches(batch_rows):
+        if valid.any():
+            scaler.partial_fit(X[valid])
+
+    # --- pass 2: mini-batch k-means + reservoir sample --- #
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=seed, n_init=3)
+    sample = np.empty((0, len(reader.columns)))
+    keys = np.empty(0)
+    pending = np.empty((0, len(reader.columns)))
+    for _, _, X, valid in reader.iter_batches(batch_rows):
+        if not valid.any():
+            continue
+        Xs = scaler.transform(X[valid])
+        # partial_fit needs at least n_clusters rows; carry small batches over
+        pending = np.concatenate([pending, Xs])
+        if len(pending) >= 3 * n_clusters:
+            kmeans.partial_fit(pending)
+            pending = pending[:0]
+        sample, keys = _reservoir_update(sample, keys, Xs, rng, sample_size)
+    if len(pending):
+        kmeans.partial_fit(pending)
+
+    # --- GMM refinement on a stratified sample --- #
+    strata = kmeans.predict(sample)
+    X_fit = stratified_sample(sample, strata, n_clusters, min_per_cluster, rng)
+    gmm = GaussianMixture(n_components=n_clusters, covariance_type="full",
+                          means_init=kmeans.cluster_centers_, random_state=seed)
+    gmm.fit(X_fit)
+    # the floor in stratified_sample oversamples small clusters, so weights_ fitted on
+    # X_fit are inflated for them; the reservoir is uniform over all pixels
+    gmm.weights_ = gmm.predict_proba(sample).mean(axis=0)
+    return scaler, kmeans, gmm
+
+
+# === STREAMING PREDICT === #
+def predict_streaming(reader, scaler, gmm, batch_rows=BATCH_ROWS):
+    labels = np.full(reader.shape, np.nan, dtype="float32")
+    for y0, y1, X, valid in reader.iter_batches(batch_rows):
+        block = np.full(X.shape[0], np.nan, dtype="float32")
+        if valid.any():
+            block[valid] = gmm.predict(scaler.transform(X[valid]))
+        labels[y0:y1] = block.reshape(y1 - y0, -1)
+    return labels
+
+
+def save_labels(labels, reader, out_file, n_clusters):
+    out_ds = xr.Dataset(
+        {"cluster": (("y", "x"), labels)},
+        coords={"x": reader.x, "y": reader.y},
+        attrs={
+            "description": f"Mini-batch k-means + GMM phase clusters | k={n_clusters}",
+            "features": ",".join(reader.features),
+            "years": reader.years,
+        },
+    )
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+    out_ds.to_netcdf(out_file)
+    print(f"✅ Saved {out_file}")
+
+
+if __name__ == "__main__":
+    reader = PhaseCubeReader(PHASE_DIR, SENSOR, FEATURES)
+    print(f"🔹 {len(reader.years)} seasons × {len(FEATURES)} features on a {reader.shape} grid")
+    scaler, kmeans, gmm = fit_streaming(reader)
+    labels = predict_streaming(reader, scaler, gmm)
+    reader.close()
+    save_labels(labels, reader, OUT_FILE, N_CLUSTERS)
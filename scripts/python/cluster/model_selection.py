@@ -0,0 +1,112 @@
+import hashlib
+import os
+import sys
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed, parallel_config
+from sklearn.cluster import kmeans_plusplus
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
+
+# GMM model selection for the phase clusters. One sweep scales the features once,
+# draws a k-means++ initialisation per (k, seed), fits every candidate concurrently
+# and caches the result keyed by a hash of the feature matrix, so the BIC curve and
+# the final clustering come from the same fitted models.
+
+# === CONFIG === #
+CACHE_DIR = os.path.join(ROOT, "results/cache/gmm/")
+K_RANGE = range(2, 12)
+N_SEEDS = 3
+COVARIANCE_TYPE = "full"
+N_JOBS = -1  # all cores
+
+
+# === HASHING === #
+def feature_hash(X):
+    X = np.ascontiguousarray(X)
+    h = hashlib.sha1()
+    h.update(str((X.shape, X.dtype.str)).encode())
+    h.update(X.view(np.uint8).data)
+    return h.hexdigest()
+
+
+def sweep_key(X, ks, n_seeds, covariance_type):
+    params = f"{list(ks)}|{n_seeds}|{covariance_type}"
+    return f"{feature_hash(X)[:16]}_{hashlib.sha1(params.encode()).hexdigest()[:8]}"
+
+
+# === SINGLE FIT === #
+def _fit_candidate(X_scaled, k, seed, means_init, covariance_type):
+    gmm = GaussianMixture(n_components=k, covariance_type=covariance_type,
+                          means_init=means_init, random_state=seed)
+    gmm.fit(X_scaled)
+    return k, seed, gmm, gmm.bic(X_scaled)
+
+
+# === SWEEP === #
+def gmm_sweep(X, ks=K_RANGE, n_seeds=N_SEEDS, covariance_type=COVARIANCE_TYPE,
+              n_jobs=N_JOBS, cache_dir=CACHE_DIR):
+    ks = list(ks)
+    key = sweep_key(X, ks, n_seeds, covariance_type)
+    cache_file = os.path.join(cache_dir, f"gmm_sweep_{key}.joblib") if cache_dir else None
+    if cache_file and os.path.exists(cache_file):
+        print(f"✅ Loaded cached GMM sweep {key}")
+        return joblib.load(cache_file)
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Initial means are drawn once per (k, seed) on the scaled features and kept with
+    # the sweep, so any refit of a candidate starts from the same point.
+    inits = {}
+    for k in ks:
+        for seed in range(n_seeds):
+            inits[(k, seed)] = kmeans_plusplus(X_scaled, k, random_state=seed)[0]
+
+    # One BLAS thread per worker; the parallelism is across candidates
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_candidate)(X_scaled, k, seed, inits[(k, seed)], covariance_type)
+            for k in ks for seed in range(n_seeds)
+        )
+
+    bics = {k: np.full(n_seeds, np.nan) for k in ks}
+    fitted = {}
+    for k, seed, gmm, bic in results:
+        bics[k][seed] = bic
+        fitted[(k, seed)] = gmm
+    # keep the best seed per k
+    models = {k: fitted[(k, int(np.nanargmin(bics[k])))] for k in ks}
+
+    sweep = {
+        "key": key,
+        "ks": ks,
+        "scaler": scaler,
+        "models": models,
+        "bics": bics,
+        "inits": inits,
+        "n_samples": X.shape[0],
+    }
+    if cache_file:
+        os.makedirs(cache_dir, exist_ok=True)
+        joblib.dump(sweep, cache_file)
+        print(f"✅ Cached GMM sweep {key}")
+    return sweep
+
+
+# === READ-OUT === #
+def best_bics(sweep):
+    return np.array([np.nanmin(sweep["bics"][k]) for k in sweep["ks"]])
+
+
+def best_k(sweep):
+    return sweep["ks"][int(np.argmin(best_bics(sweep)))]
+
+
+def sweep_labels(sweep, X, k):
+    X_scaled = sweep["scaler"].transform(X)
+    return sweep["models"][k].predict(X_scaled)
@@ -0,0 +1,127 @@
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Versioned cluster-model artifacts. An artifact holds everything needed to label new
+# pixels without sklearn or EM: scaler mean/scale and the GMM weights, means,
+# covariances and Cholesky precisions, plus the feature columns they were fit on.
+# Files are written as <name>_v<NNN>.npz; each refit gets the next revision number.
+
+SCHEMA_VERSION = 1
+
+
+# === BUILD / ALIGN === #
+def model_from_fit(scaler, gmm, columns, **meta):
+    if gmm.covariance_type != "full":
+        raise ValueError("Only full-covariance GMMs can be persisted")
+    return {
+        "schema": SCHEMA_VERSION,
+        "columns": np.asarray(columns, dtype=str),
+        "scaler_mean": scaler.mean_.copy(),
+        "scaler_scale": scaler.scale_.copy(),
+        "weights": gmm.weights_.copy(),
+        "means": gmm.means_.copy(),
+        "covariances": gmm.covariances_.copy(),
+        "precisions_cholesky": gmm.precisions_cholesky_.copy(),
+        **{k: np.asarray(v) for k, v in meta.items()},
+    }
+
+
+def match_labels(means, ref_means):
+    # Permutation so that component order[i] of the new model plays the role of
+    # reference cluster i (Hungarian matching on squared distance between means).
+    # Components without a partner keep their relative order after the matched ones.
+    cost = ((means[:, None, :] - ref_means[None, :, :]) ** 2).sum(axis=2)
+    rows, cols = linear_sum_assignment(cost)
+    order = np.full(max(len(means), len(ref_means)), -1)
+    order[cols] = rows
+    order = order[order >= 0].tolist()
+    order += [i for i in range(len(means)) if i not in order]
+    return np.array(order)
+
+
+def reorder(model, order):
+    out = dict(model)
+    for key in ("weights", "means", "covariances", "precisions_cholesky"):
+        out[key] = model[key][order]
+    return out
+
+
+def feature_means(model):
+    # component means in original (unscaled) feature units, comparable across refits
+    return model["means"] * model["scaler_scale"] + model["scaler_mean"]
+
+
+def align_to(model, reference):
+    if reference is None:
+        return model
+    if list(model["columns"]) != list(reference["columns"]):
+        print("⚠️ Reference model uses different feature columns; label order not aligned")
+        return model
+    return reorder(model, match_labels(feature_means(model), feature_means(reference)))
+
+
+def model_from_sweep(sweep, k, columns, model_dir, name):
+    # Reuse the latest artifact if it came from this sweep and k; otherwise persist the
+    # sweep's model as a new revision, with labels ordered like the previous one.
+    latest = load_latest(model_dir, name)
+    if latest is not None and str(latest.get("sweep_key")) == sweep["key"] and len(latest["weights"]) == k:
+        return latest
+    model = model_from_fit(sweep["scaler"], sweep["models"][k], columns, sweep_key=sweep["key"])
+    model = align_to(model, latest)
+    save_model(model, model_dir, name)
+    return model
+
+
+# === PREDICT-ONLY === #
+def predict(model, X):
+    # Vectorised GMM assignment for all rows of X (n_pixels, n_features); no EM.
+    Xs = (np.asarray(X, dtype="float64") - model["scaler_mean"]) / model["scaler_scale"]
+    n_features = Xs.shape[1]
+    log_prob = np.empty((Xs.shape[0], len(model["weights"])))
+    for k, (mu, prec_chol) in enumerate(zip(model["means"], model["precisions_cholesky"])):
+        y = (Xs - mu) @ prec_chol
+        log_det = np.sum(np.log(np.diag(prec_chol)))
+        log_prob[:, k] = -0.5 * (n_features * np.log(2 * np.pi) + np.sum(y ** 2, axis=1)) + log_det
+    log_prob += np.log(model["weights"])
+    return np.argmax(log_prob, axis=1)
+
+
+# === ARTIFACT FILES === #
+def _revisions(model_dir, name):
+    pattern = re.compile(rf"^{re.escape(name)}_v(\d+)\.npz$")
+    revs = []
+    if os.path.isdir(model_dir):
+        for f in os.listdir(model_dir):
+            m = pattern.match(f)
+            if m:
+                revs.append(int(m.group(1)))
+    return sorted(revs)
+
+
+def save_model(model, model_dir, name):
+    os.makedirs(model_dir, exist_ok=True)
+    revs = _revisions(model_dir, name)
+    rev = revs[-1] + 1 if revs else 1
+    path = os.path.join(model_dir, f"{name}_v{rev:03d}.npz")
+    np.savez_compressed(path, revision=rev, created=datetime.now().isoformat(timespec="seconds"), **model)
+    print(f"✅ Saved cluster model {path}")
+    return path
+
+
+def load_model(path):
+    with np.load(path) as f:
+        model = {k: f[k] for k in f.files}
+    if int(model["schema"]) != SCHEMA_VERSION:
+        raise ValueError(f"{path}: schema {int(model['schema'])} != {SCHEMA_VERSION}")
+    return model
+
+
+def load_latest(model_dir, name):
+    revs = _revisions(model_dir, name)
+    if not revs:
+        return None
+    return load_model(os.path.join(model_dir, f"{name}_v{revs[-1]:03d}.npz"))
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import numpy as np
+import xarray as xr
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import StandardScaler
+
+from persist import align_to, load_latest, load_model, model_from_fit, predict, save_model
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
+from phase_io import load_phase_year, phase_files
+
+# Per-season phase clusters. A GMM is fit once on pixel-seasons pooled over the
+# training years and saved as a versioned artifact; every other season is then
+# labelled predict-only (one vectorised call, no EM), so adding a season does not
+# refit anything and cluster IDs mean the same thing in every year.
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+MODEL_DIR = os.path.join(ROOT, "results/cluster_models/")
+OUT_DIR = os.path.join(ROOT, "results/SMMR_season_clusters/")
+SENSOR = "SMMR"
+MODEL_NAME = "gmm_season_SMMR"
+FEATURES = ("advance", "retreat", "duration")
+FIT_YEARS = (1979, 2023)
+N_CLUSTERS = 6
+FIT_SAMPLE = 200_000
+REFIT = False  # True: fit a new revision (labels matched to the previous one)
+SEED = 0
+
+
+# === FEATURES === #
+def season_matrix(fields):
+    X = np.stack([np.asarray(fields[name], dtype="float64").ravel() for name in FEATURES], axis=1)
+    return X, np.all(np.isfinite(X), axis=1)
+
+
+def fit_season_model(files, reference=None):
+    rng = np.random.default_rng(SEED)
+    pooled = []
+    for year, path in files:
+        fields = load_phase_year(path, year)
+        if fields is None:
+            continue
+        X, valid = season_matrix(fields)
+        pooled.append(X[valid])
+    X = np.concatenate(pooled)
+    if len(X) > FIT_SAMPLE:
+        X = X[rng.choice(len(X), FIT_SAMPLE, replace=False)]
+
+    scaler = StandardScaler().fit(X)
+    gmm = GaussianMixture(n_components=N_CLUSTERS, covariance_type="full", random_state=SEED)
+    gmm.fit(scaler.transform(X))
+    model = model_from_fit(scaler, gmm, FEATURES, fit_years=[y for y, _ in files])
+    return align_to(model, reference)
+
+
+# === RUN === #
+if __name__ == "__main__":
+    model = load_latest(MODEL_DIR, MODEL_NAME)
+    if model is None or REFIT:
+        print("🔹 Fitting season cluster model...")
+        model = fit_season_model(phase_files(PHASE_DIR, SENSOR, *FIT_YEARS), reference=model)
+        model = load_model(save_model(model, MODEL_DIR, MODEL_NAME))
+    revision = int(model["revision"])
+    print(f"🔹 Predict-only with {MODEL_NAME} v{revision:03d}")
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for year, path in phase_files(PHASE_DIR, SENSOR):
+        out_file = os.path.join(OUT_DIR, f"season_clusters_{SENSOR}_{year}.nc")
+        if os.path.exists(out_file):
+            with xr.open_dataset(out_file) as done:
+                if done.attrs.get("model_revision") == revision:
+                    continue
+
+        fields = load_phase_year(path, year)
+        if fields is None:
+            print(f"⚠️ Skipping {year}: missing variables")
+            continue
+        X, valid = season_matrix(fields)
+        labels = np.full(X.shape[0], np.nan, dtype="float32")
+        labels[valid] = predict(model, X[valid])
+
+        template = fields["advance"]
+        out_ds = xr.Dataset(
+            {f"cluster_{year}": (("y", "x"), labels.reshape(template.shape))},
+            coords={"x": template.x, "y": template.y},
+            attrs={
+                "description": f"{SENSOR} per-season phase clusters | features={','.join(FEATURES)}",
+                "model": MODEL_NAME,
+                "model_revision": revision,
+            },
+        )
+        out_ds.to_netcdf(out_file)
+        print(f"✅ Saved {out_file}")
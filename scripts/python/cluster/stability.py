@@ -0,0 +1,147 @@
+import os
+import sys
+
+import numpy as np
+import xarray as xr
+from joblib import Parallel, delayed, parallel_config
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+from sklearn.metrics import adjusted_rand_score
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
+from phase_io import load_phase_stack
+
+# Bootstrap stability of the GMM phase clusters. Each resample draws years with
+# replacement (duplicates collapse to the distinct years, since a repeated column adds
+# no information to a full-covariance fit) and a random subset of pixels, fits the GMM
+# on that, and labels every pixel. Reported per pixel:
+#   stability              share of resamples agreeing with the reference clustering
+#                          (labels matched by maximum overlap)
+#   neighbour_coassignment share of resamples in which a pixel shares its label with
+#                          its 8 grid neighbours, from sparse neighbour-pair counts
+# plus the adjusted Rand index of every resample against the reference.
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+OUT_DIR = os.path.join(ROOT, "results/cluster_stability/")
+SENSOR = "SMMR"
+CANDIDATES = {"advance": 6, "retreat": 8}  # n_clusters_adv / n_clusters_ret
+N_RESAMPLES = 100
+PIXEL_FRACTION = 0.8
+N_JOBS = -1
+SEED = 0
+
+
+# === FIT HELPERS === #
+def fit_labels(X_fit, X_all, k, seed):
+    scaler = StandardScaler().fit(X_fit)
+    gmm = GaussianMixture(n_components=k, covariance_type="full", random_state=seed)
+    gmm.fit(scaler.transform(X_fit))
+    return gmm.predict(scaler.transform(X_all)).astype("int16")
+
+
+def _resample(X, k, seed, pixel_fraction):
+    rng = np.random.default_rng(seed)
+    n_pix, n_years = X.shape
+    years = np.unique(rng.integers(0, n_years, n_years))
+    pixels = rng.choice(n_pix, int(pixel_fraction * n_pix), replace=False)
+    return fit_labels(X[np.ix_(pixels, years)], X[:, years], k, seed)
+
+
+def align_labels(labels, reference, k):
+    # relabel so that each cluster maps to the reference cluster it overlaps most
+    overlap = np.zeros((k, k), dtype="int64")
+    np.add.at(overlap, (labels, reference), 1)
+    rows, cols = linear_sum_assignment(-overlap)
+    mapping = np.arange(k)
+    mapping[rows] = cols
+    return mapping[labels]
+
+
+# === SPARSE NEIGHBOUR PAIRS === #
+def neighbour_pairs(valid_map):
+    # (i, j) index pairs of valid pixels that touch in the 8-neighbourhood, i < j
+    ny, nx = valid_map.shape
+    index = np.full(valid_map.shape, -1)
+    index[valid_map] = np.arange(valid_map.sum())
+    pairs = []
+    for dy, dx in ((0, 1), (1, -1), (1, 0), (1, 1)):
+        a = index[:ny - dy, max(0, -dx):nx - max(0, dx)]
+        b = index[dy:, max(0, dx):nx + min(0, dx)]
+        ok = (a >= 0) & (b >= 0)
+        pairs.append(np.stack([a[ok], b[ok]], axis=1))
+    return np.concatenate(pairs)
+
+
+def coassignment_counts(all_labels, pairs, n_pix):
+    # Symmetric sparse matrix: entry (i, j) counts resamples where neighbours i, j agree
+    same = np.zeros(len(pairs), dtype="int32")
+    for labels in all_labels:
+        same += labels[pairs[:, 0]] == labels[pairs[:, 1]]
+    counts = sparse.coo_matrix((same, (pairs[:, 0], pairs[:, 1])), shape=(n_pix, n_pix)).tocsr()
+    return counts + counts.T
+
+
+# === STABILITY RUN === #
+def cluster_stability(X, valid_map, k, n_resamples=N_RESAMPLES, pixel_fraction=PIXEL_FRACTION,
+                      n_jobs=N_JOBS, seed=SEED):
+    reference = fit_labels(X, X, k, seed)
+
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        all_labels = Parallel(n_jobs=n_jobs)(
+            delayed(_resample)(X, k, seed + 1 + r, pixel_fraction) for r in range(n_resamples)
+        )
+
+    ari = np.array([adjusted_rand_score(reference, labels) for labels in all_labels])
+    agree = np.zeros(len(X), dtype="int32")
+    for labels in all_labels:
+        agree += align_labels(labels, reference, k) == reference
+
+    pairs = neighbour_pairs(valid_map)
+    counts = coassignment_counts(all_labels, pairs, len(X))
+    degree = np.bincount(pairs.ravel(), minlength=len(X))
+    neighbour_co = np.asarray(counts.sum(axis=1)).ravel() / np.maximum(degree * n_resamples, 1)
+    neighbour_co[degree == 0] = np.nan
+
+    return reference, agree / n_resamples, neighbour_co, ari
+
+
+def to_map(values, valid_map):
+    out = np.full(valid_map.size, np.nan)
+    out[valid_map.ravel()] = values
+    return out.reshape(valid_map.shape)
+
+
+if __name__ == "__main__":
+    advance, retreat = load_phase_stack(PHASE_DIR, SENSOR)
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for name, data in (("advance", advance), ("retreat", retreat)):
+        k = CANDIDATES[name]
+        flat = data.transpose("year", "y", "x").values.reshape(data.sizes["year"], -1).T
+        valid = np.all(np.isfinite(flat), axis=1)
+        valid_map = valid.reshape(data.shape[1:])
+
+        print(f"🔹 {name}: {N_RESAMPLES} resamples, k={k}")
+        reference, stability, neighbour_co, ari = cluster_stability(flat[valid], valid_map, k)
+        print(f"   ARI vs reference: median {np.median(ari):.3f} "
+              f"(5–95%: {np.percentile(ari, 5):.3f}–{np.percentile(ari, 95):.3f})")
+
+        out_ds = xr.Dataset(
+            {
+                "reference_cluster": (("y", "x"), to_map(reference, valid_map)),
+                "stability": (("y", "x"), to_map(stability, valid_map)),
+                "neighbour_coassignment": (("y", "x"), to_map(neighbour_co, valid_map)),
+                "ari": (("resample",), ari),
+            },
+            coords={"x": data.x, "y": data.y},
+            attrs={
+                "description": f"{SENSOR} {name} GMM bootstrap stability | k={k}, "
+                               f"N_RESAMPLES={N_RESAMPLES}, PIXEL_FRACTION={PIXEL_FRACTION}",
+            },
+        )
+        out_file = os.path.join(OUT_DIR, f"stability_{name}_k{k}_{SENSOR}.nc")
+        out_ds.to_netcdf(out_file)
+        print(f"✅ Saved {out_file}")
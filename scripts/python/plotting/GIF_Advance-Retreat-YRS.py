@@ -1,47 +1,57 @@
 import xarray as xr
-import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
 import numpy as np
+import matplotlib.pyplot as plt
 import os
-from glob import glob
+import sys
+from animate import open_animation
+from maprender import MapRenderer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
+from phase_io import never_valid_mask, phase_files, season_fields
 
 # === CONFIG ===
-PHASE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-OUT_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/yearly_phase_maps/"
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+OUT_DIR = os.path.join(ROOT, "results/figures/yearly_phase_maps/")
+ANIM_DIR = os.path.join(ROOT, "results/figures/animations/")
+MASK_FILE = os.path.join(ROOT, "results/cache/never_valid_SMMR.nc")
+ANIM_FORMAT = "gif"  # "gif" or "mp4" (needs ffmpeg)
+FPS = 2
+GIF_OPTIONS = dict(quantize=True, diff=True)  # shared palette + frame differencing
+SAVE_PNG = False  # also write the per-year PNGs
 os.makedirs(OUT_DIR, exist_ok=True)
 
-# === Plotting function ===
-def plot_map(data, year, phase_type, cmap, vmin, vmax, label):
-    fig = plt.figure(figsize=(6, 6))
-    ax = plt.subplot(1, 1, 1, projection=ccrs.SouthPolarStereo())
-    ax.set_extent([-180, 180, -90, -50], crs=ccrs.PlateCarree())
-    ax.coastlines(linewidth=0.4)
-    ax.add_feature(cfeature.LAND, facecolor='gray', zorder=100)
-    ax.spines['geo'].set_visible(False)
+# === Map styles (one renderer per variable, reused for every year) ===
+STYLES = {
+    "advance": dict(vmin=32, vmax=274, label="Advance (Day of Year)"),
+    "retreat": dict(vmin=274, vmax=424, label="Retreat (Day of Year)"),
+    "duration": dict(vmin=0, vmax=300, label="Ice Season Duration (days)"),
+}
 
-    mesh = ax.pcolormesh(data.x, data.y, data, transform=ccrs.SouthPolarStereo(),
-                         cmap=cmap, vmin=vmin, vmax=vmax, shading='auto')
+files = phase_files(PHASE_DIR, "SMMR")
+if not files:
+    raise RuntimeError(f"❌ No phase files found in {PHASE_DIR}")
 
-    ax.set_title(f"{phase_type.capitalize()} {year}", fontsize=14, fontweight='bold')
+with xr.open_dataset(files[0][1]) as grid:
+    x, y = grid.x.values, grid.y.values
+mask = never_valid_mask(PHASE_DIR, "SMMR", MASK_FILE)  # land / never-iced cells, built once
 
-    cbar = plt.colorbar(mesh, ax=ax, orientation='horizontal', pad=0.05)
-    cbar.set_label(label, fontsize=10)
-    cbar.ax.tick_params(labelsize=8)
-    cbar.outline.set_visible(False)
+renderers = {
+    phase_type: MapRenderer(x, y, [dict(cmap=plt.cm.viridis, title_size=14, **style)], hide_geo_spine=True,
+                            raster=True, mask=mask)
+    for phase_type, style in STYLES.items()
+}
 
-    filename = os.path.join(OUT_DIR, f"{phase_type}_{year}.png")
-    plt.savefig(filename, dpi=150, bbox_inches="tight")
-    plt.close()
-
-# === Loop through all per-year files ===
-files = sorted(glob(os.path.join(PHASE_DIR, "seaice_phases_SMMR_*.nc")))
-for fpath in files:
-    year_str = os.path.basename(fpath).split("_")[-1].split(".")[0]
-    if not year_str.isdigit():
-        continue
-    year = int(year_str)
+# GIF palette seeded with the colormap so the colour ramp survives quantisation
+gif_options = dict(GIF_OPTIONS, seed_colors=plt.cm.viridis(np.linspace(0, 1, 128), bytes=True))
+animations = {
+    phase_type: open_animation(os.path.join(ANIM_DIR, f"{phase_type}_SMMR.{ANIM_FORMAT}"), FPS,
+                               **(gif_options if ANIM_FORMAT == "gif" else {}))
+    for phase_type in STYLES
+}
 
+# === One pass through the per-year files: frames go straight into the animations ===
+for year, fpath in files:
     ds = xr.open_dataset(fpath)
     adv_var = f"advance_{year}"
     ret_var = f"retreat_{year}"
@@ -52,15 +62,18 @@ for fpath in files:
 
     # === Load and wrap ===
     advance = ds[adv_var].where((ds[adv_var] >= 32) & (ds[adv_var] <= 274))
-    retreat = ds[ret_var]
-    retreat_wrapped = retreat.where(retreat >= 100, retreat + 365)
+    fields = season_fields(advance, ds[ret_var])
 
-    duration = retreat_wrapped - advance
-    duration = duration.where(duration >= 0)
+    # === Three frames (and optionally the PNGs) ===
+    for phase_type, renderer in renderers.items():
+        title = f"{phase_type.capitalize()} {year}"
+        animations[phase_type].add(renderer.frame(fields[phase_type], titles=title, dpi=150))
+        if SAVE_PNG:
+            renderer.render(fields[phase_type], os.path.join(OUT_DIR, f"{phase_type}_{year}.png"), dpi=150)
 
-    # === Plot three maps ===
-    plot_map(advance, year, "advance", cmap=plt.cm.viridis, vmin=32, vmax=274, label="Advance (Day of Year)")
-    plot_map(retreat_wrapped, year, "retreat", cmap=plt.cm.viridis, vmin=274, vmax=424, label="Retreat (Day of Year)")
-    plot_map(duration, year, "duration", cmap=plt.cm.viridis, vmin=0, vmax=300, label="Ice Season Duration (days)")
+    print(f"✅ Added frames for {year}")
 
-    print(f"✅ Saved maps for {year}")
+for phase_type, renderer in renderers.items():
+    renderer.close()
+    animations[phase_type].close()
+    print(f"✅ Saved {animations[phase_type].path}")
@@ -0,0 +1,151 @@
+import os
+import shutil
+import subprocess
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+# Animation export from in-memory frames (MapRenderer.frame gives RGBA arrays), so no
+# PNG is written or re-read. GIF frames are encoded by Pillow and appended to the file
+# as they arrive, so only the previous frame is held; MP4 is piped as raw RGB into a
+# local ffmpeg when one is on the PATH.
+#
+# GIF options:
+#   quantize  map every frame onto one shared palette (COLORS entries) instead of a
+#             separate adaptive palette per frame. seed_colors (e.g. a sample of the
+#             colormap) go into the palette first so colour ramps do not band; the
+#             remaining entries come from the first frame (text, land, background).
+#   diff      frame differencing on top of the shared palette: pixels unchanged since
+#             the previous frame become transparent and the frame is left in place
+#             (disposal 1), and each frame is cropped to the box around the changed
+#             pixels, so only those are stored
+
+COLORS = 255  # shared palette size; the last index is kept for the transparent colour
+TRANSPARENT = 255
+
+
+class GifStream:
+
+    def __init__(self, path, fps=2, quantize=True, diff=True, colors=COLORS, seed_colors=None, loop=0):
+        if diff and not quantize:
+            raise ValueError("Frame differencing needs the shared palette (quantize=True)")
+        self.path, self.fps, self.loop = path, fps, loop
+        self.quantize, self.diff, self.colors = quantize, diff, min(colors, COLORS)
+        self.seed_colors = None if seed_colors is None else np.asarray(seed_colors, dtype="uint8")[:, :3]
+        self._file = None
+        self._palette = None
+        self._previous = None
+
+    def add(self, rgba):
+        image = Image.fromarray(np.asarray(rgba)[..., :3])
+        if not self.quantize:
+            # adaptive palette per frame, carried as a local colour table
+            self._write(image.quantize(colors=self.colors + 1, dither=Image.Dither.NONE), include_color_table=True)
+            return
+        if self._palette is None:
+            self._set_palette(image)
+        indexed = np.asarray(image.quantize(palette=self._palette, dither=Image.Dither.NONE))
+        offset = (0, 0)
+        stored = indexed
+        if self.diff and self._previous is not None:
+            changed = indexed != self._previous
+            rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+            if rows.size == 0:  # nothing changed: one transparent pixel holds the frame's time
+                rows, cols = np.array([0]), np.array([0])
+            box = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+            stored = np.where(changed[box], indexed[box], TRANSPARENT).astype("uint8")
+            offset = (int(cols[0]), int(rows[0]))
+        self._previous = indexed
+        frame = Image.fromarray(stored, mode="P")
+        frame.putpalette(self._rgb_palette)
+        if self.diff:
+            self._write(frame, offset, transparency=TRANSPARENT, disposal=1)
+        else:
+            self._write(frame, offset)
+
+    def _write(self, frame, offset=(0, 0), **params):
+        if self._file is None:
+            self._file = open(self.path, "wb")
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": self.loop, "optimize": False})
+            self._file.write(b"".join(header))
+        frame_data = GifImagePlugin.getdata(frame, offset, duration=int(1000 / self.fps), **params)
+        self._file.write(b"".join(frame_data))
+
+    def _set_palette(self, image):
+        seed = np.zeros((0, 3), dtype="uint8") if self.seed_colors is None else self.seed_colors
+        seed = seed[:self.colors // 2]
+        rest = image.quantize(colors=self.colors - len(seed), method=Image.Quantize.FASTOCTREE,
+                              dither=Image.Dither.NONE)
+        palette = seed.ravel().tolist() + rest.getpalette()[:3 * (self.colors - len(seed))]
+        self._rgb_palette = palette + [255] * (768 - len(palette))
+        self._palette = Image.new("P", (1, 1))
+        self._palette.putpalette(self._rgb_palette)
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.write(b";")  # GIF trailer
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Mp4Stream:
+
+    def __init__(self, path, fps=2, crf=18):
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("❌ MP4 export needs ffmpeg on the PATH (or write a .gif)")
+        self.path, self.fps, self.crf = path, fps, crf
+        self.ffmpeg = ffmpeg
+        self.proc = None
+        self.shape = None
+
+    def _start(self, height, width):
+        self.shape = (height, width)
+        self.proc = subprocess.Popen(
+            [self.ffmpeg, "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+             "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white",  # yuv420p needs even sizes
+             "-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", str(self.crf), self.path],
+            stdin=subprocess.PIPE,
+        )
+
+    def add(self, rgba):
+        rgb = np.ascontiguousarray(np.asarray(rgba)[..., :3])
+        if self.proc is None:
+            self._start(*rgb.shape[:2])
+        if rgb.shape[:2] != self.shape:
+            raise ValueError(f"Frame size {rgb.shape[:2]} differs from the first frame {self.shape}")
+        self.proc.stdin.write(rgb.tobytes())
+
+    def close(self):
+        if self.proc is None:
+            return
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"❌ ffmpeg failed writing {self.path}")
+        self.proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_animation(path, fps=2, **options):
+    # Writer chosen by extension; options go to GifStream (quantize, diff, colors, loop)
+    # or Mp4Stream (crf).
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".gif":
+        return GifStream(path, fps, **options)
+    if ext == ".mp4":
+        return Mp4Stream(path, fps, **options)
+    raise ValueError(f"Unsupported animation format: {ext}")
@@ -4,10 +4,17 @@ import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 import numpy as np
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from climatology import phase_anomaly, update_climatology_product
+from paths import ROOT
+from phase_io import wrap_retreat
 
 # === CONFIG === #
-BASE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-SAVE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/anomalies_pairs/"
+BASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+SAVE_DIR = os.path.join(ROOT, "results/figures/anomalies_pairs/")
+CLIM_FILE = os.path.join(ROOT, "results/climatology/phase_climatology_SMMR.nc")
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 # === Define year pairs === #
@@ -18,10 +25,13 @@ pairs = [
 ]
 
 # === Load grid === #
-grid = xr.open_dataset("/Users/fridaperez/Developer/repos/sea-ice-phase/data/merged/SMMR_merged_1979_06302024.nc")
+grid = xr.open_dataset(os.path.join(ROOT, "data/merged/SMMR_merged_1979_06302024.nc"))
 lon = grid["x"]
 lat = grid["y"]
 
+# === Climatology (1979–2024), built once and updated with any new seasons === #
+climatology = update_climatology_product(BASE_DIR, CLIM_FILE, "SMMR", 1979, 2024)
+
 # === Loop over each pair === #
 for retreat_year, advance_year in pairs:
     print(f"🔵 Plotting Retreat {retreat_year} anomaly and Advance {advance_year} timing...")
@@ -30,23 +40,11 @@ for retreat_year, advance_year in pairs:
     ds_retreat = xr.open_dataset(f"{BASE_DIR}/seaice_phases_SMMR_{retreat_year}.nc")
     ds_advance = xr.open_dataset(f"{BASE_DIR}/seaice_phases_SMMR_{advance_year}.nc")
 
-    retreat = ds_retreat[f"retreat_{retreat_year}"]
+    retreat = wrap_retreat(ds_retreat[f"retreat_{retreat_year}"])
     advance = ds_advance[f"advance_{advance_year}"]
 
-    # Build climatology across all years (1979–2024)
-    retreat_files = sorted([f for f in os.listdir(BASE_DIR) if "seaice_phases_SMMR_" in f])
-    retreat_stack = []
-    for f in retreat_files:
-        year = int(f.split("_")[-1].split(".")[0])
-        if 1979 <= year <= 2024:
-            temp = xr.open_dataset(os.path.join(BASE_DIR, f))
-            var_name = f"retreat_{year}"
-            if var_name in temp:
-                retreat_stack.append(temp[var_name])
-    retreat_clim = xr.concat(retreat_stack, dim="year").mean(dim="year", skipna=True)
-
     # Retreat Anomaly
-    retreat_anomaly = retreat - retreat_clim
+    retreat_anomaly = phase_anomaly(climatology, "retreat", retreat)
 
     # === PLOTTING === #
     fig, axs = plt.subplots(1, 2, figsize=(14, 6), subplot_kw={'projection': ccrs.SouthPolarStereo()})
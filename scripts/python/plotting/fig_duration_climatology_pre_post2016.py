@@ -1,11 +1,16 @@
+import os
+import sys
 import xarray as xr
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
+
 # === Load dataset ===
-ds = xr.open_dataset("/Users/fridaperez/Developer/repos/sea-ice-phase/data/phase_SMMR_1980_2023_combined.nc")
+ds = xr.open_dataset(os.path.join(ROOT, "data/phase_SMMR_1980_2023_combined.nc"))
 
 # Extract retreat and advance variables
 retreat_vars = [v for v in ds.data_vars if "retreat_" in v]
@@ -59,5 +64,5 @@ for ax, data, title, cmap, vmin_, vmax_ in zip(axs, data_list, titles, cmaps, vm
     cbar.outline.set_visible(False)
 
 plt.tight_layout()
-plt.savefig("/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/fig_duration_pre_post2016.png", dpi=300, bbox_inches="tight")
+plt.savefig(os.path.join(ROOT, "results/figures/fig_duration_pre_post2016.png"), dpi=300, bbox_inches="tight")
 plt.show()
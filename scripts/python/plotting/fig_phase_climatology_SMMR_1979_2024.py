@@ -1,18 +1,18 @@
 import xarray as xr
-import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-import numpy as np
 import os
+import sys
 from glob import glob
 from matplotlib.colors import Normalize
-from matplotlib.path import Path
-import matplotlib.patches as mpatches
+from figjobs import figure_job, run_jobs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
 
 # === CONFIG === #
-INPUT_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-OUT_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/yearly_phase_maps/"
+INPUT_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+OUT_DIR = os.path.join(ROOT, "results/figures/yearly_phase_maps/")
 YEAR_START, YEAR_END = 1979, 2023
+FORCE = False  # True: re-render even where the PNG is newer than its phase file
 os.makedirs(OUT_DIR, exist_ok=True)
 
 # === Plot Settings === #
@@ -32,57 +32,37 @@ tick_labels = [
     ['50', '100', '150', '200', '250']
 ]
 cbar_titles = ['ADVANCE (DOY)', 'RETREAT (DOY)', 'DURATION (days)']
-cmap = plt.cm.viridis.copy()
-cmap.set_bad("white")
-
-# === Circular Mask === #
-theta = np.linspace(0, 2 * np.pi, 100)
-circle_verts = np.vstack([np.sin(theta), np.cos(theta)]).T * 0.5 + 0.5
-circle_path = Path(circle_verts)
+panels = [
+    dict(cmap="viridis", norm=norm, ticks=ticks, ticklabels=labels, label=title, label_size=9, label_pad=3)
+    for norm, ticks, labels, title in zip(norms, tick_locs, tick_labels, cbar_titles)
+]
+layout = dict(panels=panels, figsize=(15, 6), circular=True, tight_layout=True)
 
-# === Loop through years === #
-for f in sorted(glob(f"{INPUT_DIR}/seaice_phases_SMMR_*.nc")):
-    year = os.path.basename(f).split("_")[-1].split(".")[0]
-    if not year.isdigit() or not (YEAR_START <= int(year) <= YEAR_END):
-        continue
 
-    ds = xr.open_dataset(f)
-    adv_var, ret_var = f"advance_{year}", f"retreat_{year}"
-    if adv_var not in ds or ret_var not in ds:
-        print(f"⚠️ Skipping {year}: missing variables")
-        continue
-
-    # Load and process variables
-    advance = ds[adv_var].where(ds[adv_var] >= 32)
-    retreat = ds[ret_var]
+def select_year(path, year):
+    with xr.open_dataset(path) as ds:
+        ds = ds.load()
+    advance = ds[f"advance_{year}"].where(ds[f"advance_{year}"] >= 32)
+    retreat = ds[f"retreat_{year}"]
     retreat_wrapped = retreat.where(retreat >= 100, retreat + 365)
     duration = retreat_wrapped - advance
+    return [advance, retreat_wrapped, duration]
 
-    data_list = [advance, retreat_wrapped, duration]
-
-    # === Plotting === #
-    fig, axs = plt.subplots(1, 3, figsize=(15, 6), subplot_kw={'projection': ccrs.SouthPolarStereo()})
 
-    for ax, data, norm, ticks, labels, cbar_label in zip(axs, data_list, norms, tick_locs, tick_labels, cbar_titles):
-        ax.set_extent([-180, 180, -90, -50], crs=ccrs.PlateCarree())
-        ax.set_boundary(circle_path, transform=ax.transAxes)
-        mesh = ax.pcolormesh(data.x, data.y, data, transform=ccrs.SouthPolarStereo(),
-                             cmap=cmap, norm=norm, shading="auto")
-        ax.add_feature(cfeature.LAND, zorder=100, facecolor="gray")
-        ax.coastlines(linewidth=0.4)
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ax.set_title("")  # Optional: add title here if desired
+# === One job per year, rendered across worker processes === #
+jobs = []
+for f in sorted(glob(f"{INPUT_DIR}/seaice_phases_SMMR_*.nc")):
+    year = os.path.basename(f).split("_")[-1].split(".")[0]
+    if not year.isdigit() or not (YEAR_START <= int(year) <= YEAR_END):
+        continue
 
-        cbar = plt.colorbar(mesh, ax=ax, orientation="horizontal", pad=0.05)
-        cbar.set_ticks(ticks)
-        cbar.set_ticklabels(labels)
-        cbar.ax.tick_params(labelsize=8)
-        cbar.outline.set_visible(False)
-        cbar.set_label(cbar_label, fontsize=9, labelpad=3)
+    with xr.open_dataset(f) as ds:
+        if f"advance_{year}" not in ds or f"retreat_{year}" not in ds:
+            print(f"⚠️ Skipping {year}: missing variables")
+            continue
 
-    plt.tight_layout()
     save_path = os.path.join(OUT_DIR, f"phase_map_{year}.png")
-    plt.savefig(save_path, dpi=400, bbox_inches="tight")
-    plt.close()
-    print(f"✅ Saved: {save_path}")
+    jobs.append(figure_job((select_year, f, year), layout, save_path, inputs=[f], dpi=400))
+
+if __name__ == "__main__":
+    run_jobs(jobs, force=FORCE)
@@ -4,50 +4,31 @@ import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 import numpy as np
 import os
-from glob import glob
+import sys
 from matplotlib.colors import Normalize
 from matplotlib.path import Path
 import matplotlib.patches as mpatches
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from climatology import climatology_mean, update_climatology_product
+from paths import ROOT
+
 # === CONFIG === #
-INPUT_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-SAVE_PATH = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/climatology/fig_phase_climatology_SMMR_2012_2024_round.png"
+INPUT_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+CLIM_FILE = os.path.join(ROOT, "results/climatology/phase_climatology_SMMR_2012_2024.nc")
+SAVE_PATH = os.path.join(ROOT, "results/figures/climatology/fig_phase_climatology_SMMR_2012_2024_round.png")
 YEAR_START = 2012
 YEAR_END = 2024
 
-# === Load and stack valid files === #
-files = sorted(glob(f"{INPUT_DIR}/seaice_phases_SMMR_*.nc"))
-advance_stack, retreat_stack = [], []
-
-for f in files:
-    year = os.path.basename(f).split("_")[-1].split(".")[0]
-    if not year.isdigit() or not (YEAR_START <= int(year) <= YEAR_END):
-        continue
-
-    ds = xr.open_dataset(f)
-    adv_var = f"advance_{year}"
-    ret_var = f"retreat_{year}"
-    if adv_var in ds and ret_var in ds:
-        advance_stack.append(ds[adv_var])
-        retreat_stack.append(ds[ret_var])
-    else:
-        print(f"⚠️ Skipping {f} — missing {adv_var} or {ret_var}")
-
-if not advance_stack or not retreat_stack:
-    raise RuntimeError("❌ No valid advance/retreat variables found to concatenate.")
-
-advance_stack = xr.concat(advance_stack, dim="year")
-retreat_stack = xr.concat(retreat_stack, dim="year")
-
-advance_mean = advance_stack.mean(dim="year", skipna=True)
-retreat_mean = retreat_stack.mean(dim="year", skipna=True)
-duration_mean = retreat_mean - advance_mean
+# === Means from the streaming climatology product for this period === #
+clim = update_climatology_product(INPUT_DIR, CLIM_FILE, "SMMR", YEAR_START, YEAR_END)
 
-# === Wrap RETREAT for plotting === #
-retreat_wrapped = retreat_mean.where(retreat_mean >= 100, retreat_mean + 365)
+advance_mean = climatology_mean(clim, "advance")
+retreat_wrapped = climatology_mean(clim, "retreat")  # retreat is wrapped per season
+duration_mean = climatology_mean(clim, "duration")
 
 # === Coordinates === #
-grid = xr.open_dataset("/Users/fridaperez/Developer/repos/sea-ice-phase/data/merged/SMMR_merged_1979_06302024.nc")
+grid = xr.open_dataset(os.path.join(ROOT, "data/merged/SMMR_merged_1979_06302024.nc"))
 lat = grid["y"]
 lon = grid["x"]
 
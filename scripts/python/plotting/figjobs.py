@@ -0,0 +1,91 @@
+import os
+import pickle
+from hashlib import sha1
+
+import matplotlib
+
+matplotlib.use("Agg")  # workers never open a window; must precede the pyplot import below
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs, parallel_config
+
+from maprender import MapRenderer
+
+# Process-parallel figure jobs. A job is a plain dict:
+#   select   (func, *args); func(*args) returns the DataArray(s) for the panels.
+#            Runs in the worker, so heavy loading/fitting is parallel too.
+#   layout   MapRenderer keyword arguments (panels, figsize, circular, ...)
+#   output   PNG path
+#   inputs   files the figure is derived from; the job is skipped when the output
+#            is newer than all of them
+# Jobs sharing a layout are split into one chunk per worker, and each worker builds
+# a single MapRenderer per chunk and reuses it for every frame.
+
+N_JOBS = -1
+
+
+def figure_job(select, layout, output, inputs=(), titles=None, dpi=150, bbox_inches="tight"):
+    return {
+        "select": tuple(select),
+        "layout": layout,
+        "output": output,
+        "inputs": list(inputs),
+        "titles": titles,
+        "dpi": dpi,
+        "bbox_inches": bbox_inches,
+    }
+
+
+def is_stale(job):
+    if not os.path.exists(job["output"]):
+        return True
+    if not job["inputs"]:
+        return False
+    newest = max(os.path.getmtime(p) for p in job["inputs"])
+    return os.path.getmtime(job["output"]) < newest
+
+
+def _layout_key(layout):
+    return sha1(pickle.dumps(layout)).hexdigest()
+
+
+def _render_chunk(jobs):
+    renderer = None
+    written = []
+    try:
+        for job in jobs:
+            func, *args = job["select"]
+            fields = func(*args)
+            if not isinstance(fields, (list, tuple)):
+                fields = [fields]
+            if renderer is None:
+                renderer = MapRenderer(fields[0].x, fields[0].y, **job["layout"])
+            os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+            renderer.render(fields, job["output"], titles=job["titles"], dpi=job["dpi"],
+                            bbox_inches=job["bbox_inches"])
+            written.append(job["output"])
+    finally:
+        if renderer is not None:
+            renderer.close()
+    return written
+
+
+def run_jobs(jobs, n_jobs=N_JOBS, force=False):
+    todo = [job for job in jobs if force or is_stale(job)]
+    print(f"🔹 {len(todo)} of {len(jobs)} figures to render ({len(jobs) - len(todo)} up to date)")
+    if not todo:
+        return []
+
+    groups = {}
+    for job in todo:
+        groups.setdefault(_layout_key(job["layout"]), []).append(job)
+    n_workers = min(effective_n_jobs(n_jobs), len(todo))
+    chunks = [list(chunk) for group in groups.values()
+              for chunk in np.array_split(np.array(group, dtype=object), min(n_workers, len(group)))]
+
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        written = Parallel(n_jobs=n_workers)(delayed(_render_chunk)(chunk) for chunk in chunks)
+    written = [path for paths in written for path in paths]
+    for path in written:
+        print(f"✅ Saved {path}")
+    return written
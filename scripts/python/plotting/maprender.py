@@ -0,0 +1,146 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
+from matplotlib.path import Path
+
+# Batch map rendering. The South Polar Stereo axes, land/coastline layers, circular
+# boundary and colorbars are built once; each frame only swaps the data array of the
+# existing meshes and saves. Projected land/coastline paths are cached by cartopy after
+# the first draw, so every later frame skips the geometry work too.
+#
+# raster=True draws each field as an imshow image placed by its grid extent instead of
+# a projected pcolormesh; it is faster for 150 dpi animation frames, while 300-400 dpi
+# maps keep pcolormesh. mask (e.g. phase_io.never_valid_mask) marks cells left
+# transparent in either mode, together with each frame's NaNs.
+
+EXTENT = [-180, 180, -90, -50]
+
+PANEL_DEFAULTS = {
+    "cmap": "viridis",
+    "norm": None,
+    "vmin": None,
+    "vmax": None,
+    "label": "",
+    "label_size": 10,
+    "label_pad": None,
+    "ticks": None,
+    "ticklabels": None,
+    "title": "",
+    "title_size": 12,
+    "title_pad": None,
+}
+
+
+def grid_extent(x, y):
+    # outer cell edges of a regular grid, plus the imshow origin matching y's order
+    x, y = np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64")
+    dx, dy = abs(x[1] - x[0]) / 2, abs(y[1] - y[0]) / 2
+    extent = [x.min() - dx, x.max() + dx, y.min() - dy, y.max() + dy]
+    return extent, ("upper" if y[0] > y[-1] else "lower")
+
+
+def circle_boundary():
+    theta = np.linspace(0, 2 * np.pi, 100)
+    circle_verts = np.vstack([np.sin(theta), np.cos(theta)]).T * 0.5 + 0.5
+    return Path(circle_verts)
+
+
+class MapRenderer:
+
+    def __init__(self, x, y, panels, figsize=(6, 6), circular=False, hide_geo_spine=False,
+                 land_color="gray", coast_width=0.4, cbar_pad=0.05, tight_layout=False,
+                 raster=False, mask=None):
+        proj = ccrs.SouthPolarStereo()
+        self.fig, axs = plt.subplots(1, len(panels), figsize=figsize, squeeze=False,
+                                     subplot_kw={"projection": proj})
+        self.axes = list(axs[0])
+        self.meshes, self.mappables, self.titles, self.styles = [], [], [], []
+        shape = (len(y), len(x))
+        self.raster = raster
+        self.mask = np.zeros(shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        empty = np.ma.masked_all(shape)
+        if raster:
+            extent, origin = grid_extent(x, y)
+
+        for ax, style in zip(self.axes, panels):
+            style = {**PANEL_DEFAULTS, **style}
+            ax.set_extent(EXTENT, crs=ccrs.PlateCarree())
+            if circular:
+                ax.set_boundary(circle_boundary(), transform=ax.transAxes)
+            if hide_geo_spine:
+                ax.spines["geo"].set_visible(False)
+
+            cmap = plt.get_cmap(style["cmap"]).copy()
+            cmap.set_bad("white")
+            norm = style["norm"] or Normalize(vmin=style["vmin"], vmax=style["vmax"])
+            if raster:
+                mesh = ax.imshow(np.zeros(shape + (4,), dtype="uint8"), extent=extent, origin=origin,
+                                 transform=proj, interpolation="nearest")
+                mappable = ScalarMappable(norm=norm, cmap=cmap)
+            else:
+                mesh = mappable = ax.pcolormesh(x, y, empty, transform=proj, cmap=cmap, norm=norm,
+                                                shading="auto")
+            ax.add_feature(cfeature.LAND, zorder=100, facecolor=land_color)
+            ax.coastlines(linewidth=coast_width)
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+            cbar = self.fig.colorbar(mappable, ax=ax, orientation="horizontal", pad=cbar_pad)
+            if style["ticks"] is not None:
+                cbar.set_ticks(style["ticks"])
+            if style["ticklabels"] is not None:
+                cbar.set_ticklabels(style["ticklabels"])
+            cbar.ax.tick_params(labelsize=8)
+            cbar.outline.set_visible(False)
+            cbar.set_label(style["label"], fontsize=style["label_size"], labelpad=style["label_pad"])
+
+            title = ax.set_title(style["title"], fontsize=style["title_size"], fontweight="bold",
+                                 pad=style["title_pad"])
+            self.meshes.append(mesh)
+            self.mappables.append(mappable)
+            self.titles.append(title)
+            self.styles.append(style)
+
+        if tight_layout:
+            self.fig.tight_layout()
+
+    def render(self, fields, path, titles=None, dpi=150, bbox_inches="tight"):
+        # fields: one 2-D array per panel (a bare array for single-panel renderers)
+        self._update(fields, titles)
+        self.fig.savefig(path, dpi=dpi, bbox_inches=bbox_inches)
+
+    def frame(self, fields, titles=None, dpi=150):
+        # Same update, drawn straight to the canvas: (h, w, 4) uint8 RGBA, no file or PNG encode
+        self._update(fields, titles)
+        self.fig.set_dpi(dpi)
+        self.fig.canvas.draw()
+        return np.asarray(self.fig.canvas.buffer_rgba()).copy()
+
+    def _update(self, fields, titles):
+        if len(self.meshes) == 1 and not isinstance(fields, (list, tuple)):
+            fields = [fields]
+        if titles is not None and isinstance(titles, str):
+            titles = [titles]
+        for i, (mesh, data) in enumerate(zip(self.meshes, fields)):
+            data = np.asarray(data, dtype="float64")
+            masked = self.mask | np.isnan(data)
+            if self.raster:
+                rgba = self.mappables[i].to_rgba(data, bytes=True)
+                rgba[masked] = 0
+                mesh.set_data(rgba)
+            else:
+                mesh.set_array(np.ma.masked_array(data, mask=masked))
+            if titles is not None:
+                self.titles[i].set_text(titles[i])
+
+    def close(self):
+        plt.close(self.fig)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
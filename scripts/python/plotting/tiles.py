@@ -0,0 +1,258 @@
+import io
+import json
+import os
+import sqlite3
+import sys
+import zlib
+from hashlib import sha1
+
+import numpy as np
+import xarray as xr
+from joblib import Parallel, delayed, parallel_config
+from matplotlib import colormaps
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from climatology import FIELDS, load_climatology, phase_anomaly, update_climatology_product
+from paths import ROOT
+from phase_io import load_phase_stack, load_phase_year, phase_files, season_fields
+
+# Tile pyramid of the phase products in one SQLite archive, served by tileviewer.py.
+# Layers (key in brackets):
+#   advance / retreat / duration            per season [year]
+#   <field>_anomaly                         per season against the climatology product [year]
+#   <field>_trend                           per period in TREND_PERIODS [period]
+# The grid is padded to a square with the origin at the top-left; zoom z spans
+# TILE * 2**z pixels (nearest-neighbour from the 25 km cells), and fully transparent
+# tiles are not stored. The archive also keeps the per-season fields as compressed
+# float32 blobs for the viewer's per-pixel time series.
+#
+# Generation is one job per (layer, key) across worker processes. Each job records
+# a stamp of its input files (name, size, mtime), so a rerun only renders what a new
+# or reprocessed season changes: that season's layers, plus the anomaly and trend
+# layers whose climatology or period it feeds.
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+CLIM_FILE = os.path.join(ROOT, "results/climatology/phase_climatology_SMMR.nc")
+ARCHIVE = os.path.join(ROOT, "results/tiles/phase_tiles_SMMR.sqlite")
+SENSOR = "SMMR"
+YEAR_START, YEAR_END = 1979, 2024
+TILE = 256
+LEVELS = 4  # zoom 0..3; zoom 3 is ~6 screen pixels per grid cell
+N_JOBS = -1
+LUT_SIZE = 255  # colormap levels per tile palette; the last palette index is transparent
+TRANSPARENT = 255
+
+STYLES = {
+    "advance": dict(cmap="viridis", vmin=32, vmax=274),
+    "retreat": dict(cmap="viridis", vmin=274, vmax=424),
+    "duration": dict(cmap="viridis", vmin=0, vmax=300),
+    "anomaly": dict(cmap="coolwarm", vmin=-40, vmax=40),
+    "trend": dict(cmap="coolwarm", vmin=-2, vmax=2),
+}
+TREND_PERIODS = {
+    "full": (1979, 2024),
+    "pre2016": (1979, 2015),
+    "post2016": (2016, 2024),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tiles (layer TEXT, key TEXT, z INTEGER, x INTEGER, y INTEGER, data BLOB,
+                                  PRIMARY KEY (layer, key, z, x, y));
+CREATE TABLE IF NOT EXISTS sources (layer TEXT, key TEXT, stamp TEXT, PRIMARY KEY (layer, key));
+CREATE TABLE IF NOT EXISTS series (name TEXT, year INTEGER, data BLOB, PRIMARY KEY (name, year));
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+# === ARCHIVE === #
+def open_archive(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def read_metadata(db):
+    return {name: json.loads(value) for name, value in db.execute("SELECT name, value FROM metadata")}
+
+
+def read_series(db, name):
+    # (years, (year, y, x) float32 cube) of one per-season field
+    meta = read_metadata(db)
+    rows = db.execute("SELECT year, data FROM series WHERE name = ? ORDER BY year", (name,)).fetchall()
+    shape = (meta["ny"], meta["nx"])
+    cube = np.stack([np.frombuffer(zlib.decompress(blob), dtype="float32").reshape(shape) for _, blob in rows])
+    return [year for year, _ in rows], cube
+
+
+def source_stamp(paths):
+    parts = [f"{os.path.basename(p)}:{os.path.getsize(p)}:{int(os.path.getmtime(p))}" for p in sorted(paths)]
+    return sha1(";".join(parts).encode()).hexdigest()
+
+
+# === TILES === #
+def field_index(values, style):
+    # colormap index per cell (0..LUT_SIZE-1), TRANSPARENT where NaN
+    values = np.asarray(values, dtype="float64")
+    scaled = (values - style["vmin"]) / (style["vmax"] - style["vmin"])
+    index = np.clip(np.floor(scaled * LUT_SIZE), 0, LUT_SIZE - 1)
+    return np.where(np.isnan(values), TRANSPARENT, index).astype("uint8")
+
+
+def style_palette(style):
+    lut = colormaps[style["cmap"]].resampled(LUT_SIZE)(np.arange(LUT_SIZE), bytes=True)[:, :3]
+    return lut.ravel().tolist() + [0, 0, 0] * (256 - LUT_SIZE)
+
+
+def field_tiles(values, style, levels=LEVELS, tile=TILE):
+    # (z, x, y, png bytes) for every non-empty tile of one field; palette PNGs with the
+    # colormap as palette, so a tile stores one byte per pixel before compression
+    index = field_index(values, style)
+    palette = style_palette(style)
+    ny, nx = index.shape
+    n = max(ny, nx)
+    square = np.full((n, n), TRANSPARENT, dtype="uint8")
+    square[:ny, :nx] = index
+
+    out = []
+    for z in range(levels):
+        size = tile << z
+        cells = (np.arange(size) * n) // size  # grid cell under each canvas pixel
+        for ty in range(1 << z):
+            rows = cells[ty * tile:(ty + 1) * tile]
+            for tx in range(1 << z):
+                cols = cells[tx * tile:(tx + 1) * tile]
+                block = square[np.ix_(rows, cols)]
+                if (block == TRANSPARENT).all():
+                    continue
+                image = Image.fromarray(block, mode="P")
+                image.putpalette(palette)
+                buf = io.BytesIO()
+                image.save(buf, format="PNG", transparency=TRANSPARENT)
+                out.append((z, tx, ty, buf.getvalue()))
+    return out
+
+
+# === LAYER SOURCES (run inside the workers) === #
+def _season_field(path, year, name):
+    return load_phase_year(path, year)[name].values
+
+
+def _anomaly_field(path, year, name, clim_file):
+    values = load_phase_year(path, year)[name]
+    return phase_anomaly(load_climatology(clim_file), name, values).values
+
+
+def linear_trend(stack, years):
+    # OLS slope (units per year) per pixel; NaN wherever a year is missing, as the
+    # per-pixel np.polyfit in trends_smmr.py gives
+    x = np.asarray(years, dtype="float64")
+    x = x - x.mean()
+    y = stack - stack.mean(axis=0)
+    return np.tensordot(x, y, axes=(0, 0)) / np.sum(x ** 2)
+
+
+def _trend_field(phase_dir, sensor, name, start, end):
+    advance, retreat = load_phase_stack(phase_dir, sensor, start, end)
+    fields = season_fields(advance, retreat)
+    return linear_trend(fields[name].values, fields[name]["year"].values)
+
+
+def _render_job(layer, key, style_name, source):
+    func, *args = source
+    return layer, key, field_tiles(func(*args), STYLES[style_name])
+
+
+# === BUILD === #
+def tile_jobs(phase_dir, clim_file, sensor, year_start, year_end):
+    # (layer, key, style, source, input files) for every layer the archive should hold
+    files = []
+    for year, path in phase_files(phase_dir, sensor, year_start, year_end):
+        with xr.open_dataset(path) as ds:
+            if f"advance_{year}" in ds and f"retreat_{year}" in ds:
+                files.append((year, path))
+            else:
+                print(f"⚠️ Skipping {path}: missing advance/retreat for {year}")
+    jobs = []
+    for year, path in files:
+        for name in FIELDS:
+            jobs.append((name, str(year), name, (_season_field, path, year, name), [path]))
+            jobs.append((f"{name}_anomaly", str(year), "anomaly",
+                         (_anomaly_field, path, year, name, clim_file), [path, clim_file]))
+    for period, (start, end) in TREND_PERIODS.items():
+        inputs = [path for year, path in files if start <= year <= end]
+        if len(inputs) < 2:
+            continue
+        for name in FIELDS:
+            jobs.append((f"{name}_trend", period, "trend",
+                         (_trend_field, phase_dir, sensor, name, start, end), inputs))
+    return files, jobs
+
+
+def update_series(db, files):
+    stamps = dict(db.execute("SELECT key, stamp FROM sources WHERE layer = 'series'"))
+    grid = None
+    for year, path in files:
+        stamp = source_stamp([path])
+        if stamps.get(str(year)) == stamp:
+            continue
+        fields = load_phase_year(path, year)
+        if fields is None:
+            continue
+        grid = fields["advance"]
+        for name in FIELDS:
+            blob = zlib.compress(np.asarray(fields[name].values, dtype="float32").tobytes())
+            db.execute("INSERT OR REPLACE INTO series VALUES (?, ?, ?)", (name, year, blob))
+        db.execute("INSERT OR REPLACE INTO sources VALUES ('series', ?, ?)", (str(year), stamp))
+    return grid
+
+
+def build_archive(phase_dir=PHASE_DIR, clim_file=CLIM_FILE, archive=ARCHIVE, sensor=SENSOR,
+                  year_start=YEAR_START, year_end=YEAR_END, n_jobs=N_JOBS):
+    update_climatology_product(phase_dir, clim_file, sensor, year_start, year_end)
+    files, jobs = tile_jobs(phase_dir, clim_file, sensor, year_start, year_end)
+    if not files:
+        raise RuntimeError(f"❌ No phase files found in {phase_dir}")
+
+    db = open_archive(archive)
+    grid = update_series(db, files)
+    if grid is not None:
+        x, y = grid.x.values, grid.y.values
+        meta = {
+            "sensor": sensor, "ny": len(y), "nx": len(x), "tile": TILE, "levels": LEVELS,
+            "x0": float(x[0]), "dx": float(x[1] - x[0]), "y0": float(y[0]), "dy": float(y[1] - y[0]),
+            "styles": STYLES,
+        }
+        db.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                       [(k, json.dumps(v)) for k, v in meta.items()])
+    db.commit()
+
+    stamps = {(layer, key): stamp for layer, key, stamp in db.execute("SELECT layer, key, stamp FROM sources")}
+    todo, new_stamps = [], {}
+    for layer, key, style_name, source, inputs in jobs:
+        stamp = source_stamp(inputs)
+        if stamps.get((layer, key)) != stamp:
+            todo.append((layer, key, style_name, source))
+            new_stamps[(layer, key)] = stamp
+    print(f"🔹 {len(todo)} of {len(jobs)} tile layers to render ({len(jobs) - len(todo)} up to date)")
+
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        results = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+            delayed(_render_job)(*job) for job in todo
+        )
+        for layer, key, tiles in results:
+            db.execute("DELETE FROM tiles WHERE layer = ? AND key = ?", (layer, key))
+            db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?, ?, ?)",
+                           [(layer, key, z, tx, ty, png) for z, tx, ty, png in tiles])
+            db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (layer, key, new_stamps[(layer, key)]))
+            db.commit()
+    if todo:
+        db.execute("VACUUM")  # reclaim the pages of replaced tiles
+    db.close()
+    print(f"✅ Tile archive up to date: {archive}")
+
+
+if __name__ == "__main__":
+    build_archive()
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from tiles import ARCHIVE, FIELDS, read_metadata, read_series
+
+# Local viewer for the tile archive written by tiles.py:
+#   /                               map page (layer, season/period, zoom; click a pixel)
+#   /layers                         {layer: [keys]} and the archive metadata
+#   /tiles/<layer>/<key>/<z>/<x>/<y>.png
+#   /series?row=<i>&col=<j>         advance / retreat / duration of one grid cell, all seasons
+# The per-season cubes are read from the archive once at start-up, so a click is an
+# in-memory lookup.
+
+# === CONFIG === #
+HOST, PORT = "127.0.0.1", 8765
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Sea ice phase tiles</title>
+<style>
+ body { font-family: sans-serif; margin: 0; display: flex; height: 100vh; }
+ #map { flex: 1; overflow: auto; background: #eee; position: relative; }
+ #grid { position: relative; cursor: crosshair; }
+ #grid img { position: absolute; width: TILEpx; height: TILEpx; image-rendering: pixelated; }
+ #side { width: 360px; padding: 10px; overflow: auto; }
+ table { border-collapse: collapse; font-size: 12px; } td, th { padding: 1px 6px; text-align: right; }
+</style></head>
+<body><div id="map"><div id="grid"></div></div>
+<div id="side">
+ <select id="layer"></select> <select id="key"></select>
+ <button id="out">−</button><button id="in">+</button> <span id="zoom"></span>
+ <div id="range"></div><h4 id="cell">Click a pixel</h4><svg id="plot" width="340" height="200"></svg>
+ <table id="table"></table>
+</div>
+<script>
+let meta, layers, z = 1;
+const $ = id => document.getElementById(id);
+async function init() {
+  const r = await (await fetch("/layers")).json();
+  meta = r.metadata; layers = r.layers;
+  for (const l of Object.keys(layers)) $("layer").add(new Option(l, l));
+  $("layer").onchange = () => { fillKeys(); draw(); };
+  $("key").onchange = draw;
+  $("in").onclick = () => { z = Math.min(z + 1, meta.levels - 1); draw(); };
+  $("out").onclick = () => { z = Math.max(z - 1, 0); draw(); };
+  $("grid").onclick = click;
+  fillKeys(); draw();
+}
+function fillKeys() {
+  $("key").innerHTML = "";
+  for (const k of layers[$("layer").value]) $("key").add(new Option(k, k));
+}
+function draw() {
+  const layer = $("layer").value, key = $("key").value, n = 1 << z, g = $("grid");
+  const style = meta.styles[layer.split("_")[1] || layer];
+  $("range").textContent = `${style.cmap}: ${style.vmin} … ${style.vmax}`;
+  $("zoom").textContent = `zoom ${z}`;
+  g.innerHTML = ""; g.style.width = g.style.height = (n * meta.tile) + "px";
+  for (let ty = 0; ty < n; ty++) for (let tx = 0; tx < n; tx++) {
+    const img = new Image();
+    img.onerror = () => img.remove();
+    img.src = `/tiles/${layer}/${key}/${z}/${tx}/${ty}.png`;
+    img.style.left = (tx * meta.tile) + "px"; img.style.top = (ty * meta.tile) + "px";
+    g.appendChild(img);
+  }
+}
+async function click(e) {
+  const rect = $("grid").getBoundingClientRect(), size = meta.tile << z, n = Math.max(meta.ny, meta.nx);
+  const col = Math.floor((e.clientX - rect.left) * n / size), row = Math.floor((e.clientY - rect.top) * n / size);
+  if (row >= meta.ny || col >= meta.nx) return;
+  const s = await (await fetch(`/series?row=${row}&col=${col}`)).json();
+  $("cell").textContent = `row ${row}, col ${col}  (x ${s.x / 1000} km, y ${s.y / 1000} km)`;
+  plot(s);
+  let html = "<tr><th>year</th>" + s.fields.map(f => `<th>${f}</th>`).join("") + "</tr>";
+  s.years.forEach((y, i) => {
+    html += `<tr><td>${y}</td>` + s.fields.map(f => `<td>${s[f][i] ?? ""}</td>`).join("") + "</tr>";
+  });
+  $("table").innerHTML = html;
+}
+function plot(s) {
+  const w = 340, h = 200, colors = ["#1f77b4", "#d62728", "#2ca02c"];
+  const vals = s.fields.flatMap(f => s[f]).filter(v => v !== null);
+  if (!vals.length) { $("plot").innerHTML = ""; return; }
+  const lo = Math.min(...vals), hi = Math.max(...vals) + 1e-9, y0 = s.years[0], y1 = s.years.at(-1);
+  const px = y => 30 + (y - y0) / Math.max(y1 - y0, 1) * (w - 40), py = v => h - 20 - (v - lo) / (hi - lo) * (h - 30);
+  let svg = `<text x="0" y="12" font-size="10">${Math.round(hi)}</text><text x="0" y="${h - 20}" font-size="10">${Math.round(lo)}</text>`;
+  s.fields.forEach((f, k) => {
+    const pts = s.years.map((y, i) => s[f][i] === null ? "" : `${px(y)},${py(s[f][i])}`).filter(Boolean).join(" ");
+    svg += `<polyline fill="none" stroke="${colors[k]}" points="${pts}"/><text x="${40 + 90 * k}" y="${h - 4}" font-size="11" fill="${colors[k]}">${f}</text>`;
+  });
+  $("plot").innerHTML = svg;
+}
+init();
+</script></body></html>
+"""
+
+
+class ViewerHandler(BaseHTTPRequestHandler):
+    archive = ARCHIVE
+    metadata = None
+    years = None
+    cubes = None
+    layers = None
+    _local = threading.local()
+
+    def _db(self):
+        if not hasattr(self._local, "db"):
+            self._local.db = sqlite3.connect(f"file:{self.archive}?mode=ro", uri=True)
+        return self._local.db
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if content_type == "image/png":
+            self.send_header("Cache-Control", "max-age=3600")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, obj, status=200):
+        self._send(json.dumps(obj).encode(), "application/json", status)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if url.path == "/":
+            self._send(PAGE.replace("TILEpx", f"{self.metadata['tile']}px").encode(), "text/html; charset=utf-8")
+        elif url.path == "/layers":
+            self._json({"metadata": self.metadata, "layers": self.layers})
+        elif parts[0] == "tiles" and len(parts) == 6 and parts[5].endswith(".png"):
+            layer, key = parts[1], parts[2]
+            try:
+                z, x, y = int(parts[3]), int(parts[4]), int(parts[5][:-4])
+            except ValueError:
+                self.send_error(400, "tile z / x / y must be integers")
+                return
+            row = self._db().execute("SELECT data FROM tiles WHERE layer = ? AND key = ? AND z = ? AND x = ? AND y = ?",
+                                     (layer, key, z, x, y)).fetchone()
+            if row is None:
+                self._send(b"", "text/plain", status=404)
+            else:
+                self._send(row[0], "image/png")
+        elif url.path == "/series":
+            query = parse_qs(url.query)
+            try:
+                row, col = int(query["row"][0]), int(query["col"][0])
+            except (KeyError, ValueError):
+                self.send_error(400, "series needs integer row and col parameters")
+                return
+            if not (0 <= row < self.metadata["ny"] and 0 <= col < self.metadata["nx"]):
+                self._json({"error": "outside the grid"}, status=400)
+                return
+            out = {"row": row, "col": col, "years": self.years, "fields": list(FIELDS),
+                   "x": self.metadata["x0"] + col * self.metadata["dx"],
+                   "y": self.metadata["y0"] + row * self.metadata["dy"]}
+            for name, cube in self.cubes.items():
+                values = cube[:, row, col]
+                out[name] = [None if np.isnan(v) else round(float(v), 1) for v in values]
+            self._json(out)
+        else:
+            self._send(b"not found", "text/plain", status=404)
+
+    def log_message(self, format, *args):
+        pass  # keep the console for the start-up line
+
+
+def serve(archive=ARCHIVE, host=HOST, port=PORT):
+    if not os.path.exists(archive):
+        raise RuntimeError(f"❌ No tile archive at {archive}; run tiles.py first")
+    db = sqlite3.connect(f"file:{archive}?mode=ro", uri=True)
+    ViewerHandler.archive = archive
+    ViewerHandler.metadata = read_metadata(db)
+    ViewerHandler.cubes = {}
+    for name in FIELDS:
+        ViewerHandler.years, ViewerHandler.cubes[name] = read_series(db, name)
+    layers = {}
+    for layer, key in db.execute("SELECT DISTINCT layer, key FROM tiles ORDER BY layer, key"):
+        layers.setdefault(layer, []).append(key)
+    ViewerHandler.layers = layers
+    db.close()
+
+    server = ThreadingHTTPServer((host, port), ViewerHandler)
+    print(f"🔹 Serving {archive} at http://{host}:{port}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,19 +1,21 @@
-import xarray as xr
 import numpy as np
-import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
 import os
-from glob import glob
+import sys
+from figjobs import figure_job, run_jobs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from paths import ROOT
+from phase_io import load_phase_stack, phase_files
 
 # === CONFIG === #
-INPUT_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-SAVE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/trends/"
+INPUT_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+SAVE_DIR = os.path.join(ROOT, "results/figures/trends/")
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 YEAR_START = 1979
 YEAR_END = 2024
 YEAR_SPLIT = 2016
+FORCE = False  # True: re-render even where the PNG is newer than its phase files
 
 periods = {
     "full": (1979, 2024),
@@ -21,33 +23,6 @@ periods = {
     "post2016": (2016, 2024),
 }
 
-# === LOAD STACKS === #
-advance_stack, retreat_stack = [], []
-years = []
-
-files = sorted(glob(f"{INPUT_DIR}/seaice_phases_SMMR_*.nc"))
-for f in files:
-    year = int(os.path.basename(f).split("_")[-1].split(".")[0])
-    if YEAR_START <= year <= YEAR_END:
-        ds = xr.open_dataset(f)
-        adv_var = f"advance_{year}"
-        ret_var = f"retreat_{year}"
-        if adv_var in ds and ret_var in ds:
-            advance_stack.append(ds[adv_var])
-            retreat_stack.append(ds[ret_var])
-            years.append(year)
-        else:
-            print(f"⚠️ Missing {adv_var} or {ret_var} in {f}")
-
-advance = xr.concat(advance_stack, dim="year")
-retreat = xr.concat(retreat_stack, dim="year")
-advance["year"] = years
-retreat["year"] = years
-
-# === Compute Duration === #
-duration = retreat - advance  # retreat DOY minus advance DOY
-duration = duration.where(duration > 0)  # mask nonsensical negative durations
-
 # === TREND FUNCTION === #
 def compute_trend(da, start, end):
     da_sel = da.sel(year=slice(start, end))
@@ -65,33 +40,35 @@ def compute_trend(da, start, end):
 
     return slope
 
-# === PLOTTING FUNCTION === #
-def plot_trend(trend, title, save_path, vmin=-2, vmax=2):
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw={'projection': ccrs.SouthPolarStereo()})
-
-    im = ax.pcolormesh(
-        advance.x, advance.y, trend,
-        transform=ccrs.SouthPolarStereo(),
-        cmap="coolwarm", vmin=vmin, vmax=vmax, shading="auto"
-    )
-    ax.set_extent([-180, 180, -90, -50], crs=ccrs.PlateCarree())
-    ax.add_feature(cfeature.LAND, zorder=100, facecolor="gray")
-    ax.coastlines(linewidth=0.4)
-
-    cbar = plt.colorbar(im, ax=ax, orientation="horizontal", pad=0.05)
-    cbar.set_label("Trend (days/year)", fontsize=10)
-    cbar.ax.tick_params(labelsize=8)
-    cbar.outline.set_visible(False)
-
-    ax.set_title(title, fontsize=12, fontweight="bold", pad=10)
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=400)
-    plt.close()
-
-# === RUN FOR EACH PERIOD === #
+# === STACK + TREND (run inside the figure workers) === #
+_stack = {}  # per-worker cache: the full record is loaded once, not once per job
+
+
+def phase_stack():
+    if not _stack:
+        _stack["advance"], _stack["retreat"] = load_phase_stack(INPUT_DIR, "SMMR", YEAR_START, YEAR_END)
+    return _stack["advance"], _stack["retreat"]
+
+
+def select_trend(start, end):
+    advance, retreat = phase_stack()
+    duration = retreat - advance  # retreat DOY minus advance DOY
+    duration = duration.where(duration > 0)  # mask nonsensical negative durations
+    return duration.isel(year=0, drop=True).copy(data=compute_trend(duration, start, end))
+
+
+# === ONE JOB PER PERIOD === #
+trend_layout = dict(
+    panels=[dict(cmap="coolwarm", vmin=-2, vmax=2, label="Trend (days/year)", title_pad=10)],
+    tight_layout=True,
+)
+
+jobs = []
 for label, (start, end) in periods.items():
-    print(f"🔹 Processing duration {label}: {start}-{end}")
-    dur_trend = compute_trend(duration, start, end)
-    plot_trend(dur_trend, f"Duration Trend ({start}-{end})", f"{SAVE_DIR}/duration_trend_{label}.png")
+    inputs = [path for _, path in phase_files(INPUT_DIR, "SMMR", start, end)]
+    jobs.append(figure_job((select_trend, start, end), trend_layout,
+                           f"{SAVE_DIR}/duration_trend_{label}.png", inputs=inputs,
+                           titles=f"Duration Trend ({start}-{end})", dpi=400, bbox_inches=None))
 
-print("✅ All duration trend maps done!")
+if __name__ == "__main__":
+    run_jobs(jobs, force=FORCE)
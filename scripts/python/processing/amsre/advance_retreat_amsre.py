@@ -3,98 +3,102 @@ import numpy as np
 import os
 from tqdm import tqdm
 import gc
+import sys
 import calendar
 
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from backend import detect_season_lazy, open_sic, start_backend
+from detect import QUALITY_FLAGS, circumpolar_metrics, detect_season
+from paths import AMSRE_MERGED_FILE, ROOT
+from sic_codes import open_sic_codes
+from zonal import cell_areas
+
 # === CONFIGURATION === #
-INPUT_FILE = "/user/geog/falejandraperez/sea-ice-phase/data/SIC_07132012_04082025_merged.nc"
-OUTPUT_DIR = "/user/geog/falejandraperez/sea-ice-phase/results/AMSRE_phase/"
+INPUT_FILE = AMSRE_MERGED_FILE
+OUTPUT_DIR = os.path.join(ROOT, "results/AMSRE_phase/")
 CONC_VAR = "SI_12km_SH_ICECON_DAY_SpPolarGrid12km"
-THRESHOLD = 15  # AMSRE SIC is in percent
+THRESHOLD = 15  # percent, tested on the uint8 SIC codes
+SIC_SCALE = 100.0  # legacy float files are in percent
 WINDOW = 5
-
-# === HELPER FUNCTION === #
-def find_first_event(data, threshold, window, above=True):
-    condition = data > threshold if above else data < threshold
-    rolling = condition.rolling(time=window).construct("window")
-    hits = rolling.all("window")
-    if not hits.any():
-        return np.nan
-    return int(hits.argmax("time").item())
-
-# === LOAD DATA === #
-ds = xr.open_dataset(INPUT_FILE)
-ice = ds[CONC_VAR].astype("float32")
-ice = ice.where(ice < 110)  # mask land and missing
-
-all_years = np.unique(ds.time.dt.year.values)
-x, y = ds.x.size, ds.y.size
-
-# === MAIN LOOP === #
-for year in tqdm(all_years[:-1], desc="Processing AMSRE phase years"):
-    next_year = year + 1
-
-    # Define cross-year windows
-    retreat_start = f"{year}-08-25"
-    retreat_end = f"{next_year}-02-29" if calendar.isleap(next_year) else f"{next_year}-02-28"
-    advance_start = f"{year}-03-25"
-    advance_end = f"{year}-09-15"
-
-    try:
-        data_retreat = ice.sel(time=slice(retreat_start, retreat_end))
-        data_advance = ice.sel(time=slice(advance_start, advance_end))
-    except KeyError:
-        continue
-
-    if data_retreat.time.size < 60 or data_advance.time.size < 60:
-        continue
-
-    doy_retreat = data_retreat.time.dt.dayofyear
-    doy_advance = data_advance.time.dt.dayofyear
-
-    advance = np.full((y, x), np.nan)
-    retreat = np.full((y, x), np.nan)
-
-    for j in range(y):
-        for i in range(x):
-            ts_r = data_retreat[:, j, i]
-            ts_a = data_advance[:, j, i]
-            if ts_r.isnull().all() and ts_a.isnull().all():
-                continue
-
-            try:
-                # --- RETREAT ---
-                rt = ts_r.where((doy_retreat >= 237) | (doy_retreat <= 59), drop=True)  # Aug 25–Feb 28/29
-                if (rt > THRESHOLD).any():
-                    idx_rt = find_first_event(rt, THRESHOLD, WINDOW, above=False)
-                    if not np.isnan(idx_rt):
-                        retreat[j, i] = rt.time[idx_rt].dt.dayofyear.item()
-
-                # --- ADVANCE ---
-                ad = ts_a.where((doy_advance >= 84) & (doy_advance <= 258), drop=True)  # Mar 25–Sep 15
-                if (ad > THRESHOLD).any():
-                    idx_ad = find_first_event(ad, THRESHOLD, WINDOW, above=True)
-                    if not np.isnan(idx_ad):
-                        advance[j, i] = ad.time[idx_ad].dt.dayofyear.item()
-
-            except Exception:
-                continue
-
-    out_ds = xr.Dataset(
-        {
-            f"advance_{year}": (("y", "x"), advance),
-            f"retreat_{year}": (("y", "x"), retreat),
-        },
-        coords={"x": ds.x, "y": ds.y},
-        attrs={
-            "description": f"AMSRE Advance & Retreat | THRESHOLD={THRESHOLD}, WINDOW={WINDOW}, Year={year}"
-        }
-    )
-
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    out_file = os.path.join(OUTPUT_DIR, f"seaice_phases_AMSRE_{year}.nc")
-    out_ds.to_netcdf(out_file)
-    print(f"✅ Saved {out_file}")
-
-    del advance, retreat, out_ds, data_retreat, data_advance
-    gc.collect()
-
+DIAGNOSTICS = True  # crossings, event run lengths, ice days and quality flag per pixel
+BACKEND = "numpy"  # "dask": spatially chunked SIC, detection per chunk on the dask scheduler
+N_WORKERS = 0  # dask only: 0 = single process, >0 = LocalCluster workers
+
+def run(input_file=INPUT_FILE, output_dir=OUTPUT_DIR, backend=BACKEND, n_workers=N_WORKERS,
+        threshold=THRESHOLD, window=WINDOW, diagnostics=DIAGNOSTICS):
+    # === LOAD DATA === #
+    ds = xr.open_dataset(input_file)
+    client = None
+    if backend == "dask":
+        client = start_backend(n_workers)
+        ice = open_sic(input_file, CONC_VAR, SIC_SCALE)
+    else:
+        ice = open_sic_codes(input_file, CONC_VAR, SIC_SCALE)  # land / missing are reserved codes
+
+    all_years = np.unique(ds.time.dt.year.values)
+    areas = cell_areas(ds.x.values, ds.y.values)
+    metrics = []
+
+    # === MAIN LOOP === #
+    for year in tqdm(all_years[:-1], desc="Processing AMSRE phase years"):
+        next_year = year + 1
+
+        # Define cross-year windows
+        retreat_start = f"{year}-08-25"
+        retreat_end = f"{next_year}-02-29" if calendar.isleap(next_year) else f"{next_year}-02-28"
+        advance_start = f"{year}-03-25"
+        advance_end = f"{year}-09-15"
+
+        try:
+            data_retreat = ice.sel(time=slice(retreat_start, retreat_end))
+            data_advance = ice.sel(time=slice(advance_start, advance_end))
+        except KeyError:
+            continue
+
+        if data_retreat.time.size < 60 or data_advance.time.size < 60:
+            continue
+
+        doy_retreat = data_retreat.time.dt.dayofyear
+        doy_advance = data_advance.time.dt.dayofyear
+
+        # --- RETREAT / ADVANCE, all pixels at once ---
+        rt = data_retreat.isel(time=((doy_retreat >= 237) | (doy_retreat <= 59)).values)  # Aug 25–Feb 28/29
+        ad = data_advance.isel(time=((doy_advance >= 84) & (doy_advance <= 258)).values)  # Mar 25–Sep 15
+        if backend == "dask":
+            lazy = detect_season_lazy(rt, ad, threshold, window, metrics=True, diagnostics=diagnostics)
+            fields = {name: values.values for name, values in lazy.compute().items()}
+        else:
+            fields = detect_season(rt, ad, threshold, window, metrics=True, diagnostics=diagnostics)
+        metrics.append({"Year": year, **circumpolar_metrics(fields, areas)})
+
+        out_ds = xr.Dataset(
+            {
+                f"{name}_{year}": (("y", "x"), values) for name, values in fields.items()
+            },
+            coords={"x": ds.x, "y": ds.y},
+            attrs={
+                "description": f"AMSRE Advance & Retreat | THRESHOLD={threshold}, WINDOW={window}, Year={year}",
+                "quality_flags": ", ".join(f"{k}={v}" for k, v in QUALITY_FLAGS.items()),
+            }
+        )
+
+        os.makedirs(output_dir, exist_ok=True)
+        out_file = os.path.join(output_dir, f"seaice_phases_AMSRE_{year}.nc")
+        out_ds.to_netcdf(out_file)
+        print(f"✅ Saved {out_file}")
+
+        del fields, out_ds, data_retreat, data_advance, rt, ad
+        gc.collect()
+
+    # === CIRCUMPOLAR PHASE METRICS === #
+    summary_file = os.path.join(output_dir, "summary_phase_metrics_AMSRE.csv")
+    pd.DataFrame(metrics).to_csv(summary_file, index=False)
+    print(f"✅ Saved {summary_file}")
+    if client is not None:
+        client.close()
+
+
+if __name__ == "__main__":  # dask workers re-import this script
+    run()
@@ -1,13 +1,17 @@
 import os
+import sys
 import h5py
 import xarray as xr
 import numpy as np
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from paths import AMSRE_DAILY_DIR, AMSRE_RAW_DIR
+from sic_codes import CODE_ATTRS, encode_sic
+
 # ---- CONFIG ----
-RAW_DIR = "data/amsre/raw"
-OUT_DIR = "data/amsre/daily_nc"
-os.makedirs(OUT_DIR, exist_ok=True)
+RAW_DIR = AMSRE_RAW_DIR
+OUT_DIR = AMSRE_DAILY_DIR
 
 def extract_date(filename):
     # e.g., AMSR_E_L3_SeaIce12km_B04_20230101.he5
@@ -18,33 +22,39 @@ def extract_date(filename):
     return None
 
 # ---- CONVERSION ----
-files = sorted([f for f in os.listdir(RAW_DIR) if f.endswith(".he5")])
-
-for fname in tqdm(files, desc="Converting HE5 to NetCDF"):
-    date = extract_date(fname)
-    if not date:
-        print(f"⚠️ Skipping {fname}: date not found")
-        continue
-
-    in_path = os.path.join(RAW_DIR, fname)
-    out_path = os.path.join(OUT_DIR, f"SIC_{date}.nc")
-
-    try:
-        with h5py.File(in_path, "r") as f:
-            # Adjust this path if needed (this is common for AMSRE)
-            sic = f["HDFEOS/GRIDS/PolarGrid/Data Fields/Sea_Ice_Concentration"][:]
-
-            # Convert to proper units (often scaled by 10)
-            sic = sic.astype(np.float32) / 10.0
-            sic[sic > 100] = np.nan  # Mask fill values or bad data
-
-            # Wrap in xarray
-            da = xr.DataArray(sic, dims=("y", "x"), name="sic")
-            da.attrs["units"] = "percent"
-            da.attrs["long_name"] = "Sea Ice Concentration"
-            ds = xr.Dataset({"sic": da})
-            ds.attrs["source_file"] = fname
-
-            ds.to_netcdf(out_path)
-    except Exception as e:
-        print(f"❌ Failed to convert {fname}: {e}")
+def convert_amsre(raw_dir=RAW_DIR, out_dir=OUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    files = sorted([f for f in os.listdir(raw_dir) if f.endswith(".he5")])
+
+    for fname in tqdm(files, desc="Converting HE5 to NetCDF"):
+        date = extract_date(fname)
+        if not date:
+            print(f"⚠️ Skipping {fname}: date not found")
+            continue
+
+        in_path = os.path.join(raw_dir, fname)
+        out_path = os.path.join(out_dir, f"SIC_{date}.nc")
+
+        try:
+            with h5py.File(in_path, "r") as f:
+                # Adjust this path if needed (this is common for AMSRE)
+                sic = f["HDFEOS/GRIDS/PolarGrid/Data Fields/Sea_Ice_Concentration"][:]
+
+                # Convert to proper units (often scaled by 10)
+                sic = sic.astype(np.float32) / 10.0
+                codes = encode_sic(sic, scale=100.0)  # uint8 percent, fill values -> reserved codes
+
+                # Wrap in xarray
+                da = xr.DataArray(codes, dims=("y", "x"), name="sic")
+                da.attrs.update(CODE_ATTRS)
+                da.attrs["long_name"] = "Sea Ice Concentration"
+                ds = xr.Dataset({"sic": da})
+                ds.attrs["source_file"] = fname
+
+                ds.to_netcdf(out_path)
+        except Exception as e:
+            print(f"❌ Failed to convert {fname}: {e}")
+
+
+if __name__ == "__main__":
+    convert_amsre()
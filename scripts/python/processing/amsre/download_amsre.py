@@ -1,36 +1,43 @@
 # download_amsre.py
 
-import earthaccess
+import os
+import sys
 from datetime import datetime
 
-# === AUTHENTICATION ===
-earthaccess.login()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from paths import AMSRE_RAW_DIR
 
 # === CONFIG ===
 
 # Date range (feel free to edit)
-start_date = "2024-07-09"
-end_date = datetime.today().strftime("%Y-%m-%d")
+START_DATE = "2024-07-09"
+END_DATE = datetime.today().strftime("%Y-%m-%d")
 
-# Output directory
-# LOCAL:
-output_dir = "/data/processed/amsre/raw/"
+# Output directory (convert_amsre.py reads it)
+OUTPUT_DIR = AMSRE_RAW_DIR
 
-# CLUSTER substitute:
-# output_dir = "/user/geog/falejandraperez/sea-ice-phase/data/amsre/raw/"
 
-# === SEARCH ===
+def download_amsre(start_date=START_DATE, end_date=END_DATE, output_dir=OUTPUT_DIR):
+    import earthaccess
 
-print(f"Searching for AU_SI12 granules from {start_date} to {end_date}...")
-results = earthaccess.search_data(
-    short_name="AU_SI12",
-    temporal=(start_date, end_date),
-    bounding_box=(-180, -90, 180, -50)  # Southern Hemisphere
-)
+    # === AUTHENTICATION ===
+    earthaccess.login()
 
-print(f"Found {len(results)} granules.")
+    # === SEARCH ===
+    print(f"Searching for AU_SI12 granules from {start_date} to {end_date}...")
+    results = earthaccess.search_data(
+        short_name="AU_SI12",
+        temporal=(start_date, end_date),
+        bounding_box=(-180, -90, 180, -50)  # Southern Hemisphere
+    )
 
-# === DOWNLOAD ===
+    print(f"Found {len(results)} granules.")
 
-downloaded = earthaccess.download(results, output_dir)
-print(f"✅ Downloaded {len(downloaded)} granules to: {output_dir}")
+    # === DOWNLOAD ===
+    downloaded = earthaccess.download(results, output_dir)
+    print(f"✅ Downloaded {len(downloaded)} granules to: {output_dir}")
+    return downloaded
+
+
+if __name__ == "__main__":
+    download_amsre()
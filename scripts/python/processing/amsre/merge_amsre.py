@@ -1,17 +1,29 @@
-import xarray as xr
 import os
+import sys
+
+import xarray as xr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from paths import AMSRE_DAILY_DIR, AMSRE_MERGED_FILE
+
+DAILY_DIR = AMSRE_DAILY_DIR
+MERGED_FILE = AMSRE_MERGED_FILE  # advance_retreat_amsre.py input
+
+
+def merge_amsre(daily_dir=DAILY_DIR, merged_file=MERGED_FILE):
+    ds = xr.open_mfdataset(
+        os.path.join(daily_dir, "SIC_*.nc"),
+        combine="nested",
+        concat_dim="time",
+        preprocess=lambda d: d.expand_dims("time"),
+        parallel=True,
+        mask_and_scale=False  # keep the uint8 SIC codes of the daily files
+    )
 
-DAILY_DIR = "data/amsre/daily_nc"
-MERGED_FILE = "data/amsre/SIC_07132012_01012024.nc"
+    ds = ds.sortby("time")  # Just in case
+    ds.to_netcdf(merged_file)
+    print(f"✅ Merged file saved to {merged_file}")
 
-ds = xr.open_mfdataset(
-    os.path.join(DAILY_DIR, "SIC_*.nc"),
-    combine="nested",
-    concat_dim="time",
-    preprocess=lambda d: d.expand_dims("time"),
-    parallel=True
-)
 
-ds = ds.sortby("time")  # Just in case
-ds.to_netcdf(MERGED_FILE)
-print(f"✅ Merged file saved to {MERGED_FILE}")
+if __name__ == "__main__":
+    merge_amsre()
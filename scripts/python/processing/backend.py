@@ -0,0 +1,131 @@
+import os
+
+import xarray as xr
+
+from climatology import FIELDS
+from detect import WINDOW, detect_arrays, output_names, season_axes
+from paths import ROOT
+from phase_io import phase_files, season_fields
+from sic_codes import open_sic_codes
+
+# Optional dask execution backend. SIC is opened with spatial chunks (time kept whole,
+# since the detector needs each pixel's full season), and the detector runs through
+# xr.apply_ufunc with a (time) -> scalar core dimension per output field, so every
+# spatial chunk is one detect_arrays call on a worker. The phase stack, the trend
+# and the climatology below are dask-backed too and stay lazy until written.
+#
+# n_workers=0 runs everything in-process on the synchronous scheduler (tests, small
+# grids); n_workers>0 starts a distributed LocalCluster (one thread per worker, so the
+# NumPy kernels do not oversubscribe) that spills to local disk under memory pressure.
+
+# === CONFIG === #
+SENSOR = "SMMR"
+PHASE_DIR = os.path.join(ROOT, "results/{sensor}_phase/")  # filled with the sensor
+OUT_FILE = os.path.join(ROOT, "results/climatology/phase_products_lazy_{sensor}.nc")
+SPATIAL_CHUNKS = {"y": 83, "x": 79}  # 4 x 4 tiles of the 332 x 316 grid
+PHASE_CHUNKS = {"y": 166, "x": 158}
+N_WORKERS = 0
+MEMORY_LIMIT = "4GB"  # per worker, before spilling
+
+
+# === CLUSTER === #
+def start_backend(n_workers=N_WORKERS, memory_limit=MEMORY_LIMIT):
+    # Returns the distributed Client (None for the synchronous scheduler)
+    import dask  # imported here so the numpy-backend scripts do not pay for it
+    if not n_workers:
+        dask.config.set(scheduler="synchronous")
+        return None
+    from distributed import Client, LocalCluster
+    cluster = LocalCluster(n_workers=n_workers, threads_per_worker=1, memory_limit=memory_limit)
+    client = Client(cluster)
+    print(f"🔹 Dask LocalCluster with {n_workers} workers: {client.dashboard_link}")
+    return client
+
+
+# === SIC / DETECTION === #
+def open_sic(path, var, legacy_scale=1.0, chunks=SPATIAL_CHUNKS):
+    # uint8 SIC codes (sic_codes.open_sic_codes), chunked in space only
+    return open_sic_codes(path, var, legacy_scale, chunks={"time": -1, **chunks})
+
+
+def _detect_chunk(rt, ad, axes, names, threshold, window, metrics, diagnostics):
+    # rt: (..., time_rt), ad: (..., time_ad) numpy blocks -> one (...) array per output
+    shape = rt.shape[:-1]
+    res = detect_arrays(rt.reshape(-1, rt.shape[-1]).T, ad.reshape(-1, ad.shape[-1]).T, axes,
+                        threshold, window, metrics, diagnostics)
+    return tuple(res[name].reshape(shape) for name in names)
+
+
+def detect_season_lazy(data_retreat, data_advance, threshold, window=WINDOW, metrics=False, diagnostics=False):
+    # dask-backed counterpart of detect.detect_season: Dataset of lazy (y, x) fields
+    axes = season_axes(data_retreat["time"], data_advance["time"])
+    names = output_names(metrics, diagnostics)
+    rt = data_retreat.rename(time="time_rt").drop_vars("time_rt").chunk({"time_rt": -1})
+    ad = data_advance.rename(time="time_ad").drop_vars("time_ad").chunk({"time_ad": -1})
+    outputs = xr.apply_ufunc(
+        _detect_chunk, rt, ad,
+        input_core_dims=[["time_rt"], ["time_ad"]],
+        output_core_dims=[[] for _ in names],
+        kwargs=dict(axes=axes, names=names, threshold=threshold, window=window,
+                    metrics=metrics, diagnostics=diagnostics),
+        dask="parallelized",
+        output_dtypes=["float64"] * len(names),
+    )
+    return xr.Dataset(dict(zip(names, outputs)))
+
+
+# === LAZY PHASE PRODUCTS === #
+def open_phase_stack(phase_dir, sensor="SMMR", year_start=None, year_end=None, chunks=PHASE_CHUNKS):
+    # dask-backed (year, y, x) advance / raw retreat, as phase_io.load_phase_stack
+    advance, retreat, years = [], [], []
+    for year, path in phase_files(phase_dir, sensor, year_start, year_end):
+        ds = xr.open_dataset(path, chunks=chunks)
+        if f"advance_{year}" not in ds or f"retreat_{year}" not in ds:
+            continue
+        advance.append(ds[f"advance_{year}"].rename("advance"))
+        retreat.append(ds[f"retreat_{year}"].rename("retreat"))
+        years.append(year)
+    if not years:
+        raise RuntimeError(f"❌ No valid advance/retreat variables found in {phase_dir}")
+    advance = xr.concat(advance, dim="year").assign_coords(year=years)
+    retreat = xr.concat(retreat, dim="year").assign_coords(year=years)
+    return advance, retreat
+
+
+def lazy_trend(field):
+    # OLS slope per pixel (units/year); NaN wherever a season is missing, as np.polyfit
+    x = field["year"].astype("float64")
+    x = x - x.mean()
+    y = field - field.mean("year", skipna=False)
+    return (x * y).sum("year", skipna=False) / (x ** 2).sum()
+
+
+def lazy_products(advance, retreat):
+    # climatology mean / std / count and the linear trend of every field, all lazy
+    fields = season_fields(advance, retreat)
+    data = {}
+    for name in FIELDS:
+        field = fields[name]
+        data[f"{name}_mean"] = field.mean("year")
+        data[f"{name}_std"] = field.std("year")
+        data[f"{name}_count"] = field.count("year")
+        data[f"{name}_trend"] = lazy_trend(field)
+    return xr.Dataset(data)
+
+
+def write_products(phase_dir=None, out_file=None, sensor=SENSOR, n_workers=N_WORKERS):
+    # phase_dir / out_file default to the sensor's phase directory and product file
+    phase_dir = phase_dir or PHASE_DIR.format(sensor=sensor)
+    out_file = out_file or OUT_FILE.format(sensor=sensor)
+    client = start_backend(n_workers)
+    products = lazy_products(*open_phase_stack(phase_dir, sensor))
+    products.attrs["description"] = f"{sensor} phase mean / std / count / trend (dask backend)"
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+    products.to_netcdf(out_file)  # the whole graph runs here
+    print(f"✅ Saved {out_file}")
+    if client is not None:
+        client.close()
+
+
+if __name__ == "__main__":
+    write_products()
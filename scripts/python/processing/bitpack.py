@@ -0,0 +1,333 @@
+import calendar
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from detect import MAX_GAP_DAYS, QUALITY_FLAGS, WINDOW, longest_gap, output_names, record_days, season_axes
+from paths import ROOT, SMMR_MERGED_FILE
+from sic_codes import VALID_MAX, exceedance, open_sic_codes
+from zonal import cell_areas
+
+# Bit-packed exceedance cache. For one threshold the above / below / valid masks of the
+# whole SIC record are packed along time (record t in bit t % 8 of byte t // 8, per
+# pixel) and written once next to the SIC file, an eighth of the uint8 cube per mask.
+# A season is read back as a byte range and shifted into (word, pixel) uint64 words,
+# record t in bit t % 64 of word t // 64, and the detector runs on the words:
+#   run of WINDOW records ending at t   AND of the mask shifted by 0..WINDOW-1, built by
+#                                       doubling (log2(WINDOW) shifts)
+#   first event                         lowest set bit (isolate with x & -x, popcount x - 1)
+#   crossings                           popcount(state ^ (state >> 1)) on valid records, the
+#                                       state carried over gaps by a doubling forward fill
+#   ice days                            popcount(above & records with the same spacing) * spacing
+# so repeated analyses at the same threshold (window sensitivity, diagnostics) never
+# read SIC again. Results match detect.detect_arrays on the uint8 codes; the phase
+# metrics need SIC values and stay with detect.py.
+
+# === CONFIG === #
+SIC_FILE = SMMR_MERGED_FILE
+OUT_DIR = os.path.join(ROOT, "results/sensitivity/")
+CONC_VAR = "N07_ICECON"
+SIC_SCALE = 1.0  # legacy float files only
+THRESHOLD = 15  # percent code
+WINDOWS = (3, 4, 5, 6, 7)
+CHUNK_RECORDS = 512  # records per packing pass, a multiple of 8
+MASKS = ("above", "below", "valid")
+WORD = 64
+ALL_BITS = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+# === PACKING === #
+def bytes_to_words(packed):
+    # (byte, ...) uint8 little-endian bit order -> (word, ...) uint64
+    n_words = max(-(-packed.shape[0] // 8), 1)
+    padded = np.zeros((n_words * 8,) + packed.shape[1:], dtype=np.uint8)
+    padded[:packed.shape[0]] = packed
+    padded = padded.reshape((n_words, 8) + packed.shape[1:])
+    words = np.zeros((n_words,) + packed.shape[1:], dtype=np.uint64)
+    for k in range(8):
+        words |= padded[:, k].astype(np.uint64) << np.uint64(8 * k)
+    return words
+
+
+def pack_bits(condition):
+    # (time, ...) bool -> (word, ...) uint64
+    return bytes_to_words(np.packbits(condition, axis=0, bitorder="little"))
+
+
+def unpack_bits(words, n):
+    # (word, ...) uint64 -> (n, ...) bool
+    shifts = np.arange(WORD, dtype=np.uint64).reshape((1, WORD) + (1,) * (words.ndim - 1))
+    bits = (words[:, None] >> shifts) & np.uint64(1)
+    return bits.reshape((-1,) + words.shape[1:])[:n].astype(bool)
+
+
+def shift(words, k):
+    # move record t to t + k (k > 0, later) or t + k (k < 0, earlier); zeros shifted in
+    q, r = divmod(abs(k), WORD)
+    n = words.shape[0]
+    out = np.zeros_like(words)
+    if q >= n:
+        return out
+    if k >= 0:
+        src = words[:n - q]
+        out[q:] = src << np.uint64(r)
+        if r:
+            out[q + 1:] |= src[:-1] >> np.uint64(WORD - r)
+    else:
+        src = words[q:]
+        out[:n - q] = src >> np.uint64(r)
+        if r:
+            out[:n - q - 1] |= src[1:] << np.uint64(WORD - r)
+    return out
+
+
+def range_mask(n_words, start, stop):
+    # (word,) uint64 with the bits of records start..stop-1 set
+    records = np.arange(n_words * WORD)
+    return pack_bits((records >= start) & (records < stop))
+
+
+def _column(mask, ndim):
+    return mask.reshape((-1,) + (1,) * (ndim - 1))
+
+
+def popcount(words, mask=None):
+    # (pixel,) number of set bits, optionally within a (word,) record mask
+    if mask is not None:
+        words = words & _column(mask, words.ndim)
+    return np.bitwise_count(words).sum(axis=0, dtype="int64")
+
+
+def first_set(words):
+    # (pixel,) record of the lowest set bit, -1 where there is none
+    nonzero = words != 0
+    word = np.argmax(nonzero, axis=0)
+    x = np.take_along_axis(words, word[None], axis=0)[0]
+    bit = np.bitwise_count((x & (~x + np.uint64(1))) - np.uint64(1))
+    return np.where(nonzero.any(axis=0), word.astype("int64") * WORD + bit.astype("int64"), -1)
+
+
+def at_or_after(n_words, index):
+    # (word, pixel) mask of the records >= index of each pixel (none where index < 0)
+    q, r = np.divmod(np.maximum(index, 0), WORD)
+    j = np.arange(n_words)[:, None]
+    partial = ~((np.uint64(1) << r.astype(np.uint64)) - np.uint64(1))
+    mask = np.where(j < q, np.uint64(0), np.where(j == q, partial, ALL_BITS))
+    return np.where(index >= 0, mask, np.uint64(0))
+
+
+def bit_slice(words, start, n):
+    # records start..start+n-1 moved to 0..n-1, everything after them cleared
+    n_words = max(-(-n // WORD), 1)
+    out = shift(words, -start)[:n_words]
+    return out & _column(range_mask(n_words, 0, n), out.ndim)
+
+
+# === DETECTION ON BITS === #
+def run_hits(cond, window=WINDOW):
+    # records ending a run of `window` set bits: AND of the shifted masks, by doubling
+    hits, span = cond, 1
+    while span < window:
+        step = min(span, window - span)
+        hits = hits & shift(hits, step)
+        span += step
+    return hits
+
+
+def first_event_bits(cond, window=WINDOW):
+    # as detect.first_event: a series that starts beyond the threshold has its event
+    # on the first record
+    hits = run_hits(cond, window)
+    hits[0] |= cond[0] & np.uint64(1)
+    return first_set(hits)
+
+
+def event_run_bits(cond, n, index, window=WINDOW):
+    # full length of the run holding each first event: it started window - 1 records
+    # before the event (or on record 0) and ends at the next cleared bit (or record n)
+    end = first_set(~cond & at_or_after(cond.shape[0], index))
+    end = np.where(end < 0, n, np.minimum(end, n))
+    start = np.maximum(index - window + 1, 0)
+    return np.where(index >= 0, end - start, np.nan)
+
+
+def forward_fill_bits(cond, valid):
+    # state of the last valid record at every record (0 before the first valid one):
+    # segmented prefix OR over the runs of invalid records, by doubling
+    state, open_ = cond & valid, ~valid
+    span = 1
+    while span < cond.shape[0] * WORD:
+        state = state | (shift(state, span) & open_)
+        open_ = open_ & shift(open_, span)
+        span *= 2
+    return state
+
+
+def crossings_bits(cond, valid, n):
+    # changes of state between consecutive valid records 0..n-1, as detect.crossings
+    state = forward_fill_bits(cond, valid)
+    seen = valid
+    span = 1
+    while span < cond.shape[0] * WORD:
+        seen = seen | shift(seen, span)
+        span *= 2
+    counted = valid & shift(seen, 1) & _column(range_mask(cond.shape[0], 1, n), cond.ndim)
+    return popcount((state ^ shift(state, 1)) & counted)
+
+
+def weighted_count(cond, weights):
+    # sum of per-record weights over the set bits, one popcount per distinct weight
+    total = np.zeros(cond.shape[1])
+    for w in np.unique(weights):
+        total += w * popcount(cond, pack_bits(weights == w))
+    return total
+
+
+def detect_bits(season, axes, window=WINDOW, diagnostics=False):
+    # season from season_bits; axes from detect.season_axes. Returns {name: (pixel,)}
+    # for the output_names(metrics=False, diagnostics) fields.
+    rt, ad = season["retreat"], season["advance"]
+    n_rt, n_ad = len(axes["rt_days"]), len(axes["ad_days"])
+    i_rt = np.where(rt["above"].any(axis=0), first_event_bits(rt["below"], window), -1)
+    i_ad = first_event_bits(ad["above"], window)
+    out = {"advance": np.where(i_ad >= 0, axes["ad_doy"][np.maximum(i_ad, 0)], np.nan),
+           "retreat": np.where(i_rt >= 0, axes["rt_doy"][np.maximum(i_rt, 0)], np.nan)}
+    if not diagnostics:
+        return out
+
+    has_data = rt["valid"].any(axis=0) | ad["valid"].any(axis=0)
+    rt_after = np.flatnonzero(axes["rt_after"])
+    ice_days = weighted_count(ad["above"], record_days(axes["ad_days"]))
+    if len(rt_after):
+        ice_days += weighted_count(bit_slice(rt["above"], rt_after[0], len(rt_after)),
+                                   record_days(axes["rt_days"][rt_after]))
+
+    def gap(valid, days, n):
+        return longest_gap(np.where(unpack_bits(valid, n), 0.0, np.nan), days) > MAX_GAP_DAYS
+
+    flag = np.zeros(i_ad.shape, dtype="int64")
+    flag |= np.where(gap(ad["valid"], axes["ad_days"], n_ad), QUALITY_FLAGS["advance_gap"], 0)
+    flag |= np.where(gap(rt["valid"], axes["rt_days"], n_rt), QUALITY_FLAGS["retreat_gap"], 0)
+    flag |= np.where((i_ad >= 0) & (i_ad < window), QUALITY_FLAGS["advance_at_start"], 0)
+    flag |= np.where((i_rt >= 0) & (i_rt < window), QUALITY_FLAGS["retreat_at_start"], 0)
+    out.update({
+        "advance_crossings": np.where(has_data, crossings_bits(ad["above"], ad["valid"], n_ad), np.nan),
+        "retreat_crossings": np.where(has_data, crossings_bits(rt["below"], rt["valid"], n_rt), np.nan),
+        "advance_run": event_run_bits(ad["above"], n_ad, i_ad, window),
+        "retreat_run": event_run_bits(rt["below"], n_rt, i_rt, window),
+        "ice_days": np.where(has_data, ice_days, np.nan),
+        "quality_flag": np.where(has_data, flag, np.nan),
+    })
+    return out
+
+
+# === CACHE FILE === #
+def cache_path(sic_path, threshold=THRESHOLD):
+    root, _ = os.path.splitext(sic_path)
+    return f"{root}_exceed{int(threshold):03d}.nc"
+
+
+def build_cache(sic_path, var, threshold=THRESHOLD, legacy_scale=SIC_SCALE, chunk_records=CHUNK_RECORDS):
+    # packs the masks of the whole record, chunk_records days per pass
+    if chunk_records % 8:
+        raise RuntimeError(f"❌ chunk_records must be a multiple of 8, got {chunk_records}")
+    codes = open_sic_codes(sic_path, var, legacy_scale).transpose("time", "y", "x")
+    n = codes.sizes["time"]
+    packed = {name: np.zeros((-(-n // 8),) + codes.shape[1:], dtype=np.uint8) for name in MASKS}
+    for start in range(0, n, chunk_records):
+        block = np.asarray(codes.isel(time=slice(start, start + chunk_records)).values)
+        above, below = exceedance(block, threshold)
+        rows = slice(start // 8, start // 8 + -(-block.shape[0] // 8))
+        for name, mask in zip(MASKS, (above, below, block <= VALID_MAX)):
+            packed[name][rows] = np.packbits(mask, axis=0, bitorder="little")
+    ds = xr.Dataset({name: (("byte", "y", "x"), values) for name, values in packed.items()},
+                    coords={"time": codes["time"].values, "y": codes.y.values, "x": codes.x.values})
+    ds.attrs.update({"threshold": threshold, "n_records": n, "bitorder": "little",
+                     "source": os.path.basename(sic_path)})
+    out = cache_path(sic_path, threshold)
+    ds.to_netcdf(out)
+    print(f"✅ Saved exceedance cache {out}")
+    return out
+
+
+def open_cache(sic_path, var, threshold=THRESHOLD, legacy_scale=SIC_SCALE):
+    # the cache for threshold, (re)built when missing or older than the SIC file
+    path = cache_path(sic_path, threshold)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(sic_path):
+        build_cache(sic_path, var, threshold, legacy_scale)
+    return xr.open_dataset(path)
+
+
+def _record_words(cache, name, index):
+    # (word, pixel) words of the cache records in index (positions in the full record)
+    ny, nx = cache.sizes["y"], cache.sizes["x"]
+    start, stop = int(index[0]), int(index[-1]) + 1
+    packed = cache[name].isel(byte=slice(start // 8, -(-stop // 8))).values.reshape(-1, ny * nx)
+    words = bytes_to_words(packed)
+    offset = start - 8 * (start // 8)
+    if stop - start == len(index):
+        return bit_slice(words, offset, len(index))
+    return pack_bits(unpack_bits(words, offset + stop - start)[offset + index - start])
+
+
+def season_bits(cache, rt_time, ad_time):
+    # {"retreat" | "advance": {mask: (word, pixel) words}} for the season records
+    times = pd.DatetimeIndex(cache["time"].values)
+    season = {}
+    for label, t in (("retreat", rt_time), ("advance", ad_time)):
+        index = times.get_indexer(pd.DatetimeIndex(t.values))
+        if (index < 0).any():
+            raise RuntimeError("❌ Season records missing from the exceedance cache, rebuild it")
+        season[label] = {name: _record_words(cache, name, index) for name in MASKS}
+    return season
+
+
+def detect_season_bits(cache, rt_time, ad_time, window=WINDOW, diagnostics=False):
+    # as detect.detect_season (without metrics) from the cache: {name: (y, x)}
+    shape = (cache.sizes["y"], cache.sizes["x"])
+    res = detect_bits(season_bits(cache, rt_time, ad_time), season_axes(rt_time, ad_time), window, diagnostics)
+    return {name: res[name].reshape(shape) for name in output_names(False, diagnostics)}
+
+
+def window_sensitivity(cache, rt_time, ad_time, windows=WINDOWS):
+    # {window: {"advance" | "retreat": (y, x)}}, the season read from the cache once
+    shape = (cache.sizes["y"], cache.sizes["x"])
+    season = season_bits(cache, rt_time, ad_time)
+    axes = season_axes(rt_time, ad_time)
+    return {w: {name: values.reshape(shape) for name, values in detect_bits(season, axes, w).items()}
+            for w in windows}
+
+
+if __name__ == "__main__":
+    cache = open_cache(SIC_FILE, CONC_VAR)
+    times = cache["time"]
+    areas = cell_areas(cache.x.values, cache.y.values)
+    os.makedirs(OUT_DIR, exist_ok=True)
+    rows = []
+    for year in np.unique(times.dt.year.values)[:-1]:
+        feb_end = 29 if calendar.isleap(year + 1) else 28
+        rt = times.sel(time=slice(f"{year}-08-15", f"{year + 1}-02-{feb_end}"))
+        ad = times.sel(time=slice(f"{year}-02-01", f"{year}-09-15"))
+        if rt.size < 60 or ad.size < 60:
+            continue
+        rt = rt.isel(time=((rt.dt.dayofyear >= 227) | (rt.dt.dayofyear <= 60)).values)  # as advance_retreat_smmr.py
+        ad = ad.isel(time=((ad.dt.dayofyear >= 30) & (ad.dt.dayofyear <= 260)).values)
+        fields = window_sensitivity(cache, rt, ad)
+        data = {}
+        for w, res in fields.items():
+            row = {"Year": year, "Window": w}
+            for name, values in res.items():
+                data[f"{name}_w{w}"] = (("y", "x"), values)
+                ok = np.isfinite(values)
+                row[f"DOY_{name.capitalize()}"] = float(np.sum(values[ok] * areas[ok]) / np.sum(areas[ok]))
+            rows.append(row)
+        out_file = os.path.join(OUT_DIR, f"window_sensitivity_SMMR_{year}.nc")
+        xr.Dataset(data, coords={"y": cache.y, "x": cache.x},
+                   attrs={"description": f"SMMR advance / retreat DOY by WINDOW | THRESHOLD={THRESHOLD}, Year={year}"}
+                   ).to_netcdf(out_file)
+        print(f"✅ Saved {out_file}")
+    summary_file = os.path.join(OUT_DIR, "window_sensitivity_SMMR.csv")
+    pd.DataFrame(rows).to_csv(summary_file, index=False)
+    print(f"✅ Saved {summary_file}")
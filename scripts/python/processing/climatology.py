@@ -0,0 +1,156 @@
+import os
+
+import numpy as np
+import xarray as xr
+
+from paths import ROOT
+from phase_io import load_phase_year, phase_files, years_attr
+
+# Per-pixel climatology product for advance, wrapped retreat and duration.
+# Each field keeps a running count, mean, M2 (Welford), min and max, so adding a season
+# is a single O(pixels) update, memory does not grow with the record length, and the
+# climatology, variability and anomaly maps are all read straight from the file.
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+CLIM_FILE = os.path.join(ROOT, "results/climatology/phase_climatology_SMMR.nc")
+SENSOR = "SMMR"
+YEAR_START, YEAR_END = 1979, 2024
+
+FIELDS = ("advance", "retreat", "duration")
+PRODUCT_VERSION = 2  # bump when the stored accumulators change; older products are rebuilt
+
+
+# === PRODUCT SETUP === #
+def empty_climatology(template, year_start=YEAR_START, year_end=YEAR_END, sensor=SENSOR):
+    shape = template.shape
+    data_vars = {}
+    for name in FIELDS:
+        data_vars[f"{name}_count"] = (("y", "x"), np.zeros(shape, dtype="int32"))
+        data_vars[f"{name}_mean"] = (("y", "x"), np.zeros(shape, dtype="float64"))
+        data_vars[f"{name}_m2"] = (("y", "x"), np.zeros(shape, dtype="float64"))
+        data_vars[f"{name}_min"] = (("y", "x"), np.full(shape, np.nan))
+        data_vars[f"{name}_max"] = (("y", "x"), np.full(shape, np.nan))
+    return xr.Dataset(
+        data_vars,
+        coords={"x": template.x, "y": template.y},
+        attrs={
+            "description": f"{sensor} phase climatology (running count/mean/M2)",
+            "sensor": sensor,
+            "version": PRODUCT_VERSION,
+            "year_start": year_start,
+            "year_end": year_end,
+            "years": [],
+        },
+    )
+
+
+# === WELFORD UPDATE === #
+def update_climatology(clim, year, fields):
+    years = years_attr(clim)
+    if year in years:
+        raise ValueError(f"Season {year} is already part of the climatology")
+
+    for name in FIELDS:
+        x = np.asarray(fields[name], dtype="float64")
+        valid = np.isfinite(x)
+        count = clim[f"{name}_count"].values
+        mean = clim[f"{name}_mean"].values
+        m2 = clim[f"{name}_m2"].values
+
+        count[valid] += 1
+        delta = np.where(valid, x - mean, 0.0)
+        mean += np.where(valid, delta / np.maximum(count, 1), 0.0)
+        m2 += np.where(valid, delta * (x - mean), 0.0)
+
+        # fmin/fmax ignore NaN on either side
+        np.fmin(clim[f"{name}_min"].values, x, out=clim[f"{name}_min"].values)
+        np.fmax(clim[f"{name}_max"].values, x, out=clim[f"{name}_max"].values)
+
+    clim.attrs["years"] = sorted(years + [int(year)])
+    return clim
+
+
+# === READ-OUT === #
+def climatology_mean(clim, name):
+    return clim[f"{name}_mean"].where(clim[f"{name}_count"] > 0).rename(name)
+
+
+def climatology_std(clim, name, ddof=0):
+    count = clim[f"{name}_count"]
+    var = clim[f"{name}_m2"] / (count - ddof).where(count > ddof)
+    return np.sqrt(var).rename(name)
+
+
+def climatology_stat(clim, name, stat, ddof=0):
+    if stat == "mean":
+        return climatology_mean(clim, name)
+    if stat == "std":
+        return climatology_std(clim, name, ddof)
+    if stat == "var":
+        return climatology_std(clim, name, ddof) ** 2
+    if stat == "count":
+        return clim[f"{name}_count"].rename(name)
+    if stat in ("min", "max"):
+        return clim[f"{name}_{stat}"].rename(name)
+    raise ValueError(f"Unknown climatology statistic: {stat}")
+
+
+def phase_anomaly(clim, name, values):
+    return values - climatology_mean(clim, name)
+
+
+# === PERSISTENCE === #
+def load_climatology(path):
+    with xr.open_dataset(path) as ds:
+        return ds.load()
+
+
+def save_climatology(clim, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    clim.to_netcdf(tmp)
+    os.replace(tmp, path)
+
+
+def update_climatology_product(phase_dir=PHASE_DIR, clim_file=CLIM_FILE, sensor=SENSOR,
+                               year_start=YEAR_START, year_end=YEAR_END):
+    # Adds every season in phase_dir that the stored product does not have yet. A stored
+    # product covers one sensor and year range; asking it for another one is an error
+    # (use a separate clim_file) rather than silently returning the stored range.
+    clim = load_climatology(clim_file) if os.path.exists(clim_file) else None
+    if clim is not None:
+        stored = (clim.attrs.get("sensor"), int(clim.attrs["year_start"]), int(clim.attrs["year_end"]))
+        if stored != (sensor, int(year_start), int(year_end)):
+            raise RuntimeError(f"❌ {clim_file} holds {stored[0]} {stored[1]}-{stored[2]}, not "
+                               f"{sensor} {year_start}-{year_end}; use another clim_file")
+    if clim is not None and clim.attrs.get("version") != PRODUCT_VERSION:
+        print(f"⚠️ {clim_file} was written by an older version, rebuilding")
+        clim = None
+    done = set(years_attr(clim)) if clim is not None else set()
+
+    added = []
+    for year, path in phase_files(phase_dir, sensor, year_start, year_end):
+        if year in done:
+            continue
+        fields = load_phase_year(path, year)
+        if fields is None:
+            print(f"⚠️ Skipping {path}: missing advance/retreat for {year}")
+            continue
+        if clim is None:
+            clim = empty_climatology(fields["advance"], year_start, year_end, sensor)
+        update_climatology(clim, year, fields)
+        added.append(year)
+
+    if clim is None:
+        raise RuntimeError(f"❌ No phase data found in {phase_dir} to build climatology.")
+    if added:
+        save_climatology(clim, clim_file)
+        print(f"✅ Climatology updated with {len(added)} season(s): {added[0]}–{added[-1]}")
+    return clim
+
+
+if __name__ == "__main__":
+    clim = update_climatology_product()
+    years = years_attr(clim)
+    print(f"📦 {CLIM_FILE}: {len(years)} seasons ({years[0]}–{years[-1]})")
@@ -5,34 +5,28 @@ import scipy.stats as stats
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
-from glob import glob
 from sklearn.linear_model import LinearRegression
 from scipy.signal import detrend
+from eof import compute_eofs, reconstruct
+from paths import ROOT
+from phase_io import load_phase_stack, wrap_retreat
 
 # === CONFIG === #
-PHASE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
-SAVE_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/figures/retreat_vs_advance/"
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+SAVE_DIR = os.path.join(ROOT, "results/figures/retreat_vs_advance/")
+N_EOF_MODES = None  # e.g. 10 to regress on the phase cube rebuilt from the leading EOFs
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 # === LOAD STACKS === #
-advance_stack, retreat_stack = [], []
-years = []
-
-files = sorted(glob(f"{PHASE_DIR}/seaice_phases_SMMR_*.nc"))
-for f in files:
-    year = int(f.split("_")[-1].split(".")[0])
-    ds = xr.open_dataset(f)
-    adv_var = f"advance_{year}"
-    ret_var = f"retreat_{year}"
-    if adv_var in ds and ret_var in ds:
-        advance_stack.append(ds[adv_var])
-        retreat_stack.append(ds[ret_var])
-        years.append(year)
-
-advance = xr.concat(advance_stack, dim="year")
-retreat = xr.concat(retreat_stack, dim="year")
-advance["year"] = years
-retreat["year"] = years
+advance, retreat = load_phase_stack(PHASE_DIR, "SMMR")
+
+# === OPTIONAL EOF FILTER === #
+if N_EOF_MODES:
+    # retreat wrapped past the year boundary first, as eof.py, so the low modes do not
+    # smear the 365 -> 1 jump into impossible mid-year DOYs
+    retreat = wrap_retreat(retreat)
+    advance = reconstruct(compute_eofs(advance, N_EOF_MODES)).where(np.isfinite(advance))
+    retreat = reconstruct(compute_eofs(retreat, N_EOF_MODES)).where(np.isfinite(retreat))
 
 # === PREPARE ARRAYS === #
 adv_vals = advance.transpose("year", "y", "x").values  # (year, y, x)
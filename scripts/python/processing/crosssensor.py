@@ -0,0 +1,184 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from joblib import Parallel, delayed, parallel_config
+
+from climatology import FIELDS
+from paths import AMSRE_MERGED_FILE, ROOT, SMMR_MERGED_FILE
+from phase_io import load_phase_stack, season_fields
+from sic_codes import decode_sic, open_sic_codes
+from zonal import cell_areas
+
+# SMMR (25 km) vs AMSR-E (12.5 km) over the overlap seasons. The AMSR grid refines the
+# NSIDC 25 km south polar grid by an integer factor over the same extent (664 x 632 vs
+# 332 x 316), and its phase / SIC files carry index coordinates, so AMSR cells map onto
+# the 25 km cells by integer division. The fine -> coarse index map is built once per
+# grid pair; the NaN-aware block mean is then one bincount over (row, coarse cell) for
+# every season or day at once. Per-pixel bias (AMSR - SMMR), RMSD, correlation and
+# pair count come from running sums over the seasons (or days, for SIC), so each
+# record is visited once.
+
+# === CONFIG === #
+SMMR_PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+AMSR_PHASE_DIR = os.path.join(ROOT, "results/AMSRE_phase/")
+SMMR_SIC_FILE = SMMR_MERGED_FILE
+AMSR_SIC_FILE = AMSRE_MERGED_FILE
+OUT_DIR = os.path.join(ROOT, "results/crosssensor/")
+SMMR_CONC_VAR = "N07_ICECON"
+AMSR_CONC_VAR = "SI_12km_SH_ICECON_DAY_SpPolarGrid12km"
+SMMR_SIC_SCALE, AMSR_SIC_SCALE = 1.0, 100.0  # legacy float files; both compared on the 0-1 scale
+YEAR_START, YEAR_END = 2012, 2023
+MIN_VALID = 0.5  # fraction of AMSR sub-cells that must be valid for a 25 km value
+CHUNK_DAYS = 90
+N_JOBS = -1
+
+
+# === BLOCK REDUCTION === #
+@lru_cache(maxsize=8)
+def block_index(fine_shape, coarse_shape):
+    # (fine cells,) flat coarse cell of every fine cell
+    fy, fx = fine_shape[0] // coarse_shape[0], fine_shape[1] // coarse_shape[1]
+    if (fy * coarse_shape[0], fx * coarse_shape[1]) != tuple(fine_shape):
+        raise RuntimeError(f"❌ Grid {fine_shape} is not an integer refinement of {coarse_shape}")
+    rows = np.arange(fine_shape[0]) // fy
+    cols = np.arange(fine_shape[1]) // fx
+    index = (rows[:, None] * coarse_shape[1] + cols[None, :]).ravel()
+    index.setflags(write=False)
+    return index
+
+
+def block_mean(values, coarse_shape, min_valid=MIN_VALID):
+    # (..., fy*ny, fx*nx) -> (..., ny, nx) NaN-aware mean of every block
+    lead, fine_shape = values.shape[:-2], values.shape[-2:]
+    index = block_index(tuple(fine_shape), tuple(coarse_shape))
+    n_coarse = coarse_shape[0] * coarse_shape[1]
+    flat = values.reshape(-1, index.size)
+    n_rows = flat.shape[0]
+    ok = np.isfinite(flat)
+    key = (np.arange(n_rows)[:, None] * n_coarse + index[None, :])
+    count = np.bincount(key[ok], minlength=n_rows * n_coarse)
+    total = np.bincount(key[ok], weights=flat[ok], minlength=n_rows * n_coarse)
+    block_size = index.size // n_coarse
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count >= max(min_valid * block_size, 1), total / count, np.nan)
+    return mean.reshape(lead + tuple(coarse_shape))
+
+
+# === PAIRED STATISTICS === #
+def paired_sums(a, b):
+    # running sums over the leading axis for the per-pixel comparison of b against a
+    ok = np.isfinite(a) & np.isfinite(b)
+    a, b = np.where(ok, a, 0.0), np.where(ok, b, 0.0)
+    return {"n": ok.sum(axis=0), "a": a.sum(axis=0), "b": b.sum(axis=0), "aa": (a * a).sum(axis=0),
+            "bb": (b * b).sum(axis=0), "ab": (a * b).sum(axis=0)}
+
+
+def paired_stats(sums):
+    # bias (b - a), RMSD, Pearson r and pair count per pixel
+    n = sums["n"].astype("float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ma, mb = sums["a"] / n, sums["b"] / n
+        msd = (sums["bb"] - 2 * sums["ab"] + sums["aa"]) / n
+        cov = sums["ab"] / n - ma * mb
+        var_a = sums["aa"] / n - ma ** 2
+        var_b = sums["bb"] / n - mb ** 2
+        corr = cov / np.sqrt(var_a * var_b)
+    empty = n == 0
+    return {"bias": np.where(empty, np.nan, mb - ma), "rmsd": np.where(empty, np.nan, np.sqrt(np.maximum(msd, 0))),
+            "corr": np.where(n >= 3, corr, np.nan), "n": n}
+
+
+# === PHASE === #
+def compare_phase(smmr_dir=SMMR_PHASE_DIR, amsr_dir=AMSR_PHASE_DIR, year_start=YEAR_START, year_end=YEAR_END):
+    # Dataset of per-pixel {field}_{bias,rmsd,corr,n} maps and (year, y, x) {field}_diff
+    smmr = season_fields(*load_phase_stack(smmr_dir, "SMMR", year_start, year_end))
+    amsr = season_fields(*load_phase_stack(amsr_dir, "AMSRE", year_start, year_end))
+    years = np.intersect1d(smmr["advance"]["year"].values, amsr["advance"]["year"].values)
+    if len(years) == 0:
+        raise RuntimeError(f"❌ No overlapping SMMR / AMSRE seasons in {year_start}-{year_end}")
+    template = smmr["advance"].sel(year=years)
+    coarse_shape = template.shape[1:]
+
+    data = {}
+    for name in FIELDS:
+        a = smmr[name].sel(year=years).transpose("year", "y", "x").values
+        b = block_mean(amsr[name].sel(year=years).transpose("year", "y", "x").values, coarse_shape)
+        for stat, values in paired_stats(paired_sums(a, b)).items():
+            data[f"{name}_{stat}"] = (("y", "x"), values)
+        data[f"{name}_diff"] = (("year", "y", "x"), b - a)
+    return xr.Dataset(data, coords={"year": years, "y": template.y.values, "x": template.x.values})
+
+
+# === SIC === #
+def _sic_chunk_sums(smmr_file, amsr_file, dates, coarse_shape):
+    # 0-1 floats, NaN for the land / missing codes
+    a = decode_sic(open_sic_codes(smmr_file, SMMR_CONC_VAR, SMMR_SIC_SCALE).sel(time=dates).values).astype("float64")
+    b = decode_sic(open_sic_codes(amsr_file, AMSR_CONC_VAR, AMSR_SIC_SCALE).sel(time=dates).values).astype("float64")
+    return paired_sums(a, block_mean(b, coarse_shape))
+
+
+def compare_sic(smmr_file=SMMR_SIC_FILE, amsr_file=AMSR_SIC_FILE, year_start=YEAR_START, year_end=YEAR_END,
+                chunk_days=CHUNK_DAYS, n_jobs=N_JOBS):
+    # per-pixel daily SIC bias / RMSD / correlation over the common days
+    with xr.open_dataset(smmr_file) as ds:
+        smmr_time = pd.DatetimeIndex(ds["time"].values)
+        x, y = ds.x.values, ds.y.values
+    with xr.open_dataset(amsr_file) as ds:
+        amsr_time = pd.DatetimeIndex(ds["time"].values)
+    dates = smmr_time.intersection(amsr_time)
+    dates = dates[(dates.year >= year_start) & (dates.year <= year_end + 1)]
+    if len(dates) == 0:
+        raise RuntimeError(f"❌ No common SMMR / AMSRE SIC days in {year_start}-{year_end}")
+    print(f"🔹 {len(dates)} common SIC days")
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        chunks = Parallel(n_jobs=n_jobs)(
+            delayed(_sic_chunk_sums)(smmr_file, amsr_file, dates[s:s + chunk_days], (len(y), len(x)))
+            for s in range(0, len(dates), chunk_days)
+        )
+    sums = {k: sum(c[k] for c in chunks) for k in chunks[0]}
+    stats = paired_stats(sums)
+    return xr.Dataset({f"sic_{k}": (("y", "x"), v) for k, v in stats.items()}, coords={"y": y, "x": x})
+
+
+# === SUMMARY === #
+def summary_table(phase):
+    # one row per field and season plus an "all" row: area-weighted mean difference and
+    # RMSD over the compared 25 km cells; the "all" row adds the median per-pixel r
+    areas = cell_areas(phase.x.values, phase.y.values)
+    rows = []
+    for name in FIELDS:
+        diff = phase[f"{name}_diff"].values
+        seasons = [("all", diff)] + [(str(y), diff[i:i + 1]) for i, y in enumerate(phase.year.values)]
+        for label, d in seasons:
+            ok = np.isfinite(d)
+            w = np.broadcast_to(areas, d.shape)[ok]
+            row = {"field": name, "season": label, "cells": int(ok.sum()), "mean_diff": np.nan, "rmsd": np.nan,
+                   "median_corr": np.nan}
+            if ok.any():
+                row["mean_diff"] = float(np.sum(w * d[ok]) / np.sum(w))
+                row["rmsd"] = float(np.sqrt(np.sum(w * d[ok] ** 2) / np.sum(w)))
+            if label == "all":
+                row["median_corr"] = float(np.nanmedian(phase[f"{name}_corr"].values))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    os.makedirs(OUT_DIR, exist_ok=True)
+    phase = compare_phase()
+    phase.attrs["description"] = (f"AMSRE (block mean to 25 km, MIN_VALID={MIN_VALID}) minus SMMR phase, "
+                                  f"seasons {int(phase.year[0])}-{int(phase.year[-1])}")
+    if os.path.exists(AMSR_SIC_FILE):
+        phase = phase.merge(compare_sic())
+    else:
+        print(f"⚠️ {AMSR_SIC_FILE} not found, skipping the SIC comparison")
+
+    out_nc = os.path.join(OUT_DIR, "crosssensor_SMMR_AMSRE.nc")
+    out_csv = os.path.join(OUT_DIR, "crosssensor_SMMR_AMSRE_summary.csv")
+    phase.to_netcdf(out_nc)
+    summary_table(phase).to_csv(out_csv, index=False)
+    print(f"✅ Saved {out_nc}")
+    print(f"✅ Saved {out_csv}")
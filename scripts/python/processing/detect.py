@@ -0,0 +1,239 @@
+import numpy as np
+
+from sic_codes import decode_sic, exceedance
+
+# Vectorised advance / retreat detection over a whole SIC season block, replacing the
+# per-pixel loop of advance_retreat_*.py. Same rule as the xarray find_first_event:
+# the event is the END of the first run of WINDOW consecutive records beyond the
+# threshold (the rolling window's NaN padding counts as a hit, so a series that
+# starts beyond the threshold has its event on the first record). Runs come from
+# the distance to the last record that was not beyond the threshold, for all pixels
+# at once; pixels are processed in blocks to bound memory. uint8 SIC codes (see
+# sic_codes.py) are thresholded as integers, with the threshold in percent.
+#
+# Phase metrics (metrics=True), from the same pass:
+#   freeze_duration   days from the SIC minimum before the advance run to the advance
+#   melt_duration     days from the retreat to the SIC minimum after it
+#   rate_advance      SIC slope (units/day) over the WINDOW records centred on the
+#   rate_retreat      first record of the advance / retreat run (OLS, NaN-aware)
+#
+# Diagnostics (diagnostics=True), from the same exceedance and run-length arrays:
+#   advance_crossings / retreat_crossings    threshold crossings within the window
+#                                            (false starts + the event itself), between
+#                                            consecutive valid records: gaps do not count
+#   advance_run / retreat_run                length (records) of the run holding the event
+#   ice_days                                 days with SIC above the threshold over one
+#                                            year from the advance window start (retreat
+#                                            records from the next advance start are left
+#                                            to the next season)
+#   quality_flag                             bitwise OR of QUALITY_FLAGS
+
+WINDOW = 5
+BLOCK_PIXELS = 16384
+MAX_GAP_DAYS = 10  # longer stretches without a valid record flag the window as gappy
+QUALITY_FLAGS = {
+    "advance_gap": 1,    # advance window has a gap longer than MAX_GAP_DAYS
+    "retreat_gap": 2,    # retreat window has a gap longer than MAX_GAP_DAYS
+    "advance_at_start": 4,  # advance run starts on the first record (ice from the window start)
+    "retreat_at_start": 8,  # retreat run starts on the first record
+}
+
+
+# === RUNS === #
+def run_lengths(condition):
+    # (time, pixel) length of the run of True ending at each record
+    steps = np.arange(condition.shape[0])[:, None]
+    last_false = np.maximum.accumulate(np.where(condition, -1, steps), axis=0)
+    return steps - last_false
+
+
+def first_event(condition, window=WINDOW, runs=None):
+    # (pixel,) record index of the first event, -1 where there is none
+    hits = (run_lengths(condition) if runs is None else runs) >= window
+    hits[0] |= condition[0]
+    return np.where(hits.any(axis=0), np.argmax(hits, axis=0), -1)
+
+
+# === METRICS === #
+def _take(values, index):
+    return np.take_along_axis(values, np.maximum(index, 0)[None], axis=0)[0]
+
+
+def event_slope(values, days, index, window=WINDOW):
+    # OLS slope of values against days over the window records centred on index
+    half = window // 2
+    offsets = np.arange(-half, half + 1)[:, None]
+    rows = np.clip(index[None] + offsets, 0, len(days) - 1)
+    inside = (index[None] + offsets >= 0) & (index[None] + offsets < len(days)) & (index[None] >= 0)
+    v = np.take_along_axis(values, rows, axis=0)
+    d = days[rows]
+    ok = inside & np.isfinite(v)
+    n = ok.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d_mean = np.where(ok, d, 0).sum(axis=0) / n
+        v_mean = np.where(ok, v, 0).sum(axis=0) / n
+        dd = np.where(ok, d - d_mean, 0)
+        slope = (dd * np.where(ok, v - v_mean, 0)).sum(axis=0) / (dd ** 2).sum(axis=0)
+    return np.where(n >= 2, slope, np.nan)
+
+
+def crossings(condition, valid):
+    # (pixel,) number of changes of the exceedance state between consecutive valid
+    # records; missing records carry the last valid state, so a gap is not a crossing.
+    # 2 * record + state of the last valid record, by a running maximum (-1 before it)
+    steps = 2 * np.arange(condition.shape[0], dtype="int32")[:, None]
+    last = np.maximum.accumulate(np.where(valid, steps + condition, -1), axis=0)
+    changed = ((last[1:] ^ last[:-1]) & 1).astype(bool) & valid[1:] & (last[:-1] >= 0)
+    return np.count_nonzero(changed, axis=0)
+
+
+def event_run(condition, runs, index):
+    # (pixel,) full length of the run holding each event: records up to the event plus
+    # the records that stay beyond the threshold after it
+    ahead = run_lengths(condition[::-1])[::-1]
+    return np.where(index >= 0, _take(runs, index) + _take(ahead, index) - 1, np.nan)
+
+
+def longest_gap(values, days):
+    # (pixel,) longest stretch in days without a finite record, window edges included
+    valid = np.isfinite(values)
+    edges = np.concatenate([[days[0] - 1], days, [days[-1] + 1]])
+    padded = np.concatenate([np.ones((1,) + valid.shape[1:], bool), valid, np.ones((1,) + valid.shape[1:], bool)])
+    last = np.maximum.accumulate(np.where(padded, edges[:, None], -np.inf), axis=0)
+    return np.max(np.where(padded[1:], edges[1:, None] - last[:-1], 0), axis=0) - 1
+
+
+def record_days(days):
+    # days each record stands for: spacing to the next record (SMMR is every other day)
+    steps = np.diff(days)
+    return np.append(steps, steps[-1] if len(steps) else 1.0)
+
+
+def _masked_argmin(values, keep):
+    filled = np.where(keep & np.isfinite(values), values, np.inf)
+    return np.where(np.isfinite(filled).any(axis=0), np.argmin(filled, axis=0), -1)
+
+
+# === SEASON === #
+def _detect_block(rt, rt_days, ad, ad_days, threshold, window, metrics, diagnostics, rt_after):
+    if rt.dtype == np.uint8:
+        # integer SIC codes: threshold in percent, tested on the codes themselves; the
+        # 0-1 floats are only built when metrics or diagnostics need SIC values
+        above_rt, below = exceedance(rt, threshold)
+        above = exceedance(ad, threshold)[0]
+        if metrics or diagnostics:
+            rt, ad = decode_sic(rt), decode_sic(ad)
+    else:
+        below, above_rt, above = rt < threshold, rt > threshold, ad > threshold
+    runs_rt, runs_ad = run_lengths(below), run_lengths(above)
+    i_rt = np.where(above_rt.any(axis=0), first_event(below, window, runs_rt), -1)
+    i_ad = first_event(above, window, runs_ad)
+    out = {"i_retreat": i_rt, "i_advance": i_ad}
+    if diagnostics:
+        out.update(_diagnostics(rt, rt_days, ad, ad_days, below, above_rt, above,
+                                runs_rt, runs_ad, i_rt, i_ad, rt_after))
+    if not metrics:
+        return out
+
+    steps_rt = np.arange(rt.shape[0])[:, None]
+    steps_ad = np.arange(ad.shape[0])[:, None]
+    start_rt = np.maximum(i_rt - window + 1, 0)
+    start_ad = np.maximum(i_ad - window + 1, 0)
+
+    i_min_ad = _masked_argmin(ad, steps_ad <= start_ad[None])
+    i_min_rt = _masked_argmin(rt, steps_rt >= i_rt[None])
+    freeze = ad_days[i_ad] - ad_days[np.maximum(i_min_ad, 0)]
+    melt = rt_days[np.maximum(i_min_rt, 0)] - rt_days[i_rt]
+    out["freeze_duration"] = np.where((i_ad >= 0) & (i_min_ad >= 0), freeze, np.nan)
+    out["melt_duration"] = np.where((i_rt >= 0) & (i_min_rt >= 0), melt, np.nan)
+    out["rate_advance"] = np.where(i_ad >= 0, event_slope(ad, ad_days, np.where(i_ad >= 0, start_ad, -1), window), np.nan)
+    out["rate_retreat"] = np.where(i_rt >= 0, event_slope(rt, rt_days, np.where(i_rt >= 0, start_rt, -1), window), np.nan)
+    return out
+
+
+def _diagnostics(rt, rt_days, ad, ad_days, below, above_rt, above, runs_rt, runs_ad, i_rt, i_ad, rt_after):
+    has_data = np.isfinite(rt).any(axis=0) | np.isfinite(ad).any(axis=0)
+    ice_days = (above * record_days(ad_days)[:, None]).sum(axis=0)
+    ice_days += (above_rt[rt_after] * record_days(rt_days[rt_after])[:, None]).sum(axis=0)
+
+    flag = np.zeros(rt.shape[1], dtype="int64")
+    flag |= np.where(longest_gap(ad, ad_days) > MAX_GAP_DAYS, QUALITY_FLAGS["advance_gap"], 0)
+    flag |= np.where(longest_gap(rt, rt_days) > MAX_GAP_DAYS, QUALITY_FLAGS["retreat_gap"], 0)
+    flag |= np.where((i_ad >= 0) & (_take(runs_ad, i_ad) == i_ad + 1), QUALITY_FLAGS["advance_at_start"], 0)
+    flag |= np.where((i_rt >= 0) & (_take(runs_rt, i_rt) == i_rt + 1), QUALITY_FLAGS["retreat_at_start"], 0)
+
+    return {
+        "advance_crossings": np.where(has_data, crossings(above, np.isfinite(ad)), np.nan),
+        "retreat_crossings": np.where(has_data, crossings(below, np.isfinite(rt)), np.nan),
+        "advance_run": event_run(above, runs_ad, i_ad),
+        "retreat_run": event_run(below, runs_rt, i_rt),
+        "ice_days": np.where(has_data, ice_days, np.nan),
+        "quality_flag": np.where(has_data, flag, np.nan),
+    }
+
+
+def output_names(metrics=False, diagnostics=False):
+    names = ["advance", "retreat"]
+    if metrics:
+        names += ["freeze_duration", "melt_duration", "rate_advance", "rate_retreat"]
+    if diagnostics:
+        names += ["advance_crossings", "retreat_crossings", "advance_run", "retreat_run",
+                  "ice_days", "quality_flag"]
+    return names
+
+
+def season_axes(rt_time, ad_time):
+    # DOY and day-number axes of the two windows from their time coordinates (days
+    # counted from the advance window start)
+    origin = ad_time.values[0].astype("datetime64[D]")
+    month = origin.astype("datetime64[M]")
+    next_origin = (month + 12).astype("datetime64[D]") + (origin - month.astype("datetime64[D]"))
+    rt_days = (rt_time.values - origin) / np.timedelta64(1, "D")
+    ad_days = (ad_time.values - origin) / np.timedelta64(1, "D")
+    year_days = (next_origin - origin) / np.timedelta64(1, "D")
+    return {"rt_doy": rt_time.dt.dayofyear.values, "ad_doy": ad_time.dt.dayofyear.values,
+            "rt_days": rt_days, "ad_days": ad_days,
+            # retreat records not already in the advance window nor in the next season's
+            "rt_after": (rt_days > ad_days[-1]) & (rt_days < year_days)}
+
+
+def detect_arrays(rt, ad, axes, threshold, window=WINDOW, metrics=False, diagnostics=False):
+    # rt, ad: (time, pixel) arrays; axes from season_axes. Returns {name: (pixel,) array}.
+    res = _detect_block(rt, axes["rt_days"], ad, axes["ad_days"], threshold, window,
+                        metrics, diagnostics, axes["rt_after"])
+    i_rt, i_ad = res.pop("i_retreat"), res.pop("i_advance")
+    out = {"advance": np.where(i_ad >= 0, axes["ad_doy"][np.maximum(i_ad, 0)], np.nan),
+           "retreat": np.where(i_rt >= 0, axes["rt_doy"][np.maximum(i_rt, 0)], np.nan)}
+    out.update(res)
+    return out
+
+
+def detect_season(data_retreat, data_advance, threshold, window=WINDOW, metrics=False,
+                  diagnostics=False, block_pixels=BLOCK_PIXELS):
+    # data_*: (time, y, x) DataArrays already restricted to the retreat / advance DOY
+    # windows. Returns {name: (y, x) float array}: advance / retreat DOY, plus the
+    # phase metrics (metrics=True) and detector diagnostics (diagnostics=True).
+    ny, nx = data_advance.shape[1:]
+    axes = season_axes(data_retreat["time"], data_advance["time"])
+    rt_all = data_retreat.values.reshape(data_retreat.shape[0], -1)
+    ad_all = data_advance.values.reshape(data_advance.shape[0], -1)
+
+    out = {name: np.full(ny * nx, np.nan) for name in output_names(metrics, diagnostics)}
+    for start in range(0, ny * nx, block_pixels):
+        block = slice(start, start + block_pixels)
+        res = detect_arrays(rt_all[:, block], ad_all[:, block], axes, threshold, window, metrics, diagnostics)
+        for name, values in res.items():
+            out[name][block] = values
+    return {name: values.reshape(ny, nx) for name, values in out.items()}
+
+
+def circumpolar_metrics(fields, areas):
+    # area-weighted circumpolar mean of each metric field (as in summary_phase_metrics.csv)
+    columns = {"freeze_duration": "Freezing_Duration", "melt_duration": "Melting_Duration",
+               "rate_advance": "Rate_Advance", "rate_retreat": "Rate_Retreat"}
+    row = {}
+    for name, column in columns.items():
+        values = fields[name]
+        ok = np.isfinite(values)
+        row[column] = float(np.sum(values[ok] * areas[ok]) / np.sum(areas[ok])) if ok.any() else np.nan
+    return row
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import xarray as xr
+from sklearn.utils.extmath import randomized_svd
+
+from paths import ROOT
+from phase_io import load_phase_stack, wrap_retreat
+
+# EOF / PCA of the phase cube with randomized SVD. The anomaly matrix is
+# (years, pixels); pixels with missing years are left out of the decomposition and
+# come back as NaN in the EOF maps. pca_scores gives the same reduction for the
+# clustering scripts, which can then fit on a few PCs instead of the full time series.
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+OUT_DIR = os.path.join(ROOT, "results/eof/")
+SENSOR = "SMMR"
+N_MODES = 10
+N_OVERSAMPLES = 10
+N_ITER = 4
+SEED = 0
+
+
+# === DECOMPOSITION === #
+def compute_eofs(data, n_modes=N_MODES, seed=SEED):
+    # data: (year, y, x) DataArray
+    years = data["year"].values
+    ny, nx = data.shape[1], data.shape[2]
+    flat = data.transpose("year", "y", "x").values.reshape(len(years), -1)
+    valid = np.all(np.isfinite(flat), axis=0)
+
+    X = flat[:, valid]
+    mean = X.mean(axis=0)
+    X = X - mean
+    n_modes = min(n_modes, min(X.shape) - 1)
+
+    U, S, Vt = randomized_svd(X, n_components=n_modes, n_oversamples=N_OVERSAMPLES,
+                              n_iter=N_ITER, random_state=seed)
+    total_var = np.sum(X ** 2)
+    var_frac = S ** 2 / total_var
+
+    eof_maps = np.full((n_modes, ny * nx), np.nan)
+    eof_maps[:, valid] = Vt
+    mean_map = np.full(ny * nx, np.nan)
+    mean_map[valid] = mean
+
+    return xr.Dataset(
+        {
+            "eof": (("mode", "y", "x"), eof_maps.reshape(n_modes, ny, nx)),
+            "pc": (("year", "mode"), U * S),
+            "singular_value": (("mode",), S),
+            "variance_fraction": (("mode",), var_frac),
+            "mean": (("y", "x"), mean_map.reshape(ny, nx)),
+            "valid": (("y", "x"), valid.reshape(ny, nx)),
+        },
+        coords={"mode": np.arange(1, n_modes + 1), "year": years, "y": data.y, "x": data.x},
+    )
+
+
+# === REDUCED FEATURES === #
+def pca_scores(X, n_modes=N_MODES, seed=SEED):
+    # Clustering features: X is (pixels, features) with NaN rows already dropped.
+    # Centred across pixels (not in time), so the mean timing of each pixel stays in
+    # the scores and the leading modes carry what separates pixels from each other.
+    Xc = X - X.mean(axis=0)
+    n_modes = min(n_modes, min(Xc.shape) - 1)
+    U, S, Vt = randomized_svd(Xc, n_components=n_modes, n_oversamples=N_OVERSAMPLES,
+                              n_iter=N_ITER, random_state=seed)
+    explained = S ** 2 / np.sum(Xc ** 2)
+    return U * S, explained
+
+
+def reconstruct(eofs, n_modes=None):
+    # Phase cube rebuilt from the leading modes (noise-filtered), (year, y, x)
+    n_modes = n_modes or eofs.sizes["mode"]
+    sub = eofs.isel(mode=slice(0, n_modes))
+    return (xr.dot(sub["pc"], sub["eof"], dim="mode") + eofs["mean"]).transpose("year", "y", "x")
+
+
+def save_eofs(eofs, path, description):
+    eofs = eofs.copy()
+    eofs["valid"] = eofs["valid"].astype("int8")
+    eofs.attrs["description"] = description
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    eofs.to_netcdf(path)
+    print(f"✅ Saved {path}")
+
+
+def load_eofs(path):
+    with xr.open_dataset(path) as ds:
+        eofs = ds.load()
+    eofs["valid"] = eofs["valid"].astype(bool)
+    return eofs
+
+
+if __name__ == "__main__":
+    advance, retreat = load_phase_stack(PHASE_DIR, SENSOR)
+    for name, data in (("advance", advance), ("retreat", wrap_retreat(retreat))):
+        eofs = compute_eofs(data)
+        frac = eofs["variance_fraction"].values
+        print(f"🔹 {name}: leading {len(frac)} modes explain {100 * frac.sum():.1f}% "
+              f"(EOF1 {100 * frac[0]:.1f}%)")
+        save_eofs(eofs, os.path.join(OUT_DIR, f"eof_{name}_{SENSOR}.nc"),
+                  f"{SENSOR} {name} EOFs (randomized SVD) | N_MODES={N_MODES}")
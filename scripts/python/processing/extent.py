@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from joblib import Parallel, delayed, parallel_config
+
+from paths import ROOT, SMMR_MERGED_FILE
+from sic_codes import VALID_MAX, decode_sic, open_sic_codes
+from zonal import SECTORS, cell_areas, sector_labels
+
+# Daily sea-ice extent and area, total and per sector, straight from the merged SIC
+# record, replacing the hand-downloaded NSIDC S_seaice_extent_daily_v3.0.csv.
+#   extent  area of the cells with SIC >= THRESHOLD (tested on the uint8 percent codes)
+#   area    SIC-weighted area, sum(SIC * cell area)
+# both in 10^6 km² as in the NSIDC index. The true cell areas and the sector labels are
+# folded once into a (cell, region) weight matrix, so each day of a time chunk reduces
+# to two matrix products; chunks are read and reduced in worker processes, so the full
+# record never has to sit in memory.
+
+# === CONFIG === #
+SIC_FILE = SMMR_MERGED_FILE
+EXTENT_FILE = os.path.join(ROOT, "results/extent/seaice_extent_daily_SMMR.csv")
+CONC_VAR = "N07_ICECON"
+SIC_SCALE = 1.0  # legacy float files only: SMMR is 0-1, the AMSR-E record in percent
+THRESHOLD = 0.15
+CHUNK_DAYS = 365
+N_JOBS = -1
+CIRCUMPOLAR = "Circumpolar"
+
+
+# === WEIGHTS === #
+def region_weights(x, y, sectors=SECTORS):
+    # (cell, region) cell areas in km², one column per sector plus the circumpolar total
+    labels = sector_labels(x, y, sectors).ravel()
+    areas = cell_areas(x, y).ravel()
+    weights = np.zeros((labels.size, len(sectors) + 1), dtype="float64")
+    inside = labels >= 0
+    weights[np.flatnonzero(inside), labels[inside]] = areas[inside]
+    weights[:, -1] = areas
+    return weights
+
+
+# === REDUCTION (runs inside the workers) === #
+def extent_area_chunk(path, var, start, stop, weights, threshold=THRESHOLD, scale=SIC_SCALE):
+    # (time,) dates and (time, region) extent / area for days start..stop-1 of the file
+    sic = open_sic_codes(path, var, scale).isel(time=slice(start, stop))
+    times = sic["time"].values
+    codes = sic.transpose("time", "y", "x").values.reshape(len(times), -1)
+    valid = codes <= VALID_MAX  # land, coast and missing are reserved codes
+    conc = np.where(valid, decode_sic(codes), 0)
+    extent = (valid & (codes >= round(threshold * 100))).astype("float64") @ weights / 1e6
+    area = conc.astype("float64") @ weights / 1e6
+    empty = ~valid.any(axis=1)  # no data at all that day (SMMR every-other-day gaps)
+    extent[empty] = np.nan
+    area[empty] = np.nan
+    return times, extent, area
+
+
+def daily_extent(path=SIC_FILE, var=CONC_VAR, threshold=THRESHOLD, scale=SIC_SCALE,
+                 sectors=SECTORS, chunk_days=CHUNK_DAYS, n_jobs=N_JOBS):
+    # Long table: one row per (day, region) with Year, Month, Day, Region, Extent, Area
+    with xr.open_dataset(path) as ds:
+        n_time = ds.sizes["time"]
+        weights = region_weights(ds.x.values, ds.y.values, sectors)
+    starts = range(0, n_time, chunk_days)
+    print(f"🔹 {n_time} days in {len(starts)} chunks of {chunk_days}")
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        chunks = Parallel(n_jobs=n_jobs)(
+            delayed(extent_area_chunk)(path, var, s, min(s + chunk_days, n_time), weights, threshold, scale)
+            for s in starts
+        )
+    times = pd.DatetimeIndex(np.concatenate([c[0] for c in chunks]))
+    extent = np.concatenate([c[1] for c in chunks])
+    area = np.concatenate([c[2] for c in chunks])
+
+    regions = list(sectors) + [CIRCUMPOLAR]
+    table = pd.DataFrame({
+        "Year": np.repeat(times.year, len(regions)),
+        "Month": np.repeat(times.month, len(regions)),
+        "Day": np.repeat(times.day, len(regions)),
+        "Region": np.tile(regions, len(times)),
+        "Extent": extent.ravel().round(4),
+        "Area": area.ravel().round(4),
+    })
+    return table.dropna(subset=["Extent"]).reset_index(drop=True)
+
+
+# === READER === #
+def load_extent(path=EXTENT_FILE, region=CIRCUMPOLAR):
+    # One region's daily series with Date / DOY columns, the frame the phase
+    # assessment scripts used to build from the NSIDC CSV
+    df = pd.read_csv(path)
+    df = df[df["Region"] == region].drop(columns="Region").reset_index(drop=True)
+    df["Date"] = pd.to_datetime(df[["Year", "Month", "Day"]])
+    df["DOY"] = df["Date"].dt.dayofyear
+    return df
+
+
+if __name__ == "__main__":
+    table = daily_extent()
+    os.makedirs(os.path.dirname(EXTENT_FILE), exist_ok=True)
+    table.to_csv(EXTENT_FILE, index=False)
+    print(f"✅ Saved {EXTENT_FILE} ({len(table)} rows)")
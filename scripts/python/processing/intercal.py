@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+import xarray as xr
+
+from crosssensor import block_mean, paired_sums
+from paths import ROOT
+from phase_io import load_phase_stack, wrap_retreat
+from zonal import SECTORS, sector_labels
+
+# SMMR <-> AMSR-E intercalibration of the phase DOYs and the harmonised record built
+# from it. Over the overlap seasons each 25 km pixel gets an OLS mapping
+#     SMMR = intercept + slope * AMSR(block mean to 25 km)
+# for advance and wrapped retreat, solved in closed form from the per-pixel paired sums
+# (no per-pixel regression loop). Pixels with too few pairs or an implausible slope
+# fall back to the pooled fit of their sector (sums added with bincount over the
+# sector labels), then to the circumpolar fit. fit_level records which one was used.
+#
+# The harmonised cube is on the SMMR 25 km grid and scale: SMMR seasons before
+# SWITCH_YEAR, calibrated AMSR from SWITCH_YEAR on, each filling the other's gaps.
+# The uncertainty is the OLS prediction standard error for calibrated values and 0 for
+# native SMMR; duration = retreat - advance with the two errors added in quadrature.
+# advance_source / retreat_source record per phase which sensor each value came from
+# (a season can be gap-filled for one phase only); duration_source is their OR.
+
+# === CONFIG === #
+SMMR_PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+AMSR_PHASE_DIR = os.path.join(ROOT, "results/AMSRE_phase/")
+OUT_FILE = os.path.join(ROOT, "results/harmonised/phase_harmonised_SMMR_AMSRE.nc")
+FIT_START, FIT_END = 2013, 2023  # overlap seasons used for the fits (AMSR starts Jul 2012)
+SWITCH_YEAR = 2013
+MIN_PAIRS = 6
+SLOPE_RANGE = (0.5, 1.5)
+CALIBRATED = ("advance", "retreat")
+FIT_LEVELS = {"pixel": 0, "sector": 1, "circumpolar": 2}
+
+
+# === FITS === #
+def linear_fit(sums):
+    # closed-form OLS of b on a from paired_sums (any shape); NaN where undefined
+    n = sums["n"].astype("float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_a, mean_b = sums["a"] / n, sums["b"] / n
+        sxx = sums["aa"] - n * mean_a ** 2
+        sxy = sums["ab"] - n * mean_a * mean_b
+        syy = sums["bb"] - n * mean_b ** 2
+        slope = sxy / sxx
+        intercept = mean_b - slope * mean_a
+        sigma = np.sqrt(np.maximum(syy - slope * sxy, 0) / (n - 2))
+    return {"slope": slope, "intercept": intercept, "sigma": sigma, "n": n, "mean_a": mean_a, "sxx": sxx}
+
+
+def _usable(fit, min_pairs=MIN_PAIRS, slope_range=SLOPE_RANGE):
+    with np.errstate(invalid="ignore"):
+        return ((fit["n"] >= min_pairs) & (fit["sxx"] > 0)
+                & (fit["slope"] >= slope_range[0]) & (fit["slope"] <= slope_range[1]))
+
+
+def fit_mappings(amsr, smmr, labels, n_regions, min_pairs=MIN_PAIRS):
+    # amsr, smmr: (year, y, x) on the 25 km grid over the fit seasons. Returns the (y, x)
+    # fit of every pixel after the sector / circumpolar fallbacks, plus fit_level.
+    sums = paired_sums(amsr, smmr)
+    flat_labels = labels.ravel()
+    inside = flat_labels >= 0
+    region_sums = {k: np.bincount(flat_labels[inside], weights=v.ravel()[inside].astype("float64"),
+                                  minlength=n_regions) for k, v in sums.items()}
+    total_sums = {k: np.asarray(v.sum(), dtype="float64") for k, v in sums.items()}
+
+    pixel, region, total = linear_fit(sums), linear_fit(region_sums), linear_fit(total_sums)
+    region_ok = _usable(region, min_pairs)
+    if not _usable(total, min_pairs):
+        raise RuntimeError(f"❌ Circumpolar fit failed ({int(total['n'])} pairs, slope {float(total['slope']):.2f})")
+
+    pixel_ok = _usable(pixel, min_pairs)
+    use_region = ~pixel_ok & np.where(labels >= 0, region_ok[np.maximum(labels, 0)], False)
+    level = np.where(pixel_ok, FIT_LEVELS["pixel"],
+                     np.where(use_region, FIT_LEVELS["sector"], FIT_LEVELS["circumpolar"]))
+    fit = {}
+    for k in pixel:
+        from_region = region[k][np.maximum(labels, 0)]
+        fit[k] = np.where(level == FIT_LEVELS["pixel"], pixel[k],
+                          np.where(level == FIT_LEVELS["sector"], from_region, total[k]))
+    fit["n_pixel"] = pixel["n"]
+    fit["level"] = level
+    return fit
+
+
+def apply_mapping(amsr, fit):
+    # calibrated values and their OLS prediction standard error, broadcast over years
+    value = fit["intercept"] + fit["slope"] * amsr
+    with np.errstate(invalid="ignore", divide="ignore"):
+        error = fit["sigma"] * np.sqrt(1 + 1 / fit["n"] + (amsr - fit["mean_a"]) ** 2 / fit["sxx"])
+    return value, error
+
+
+# === HARMONISED RECORD === #
+def harmonise(smmr_dir=SMMR_PHASE_DIR, amsr_dir=AMSR_PHASE_DIR, fit_start=FIT_START, fit_end=FIT_END,
+              switch_year=SWITCH_YEAR, sectors=SECTORS):
+    smmr_adv, smmr_ret = load_phase_stack(smmr_dir, "SMMR")
+    amsr_adv, amsr_ret = load_phase_stack(amsr_dir, "AMSRE")
+    smmr = {"advance": smmr_adv, "retreat": wrap_retreat(smmr_ret)}
+    coarse_shape = smmr_adv.shape[1:]
+    amsr = {"advance": block_mean(amsr_adv.transpose("year", "y", "x").values, coarse_shape),
+            "retreat": block_mean(wrap_retreat(amsr_ret).transpose("year", "y", "x").values, coarse_shape)}
+    amsr_years = amsr_adv["year"].values
+    smmr_years = smmr_adv["year"].values
+    years = np.union1d(smmr_years, amsr_years)
+    fit_years = np.intersect1d(smmr_years, amsr_years)
+    fit_years = fit_years[(fit_years >= fit_start) & (fit_years <= fit_end)]
+    if len(fit_years) == 0:
+        raise RuntimeError(f"❌ No overlapping SMMR / AMSRE seasons in {fit_start}-{fit_end}")
+
+    labels = sector_labels(smmr_adv.x.values, smmr_adv.y.values, sectors)
+    in_smmr = np.isin(years, smmr_years)
+    in_amsr = np.isin(years, amsr_years)
+    after_switch = (years >= switch_year)[:, None, None]
+    data, coords = {}, {"year": years, "y": smmr_adv.y.values, "x": smmr_adv.x.values}
+    for name in CALIBRATED:
+        native = np.full((len(years),) + coarse_shape, np.nan)
+        native[in_smmr] = smmr[name].sel(year=years[in_smmr]).transpose("year", "y", "x").values
+        other = np.full_like(native, np.nan)
+        other[in_amsr] = amsr[name][np.searchsorted(amsr_years, years[in_amsr])]
+
+        a_fit = other[np.isin(years, fit_years)]
+        s_fit = native[np.isin(years, fit_years)]
+        fit = fit_mappings(a_fit, s_fit, labels, len(sectors))
+        calibrated, error = apply_mapping(other, fit)
+
+        use_amsr = np.where(after_switch, np.isfinite(calibrated), ~np.isfinite(native) & np.isfinite(calibrated))
+        data[name] = (("year", "y", "x"), np.where(use_amsr, calibrated, native))
+        data[f"{name}_uncertainty"] = (("year", "y", "x"),
+                                       np.where(use_amsr, error, np.where(np.isfinite(native), 0.0, np.nan)))
+        for k in ("slope", "intercept", "sigma"):
+            data[f"{name}_{k}"] = (("y", "x"), fit[k])
+        data[f"{name}_fit_level"] = (("y", "x"), fit["level"].astype("int8"))
+        data[f"{name}_n_pairs"] = (("y", "x"), fit["n_pixel"])
+        data[f"{name}_source"] = (("year", "y", "x"), use_amsr.astype("int8"))
+
+    duration = data["retreat"][1] - data["advance"][1]
+    valid = duration >= 0
+    data["duration"] = (("year", "y", "x"), np.where(valid, duration, np.nan))
+    data["duration_uncertainty"] = (("year", "y", "x"), np.where(
+        valid, np.hypot(data["advance_uncertainty"][1], data["retreat_uncertainty"][1]), np.nan))
+    # duration uses calibrated AMSR where either of its phases does
+    data["duration_source"] = (("year", "y", "x"), data["advance_source"][1] | data["retreat_source"][1])
+    ds = xr.Dataset(data, coords=coords)
+    ds.attrs["description"] = (f"SMMR/AMSRE harmonised phase (SMMR scale, 25 km) | fit seasons "
+                               f"{int(fit_years[0])}-{int(fit_years[-1])}, AMSRE from {switch_year} | "
+                               "*_source: 0 SMMR, 1 calibrated AMSRE | fit_level: "
+                               + ", ".join(f"{k}={v}" for k, v in FIT_LEVELS.items()))
+    return ds
+
+
+if __name__ == "__main__":
+    harmonised = harmonise()
+    for name in CALIBRATED:
+        levels = np.bincount(harmonised[f"{name}_fit_level"].values.ravel(), minlength=len(FIT_LEVELS))
+        print(f"🔹 {name}: " + ", ".join(f"{k} {n}" for k, n in zip(FIT_LEVELS, levels)) + " pixels")
+    os.makedirs(os.path.dirname(OUT_FILE), exist_ok=True)
+    harmonised.to_netcdf(OUT_FILE)
+    print(f"✅ Saved {OUT_FILE}")
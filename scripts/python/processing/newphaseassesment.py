@@ -6,21 +6,16 @@ from scipy.stats import linregress
 import pandas as pd
 import numpy as np
 
+from extent import EXTENT_FILE, load_extent
+from onsets import onset_table
 
-# Load your summary again
-file_path = "/Users/fridaperez/Desktop/S_seaice_extent_daily_v3.0.csv"
-df = pd.read_csv(file_path, skiprows=[1])
-df['Date'] = pd.to_datetime(df[['Year', 'Month', 'Day']])
-df['Extent'] = pd.to_numeric(df['Extent'], errors='coerce')
-df['Year'] = df['Date'].dt.year
-df['DOY'] = df['Date'].dt.dayofyear
+# Daily circumpolar extent from extent.py (merged SIC record)
+df = load_extent(EXTENT_FILE, region="Circumpolar")
 
 
 # === Calculate DOY of retreat (min) and advance (max) ===
-timing = df.groupby('Year').agg(
-    DOY_Retreat=('DOY', lambda x: x[df.loc[x.index, 'Extent'].idxmin()]),
-    DOY_Advance=('DOY', lambda x: x[df.loc[x.index, 'Extent'].idxmax()])
-).reset_index()
+timing = onset_table(df).rename(columns={'DOY_Min': 'DOY_Retreat', 'DOY_Max': 'DOY_Advance'})
+timing = timing[['Year', 'DOY_Retreat', 'DOY_Advance']]
 
 timing = timing[(timing['Year'] > 1978) & (timing['Year'] < 2023)].reset_index(drop=True)
 
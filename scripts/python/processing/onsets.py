@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Vectorised onset detection on daily extent records. The records of every series
+# (region x threshold x sensor ...) are scattered once into a (series, year, day) cube,
+# day = DOY - 1, NaN where there is no record, and each statistic is then a reduction
+# along the day axis for all series and years at once:
+#   DOY_Max / DOY_Min     first day of the yearly extent maximum / minimum
+#   DOY_Retreat           first day after the maximum whose extent dropped since the
+#                         previous record
+#   DOY_Advance           first day after the minimum whose extent grew since the
+#                         previous record
+# "Previous record" is the previous non-missing day of the same year, as .diff() on the
+# per-year frame gives for every-other-day SMMR records.
+
+N_DAYS = 366
+
+
+# === CUBE === #
+def extent_cube(df, keys=("Region",), value="Extent"):
+    # df needs Year and DOY columns plus the key columns. Returns the (series, year, day)
+    # cube, a frame of the series keys (one row per series) and the years.
+    keys = [k for k in keys if k in df.columns]
+    if keys:
+        grouped = df.groupby(keys, sort=True)
+        series_index = grouped.ngroup().to_numpy()
+        series = pd.DataFrame(list(grouped.groups), columns=keys)
+    else:
+        series_index, series = np.zeros(len(df), dtype="int64"), pd.DataFrame(index=[0])
+    year_index, years = pd.factorize(df["Year"], sort=True)
+    cube = np.full((len(series), len(years), N_DAYS), np.nan)
+    cube[series_index, year_index, df["DOY"].to_numpy() - 1] = pd.to_numeric(df[value], errors="coerce")
+    return cube, series, np.asarray(years)
+
+
+# === ONSETS === #
+def _first_after(mask, start):
+    # first day index > start where mask holds, NaN if none (or start is NaN)
+    days = np.arange(mask.shape[-1])
+    after = mask & (days > np.nan_to_num(start, nan=mask.shape[-1])[..., None])
+    first = np.argmax(after, axis=-1).astype("float64")
+    first[~after.any(axis=-1)] = np.nan
+    return first
+
+
+def detect_onsets(cube):
+    # cube: (..., day). Returns {name: (...) DOY array}, NaN where undefined.
+    valid = np.isfinite(cube)
+    has_data = valid.any(axis=-1)
+    filled_max = np.where(valid, cube, -np.inf)
+    filled_min = np.where(valid, cube, np.inf)
+    day_max = np.where(has_data, np.argmax(filled_max, axis=-1), np.nan)
+    day_min = np.where(has_data, np.argmin(filled_min, axis=-1), np.nan)
+
+    # change since the previous record: forward-fill the last valid day along the year
+    days = np.arange(cube.shape[-1])
+    last = np.maximum.accumulate(np.where(valid, days, -1), axis=-1)
+    previous = np.concatenate([np.full(last.shape[:-1] + (1,), -1), last[..., :-1]], axis=-1)
+    prev_value = np.take_along_axis(cube, np.maximum(previous, 0), axis=-1)
+    with np.errstate(invalid="ignore"):
+        change = np.where(valid & (previous >= 0), cube - prev_value, np.nan)
+        retreat = _first_after(change < 0, day_max)
+        advance = _first_after(change > 0, day_min)
+
+    return {"DOY_Max": day_max + 1, "DOY_Min": day_min + 1,
+            "DOY_Retreat": retreat + 1, "DOY_Advance": advance + 1}
+
+
+def onset_table(df, keys=("Region",), value="Extent"):
+    # Long frame: key columns, Year and the detect_onsets DOYs for every series and year
+    cube, series, years = extent_cube(df, keys, value)
+    onsets = detect_onsets(cube)
+    n_series, n_years = cube.shape[:2]
+    table = series.loc[np.repeat(np.arange(n_series), n_years)].reset_index(drop=True)
+    table["Year"] = np.tile(years, n_series)
+    for name, values in onsets.items():
+        table[name] = values.ravel()
+    return table
@@ -0,0 +1,18 @@
+import os
+
+# Root of the sea-ice-phase tree (data/ and results/ live under it). Every script builds
+# its input / output paths from ROOT, so a run on another machine or against another
+# tree sets SEA_ICE_PHASE_ROOT (or `sip.py --root`, or root in the sip config file)
+# instead of editing paths; by default it is this checkout.
+
+ROOT = os.environ.get("SEA_ICE_PHASE_ROOT") or os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+# Hand-off files between the pipeline stages (ingest -> merge -> detect): each stage's
+# output default is the next one's input default.
+SMMR_DOWNLOAD_DIR = os.path.join(ROOT, "data/bootstrap_smmr/test_downloads/")
+SMMR_BASE_FILE = os.path.join(ROOT, "data/bootstrap_smmr/merged_bootsstrap.nc")  # 1979 - 2023 record
+SMMR_MERGED_FILE = os.path.join(ROOT, "data/merged/SMMR_merged_1979_06302024.nc")
+AMSRE_RAW_DIR = os.path.join(ROOT, "data/amsre/raw/")
+AMSRE_DAILY_DIR = os.path.join(ROOT, "data/amsre/daily_nc/")
+AMSRE_MERGED_FILE = os.path.join(ROOT, "data/SIC_07132012_04082025_merged.nc")
@@ -3,35 +3,17 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import linregress
 
-# Load your summary again
-file_path = "/Users/fridaperez/Desktop/S_seaice_extent_daily_v3.0.csv"
-df = pd.read_csv(file_path, skiprows=[1])
-df['Date'] = pd.to_datetime(df[['Year', 'Month', 'Day']])
-df['Extent'] = pd.to_numeric(df['Extent'], errors='coerce')
-df['Year'] = df['Date'].dt.year
-df['DOY'] = df['Date'].dt.dayofyear
+from extent import EXTENT_FILE, load_extent
+from onsets import onset_table
 
-def detect_onsets_per_year(df_year):
-    df_year = df_year.sort_values('Date')
-    df_year['dExtent'] = df_year['Extent'].diff()
+# Daily circumpolar extent from extent.py (merged SIC record)
+df = load_extent(EXTENT_FILE, region="Circumpolar")
 
-    date_max = df_year.loc[df_year['Extent'].idxmax(), 'Date']
-    date_min = df_year.loc[df_year['Extent'].idxmin(), 'Date']
-
-    retreat = df_year[(df_year['Date'] > date_max) & (df_year['dExtent'] < 0)]
-    advance = df_year[(df_year['Date'] > date_min) & (df_year['dExtent'] > 0)]
-
-    if not retreat.empty and not advance.empty:
-        date_retreat = retreat.iloc[0]['Date']
-        date_advance = advance.iloc[0]['Date']
-        return pd.Series({
-            'DOY_Advance': date_advance.timetuple().tm_yday,
-            'DOY_Retreat': date_retreat.timetuple().tm_yday
-        })
-    else:
-        return pd.Series({'DOY_Advance': np.nan, 'DOY_Retreat': np.nan})
-
-summary = df.groupby('Year').apply(detect_onsets_per_year).reset_index()
+# Max/min dates and first post-extremum decrease/increase for every year in one call;
+# a year counts only when both onsets are found
+summary = onset_table(df)[['Year', 'DOY_Advance', 'DOY_Retreat']]
+incomplete = summary[['DOY_Advance', 'DOY_Retreat']].isna().any(axis=1)
+summary.loc[incomplete, ['DOY_Advance', 'DOY_Retreat']] = np.nan
 summary = summary[summary['Year'] > 1978]
 
 # Calculate long-term means
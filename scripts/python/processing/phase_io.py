@@ -0,0 +1,113 @@
+import os
+from glob import glob
+
+import numpy as np
+import xarray as xr
+
+# Shared readers for the per-season phase files written by advance_retreat_*.py
+# (one seaice_phases_<SENSOR>_<YEAR>.nc per season with advance_<YEAR> / retreat_<YEAR>).
+
+RETREAT_WRAP_DOY = 100  # retreat DOY below this belongs to the following calendar year
+
+
+# === FILE DISCOVERY === #
+def phase_files(phase_dir, sensor="SMMR", year_start=None, year_end=None):
+    out = []
+    for path in sorted(glob(os.path.join(phase_dir, f"seaice_phases_{sensor}_*.nc"))):
+        year = os.path.basename(path).split("_")[-1].split(".")[0]
+        if not year.isdigit():
+            continue  # e.g. *_2015_test.nc
+        year = int(year)
+        if year_start is not None and year < year_start:
+            continue
+        if year_end is not None and year > year_end:
+            continue
+        out.append((year, path))
+    return out
+
+
+# === FIELD HELPERS === #
+def wrap_retreat(retreat):
+    return retreat.where(retreat >= RETREAT_WRAP_DOY, retreat + 365)
+
+
+def season_fields(advance, retreat):
+    retreat_wrapped = wrap_retreat(retreat)
+    duration = retreat_wrapped - advance
+    return {
+        "advance": advance,
+        "retreat": retreat_wrapped,
+        "duration": duration.where(duration >= 0),
+    }
+
+
+def load_phase_year(path, year):
+    # Returns advance, wrapped retreat and duration for one season, or None if the
+    # file does not carry both phase variables.
+    with xr.open_dataset(path) as ds:
+        adv_var, ret_var = f"advance_{year}", f"retreat_{year}"
+        if adv_var not in ds or ret_var not in ds:
+            return None
+        advance = ds[adv_var].load().rename("advance")
+        retreat = ds[ret_var].load().rename("retreat")
+    return season_fields(advance, retreat)
+
+
+def load_phase_stack(phase_dir, sensor="SMMR", year_start=None, year_end=None):
+    # Eager (year, y, x) stacks of raw advance and retreat DOY, as the analysis scripts use.
+    advance_stack, retreat_stack, years = [], [], []
+    for year, path in phase_files(phase_dir, sensor, year_start, year_end):
+        with xr.open_dataset(path) as ds:
+            adv_var, ret_var = f"advance_{year}", f"retreat_{year}"
+            if adv_var not in ds or ret_var not in ds:
+                print(f"⚠️ Missing {adv_var} or {ret_var} in {path}")
+                continue
+            advance_stack.append(ds[adv_var].load().rename("advance"))
+            retreat_stack.append(ds[ret_var].load().rename("retreat"))
+            years.append(year)
+
+    if not years:
+        raise RuntimeError(f"❌ No valid advance/retreat variables found in {phase_dir}")
+
+    advance = xr.concat(advance_stack, dim="year")
+    retreat = xr.concat(retreat_stack, dim="year")
+    advance["year"] = years
+    retreat["year"] = years
+    return advance, retreat
+
+
+def never_valid_mask(phase_dir, sensor="SMMR", cache_file=None):
+    # (y, x) bool: cells without an advance or retreat in any season (land, pole hole,
+    # ocean that never freezes), for MapRenderer(mask=...). Built by streaming the phase
+    # files once and cached in cache_file; rebuilt when a phase file is newer.
+    files = phase_files(phase_dir, sensor)
+    if not files:
+        raise RuntimeError(f"❌ No phase files found in {phase_dir}")
+    newest = max(os.path.getmtime(path) for _, path in files)
+    if cache_file and os.path.exists(cache_file) and os.path.getmtime(cache_file) >= newest:
+        with xr.open_dataset(cache_file) as ds:
+            return ds["never_valid"].values.astype(bool)
+
+    valid, grid = None, None
+    for year, path in files:
+        with xr.open_dataset(path) as ds:
+            for var in (f"advance_{year}", f"retreat_{year}"):
+                if var in ds:
+                    finite = np.isfinite(ds[var].values)
+                    valid = finite if valid is None else valid | finite
+                    grid = grid or {"y": ds.y.values, "x": ds.x.values}
+    if valid is None:
+        raise RuntimeError(f"❌ No valid advance/retreat variables found in {phase_dir}")
+    mask = ~valid
+
+    if cache_file:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        xr.Dataset({"never_valid": (("y", "x"), mask.astype("uint8"))}, coords=grid,
+                   attrs={"description": f"{sensor} cells never valid in {len(files)} seasons"}).to_netcdf(cache_file)
+        print(f"✅ Saved never-valid mask {cache_file}")
+    return mask
+
+
+def years_attr(ds, name="years"):
+    # netCDF stores one-element attribute lists as scalars
+    return [int(v) for v in np.atleast_1d(ds.attrs.get(name, []))]
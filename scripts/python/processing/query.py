@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import xarray as xr
+from pyproj import Transformer
+
+from climatology import FIELDS
+from paths import ROOT
+from phase_io import load_phase_stack, season_fields
+
+# Point / region queries on the phase cube. The phase files sit on the NSIDC 25 km
+# south polar stereographic grid (EPSG:3412: Hughes 1980 ellipsoid, true scale at
+# 70°S), so lat/lon -> cell is an analytic projection plus integer division; radius
+# queries and "nearest cell with data" use a KD-tree over the cell centres. All
+# queries are vectorised and return xarray Datasets of advance / wrapped retreat /
+# duration, so thousands of points (a ship track) are one call.
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+SENSOR = "SMMR"
+GRID_CRS = ("+proj=stere +lat_0=-90 +lat_ts=-70 +lon_0=0 +k=1 +x_0=0 +y_0=0 "
+            "+a=6378273 +b=6356889.449 +units=m +no_defs")
+
+_TO_GRID = Transformer.from_crs("EPSG:4326", GRID_CRS, always_xy=True)
+_TO_LONLAT = Transformer.from_crs(GRID_CRS, "EPSG:4326", always_xy=True)
+
+
+def lonlat_to_xy(lon, lat):
+    return _TO_GRID.transform(np.asarray(lon, dtype="float64"), np.asarray(lat, dtype="float64"))
+
+
+def xy_to_lonlat(x, y):
+    return _TO_LONLAT.transform(np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64"))
+
+
+class PhaseIndex:
+
+    def __init__(self, fields):
+        # fields: {name: (year, y, x) DataArray}, e.g. season_fields of the phase stack
+        from scipy.spatial import cKDTree  # here, so zonal / detect can use the grid helpers cheaply
+        template = fields[FIELDS[0]]
+        self.years = template["year"].values
+        self.x, self.y = template.x.values, template.y.values
+        self.x0, self.dx = self.x[0], self.x[1] - self.x[0]
+        self.y0, self.dy = self.y[0], self.y[1] - self.y[0]
+        self.shape = (len(self.y), len(self.x))
+        # (cell, year) layout: one cell's series is a contiguous row
+        self.cube = {name: np.ascontiguousarray(
+            fields[name].transpose("y", "x", "year").values.reshape(-1, len(self.years)))
+            for name in FIELDS}
+        has_data = np.any(np.isfinite(self.cube["advance"]), axis=1)
+        gx, gy = np.meshgrid(self.x, self.y)
+        self.cell_xy = np.column_stack([gx.ravel(), gy.ravel()])
+        self._tree = cKDTree(self.cell_xy)
+        self._data_cells = np.flatnonzero(has_data)
+        self._data_tree = cKDTree(self.cell_xy[self._data_cells])
+
+    @classmethod
+    def from_phase_dir(cls, phase_dir=PHASE_DIR, sensor=SENSOR, year_start=None, year_end=None):
+        advance, retreat = load_phase_stack(phase_dir, sensor, year_start, year_end)
+        return cls(season_fields(advance, retreat))
+
+    # === LAT/LON -> CELL === #
+    def cells(self, lon, lat):
+        # flat cell index of the cell containing each point, -1 off the grid
+        x, y = lonlat_to_xy(lon, lat)
+        col = np.floor((x - self.x0) / self.dx + 0.5).astype("int64")
+        row = np.floor((y - self.y0) / self.dy + 0.5).astype("int64")
+        inside = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        return np.where(inside, row * self.shape[1] + col, -1)
+
+    def nearest_data_cells(self, lon, lat):
+        # nearest cell with at least one season of data (for stations on the coast)
+        x, y = lonlat_to_xy(lon, lat)
+        distance, i = self._data_tree.query(np.column_stack([np.ravel(x), np.ravel(y)]))
+        return self._data_cells[i], distance
+
+    # === QUERIES === #
+    def nearest(self, lon, lat, with_data=True):
+        # one series per point: (point, year)
+        lon, lat = np.atleast_1d(lon), np.atleast_1d(lat)
+        if with_data:
+            cells, distance = self.nearest_data_cells(lon, lat)
+        else:
+            cells = self.cells(lon, lat)
+            x, y = lonlat_to_xy(lon, lat)
+            centre = self.cell_xy[np.maximum(cells, 0)]
+            distance = np.where(cells >= 0, np.hypot(x - centre[:, 0], y - centre[:, 1]), np.nan)
+        return self._series(cells, "point", distance=distance, lon=lon, lat=lat)
+
+    def points(self, lon, lat, years):
+        # value at each point in its own season (ship tracks, floats): (point,)
+        lon, lat = np.atleast_1d(lon), np.atleast_1d(lat)
+        cells = self.cells(lon, lat)
+        years = np.broadcast_to(years, cells.shape)  # one season for every point, or one each
+        year_index = np.searchsorted(self.years, years)
+        ok = (cells >= 0) & (year_index < len(self.years))
+        ok[ok] &= self.years[year_index[ok]] == years[ok]
+        data = {}
+        for name in FIELDS:
+            values = np.full(len(cells), np.nan)
+            values[ok] = self.cube[name][cells[ok], year_index[ok]]
+            data[name] = (("point",), values)
+        return xr.Dataset(data, coords={"lon": ("point", lon), "lat": ("point", lat), "year": ("point", years),
+                                        "cell": ("point", cells)})
+
+    def radius(self, lon, lat, radius_km):
+        # every cell centre within radius_km of the point: (cell, year)
+        x, y = lonlat_to_xy(lon, lat)
+        cells = np.array(sorted(self._tree.query_ball_point([float(x), float(y)], radius_km * 1000.0)),
+                         dtype="int64")
+        distance = np.hypot(self.cell_xy[cells, 0] - x, self.cell_xy[cells, 1] - y)
+        return self._series(cells, "cell", distance=distance)
+
+    def polygon(self, lons, lats):
+        # cells whose centre lies inside the lon/lat polygon: (cell, year)
+        from matplotlib.path import Path
+        px, py = lonlat_to_xy(lons, lats)
+        box = ((self.cell_xy[:, 0] >= px.min()) & (self.cell_xy[:, 0] <= px.max())
+               & (self.cell_xy[:, 1] >= py.min()) & (self.cell_xy[:, 1] <= py.max()))
+        candidates = np.flatnonzero(box)
+        inside = Path(np.column_stack([px, py])).contains_points(self.cell_xy[candidates])
+        return self._series(candidates[inside], "cell")
+
+    def _series(self, cells, dim, **coords):
+        cells = np.asarray(cells, dtype="int64")
+        ok = cells >= 0
+        data = {}
+        for name in FIELDS:
+            values = np.full((len(cells), len(self.years)), np.nan)
+            values[ok] = self.cube[name][cells[ok]]
+            data[name] = ((dim, "year"), values)
+        rows, cols = np.divmod(cells, self.shape[1])
+        x = np.where(ok, self.cell_xy[np.maximum(cells, 0), 0], np.nan)
+        y = np.where(ok, self.cell_xy[np.maximum(cells, 0), 1], np.nan)
+        all_coords = {"year": self.years, "row": (dim, np.where(ok, rows, -1)), "col": (dim, np.where(ok, cols, -1)),
+                      "x": (dim, x), "y": (dim, y)}
+        all_coords.update({k: (dim, np.asarray(v)) for k, v in coords.items()})
+        return xr.Dataset(data, coords=all_coords)
+
+
+if __name__ == "__main__":
+    index = PhaseIndex.from_phase_dir()
+    palmer = index.nearest(-64.05, -64.77)  # Palmer Station
+    print(f"🔹 Palmer Station: nearest cell with data at {float(palmer.distance[0]) / 1000:.0f} km")
+    for year, retreat in zip(palmer.year.values, palmer.retreat.values[0]):
+        print(f"   {year}: retreat DOY {retreat:.0f}")
@@ -0,0 +1,304 @@
+import calendar
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from backend import detect_season_lazy, start_backend
+from bitpack import detect_season_bits, open_cache
+from detect import MAX_GAP_DAYS, QUALITY_FLAGS, detect_season
+from paths import ROOT, SMMR_MERGED_FILE
+from sic_codes import VALID_MAX, code_array, encode_sic, open_sic_codes
+
+# Golden-output regression and performance harness for the 2015 SMMR season. A fixed
+# 48 x 48 tile of uint8 SIC codes (cropped from the merged record when it is available,
+# otherwise a seeded synthetic season with land, missing days and dropouts) is stored
+# with the golden outputs. The golden DOY maps come from the original per-pixel
+# rolling-window detector (reference_season, the loop of the old
+# advance_retreat_smmr_test_2015.py) and the golden diagnostics from a per-pixel loop
+# over the same series (reference_diagnostics), so every engine is checked against the
+# slow definition rather than against itself:
+#   numpy     detect.detect_season
+#   dask      backend.detect_season_lazy, synchronous scheduler, 4 spatial chunks
+#   bitpack   bitpack.detect_season_bits from the exceedance cache
+# DOY maps and the integer diagnostics must match exactly; any mismatch fails the run
+# (exit 1). Runtime (best of REPEATS) and tracemalloc peak memory are compared with the
+# committed baseline and appended to the history CSV. Going past the tolerances fails
+# only when the baseline was recorded on this machine and numpy version; elsewhere the
+# comparison is printed as advisory. The history CSV is a local log and is not committed.
+
+# === CONFIG === #
+REGRESSION_DIR = os.path.join(ROOT, "results/regression/")
+SIC_FILE = SMMR_MERGED_FILE
+CONC_VAR = "N07_ICECON"
+SIC_SCALE = 1.0  # legacy float files only
+YEAR = 2015
+THRESHOLD = 15  # percent code
+WINDOW = 5
+TILE = {"y": slice(40, 88), "x": slice(100, 148)}  # Weddell Sea ice edge on the 25 km grid
+ENGINES = ("numpy", "dask", "bitpack")
+DIAGNOSTIC_FIELDS = ("advance_crossings", "retreat_crossings", "advance_run", "retreat_run", "ice_days",
+                     "quality_flag")
+REPEATS = 5
+TIME_TOLERANCE = 0.5  # fail when slower than baseline * (1 + TIME_TOLERANCE)
+MEMORY_TOLERANCE = 0.2
+UPDATE_GOLDEN = False  # rebuild the fixture and golden outputs (reference detector, slow)
+UPDATE_BASELINE = False  # store this run's timings as the new baseline
+
+FIXTURE_FILE = os.path.join(REGRESSION_DIR, f"sic_fixture_SMMR_{YEAR}.nc")
+GOLDEN_FILE = os.path.join(REGRESSION_DIR, f"golden_phases_SMMR_{YEAR}.nc")
+BASELINE_FILE = os.path.join(REGRESSION_DIR, f"baseline_SMMR_{YEAR}.json")
+HISTORY_FILE = os.path.join(REGRESSION_DIR, f"history_SMMR_{YEAR}.csv")
+
+
+# === FIXTURE === #
+def synthetic_season(year=YEAR, shape=(48, 48), seed=YEAR):
+    # daily 0-1 SIC for Feb year .. Feb year+1: seasonal cycle with an ice edge across
+    # the tile, noise, land in one corner, all-missing days and pixel dropouts
+    rng = np.random.default_rng(seed)
+    feb_end = 29 if calendar.isleap(year + 1) else 28
+    time = pd.date_range(f"{year}-02-01", f"{year + 1}-02-{feb_end}", freq="D")
+    ny, nx = shape
+    doy = time.dayofyear.values[:, None, None]
+    edge = np.linspace(-0.6, 0.4, ny)[None, :, None] + np.linspace(-0.1, 0.1, nx)[None, None, :]
+    cycle = np.sin(2 * np.pi * (doy - 100) / 365.25)
+    sic = np.clip(0.55 + 0.6 * cycle + edge + rng.normal(0, 0.08, (len(time), ny, nx)), 0, 1)
+    sic[rng.random(sic.shape) < 0.02] = np.nan  # dropouts
+    sic[rng.choice(len(time), 6, replace=False)] = np.nan  # missing days
+    sic[:, :6, :10] = 1.2  # land
+    coords = {"time": time, "y": 4337500 - 25000.0 * np.arange(TILE["y"].start, TILE["y"].start + ny),
+              "x": -3937500 + 25000.0 * np.arange(TILE["x"].start, TILE["x"].start + nx)}
+    return xr.DataArray(sic.astype("float32"), dims=("time", "y", "x"), coords=coords, name=CONC_VAR)
+
+
+def build_fixture(path=FIXTURE_FILE, sic_file=SIC_FILE, year=YEAR):
+    if os.path.exists(sic_file):
+        codes = open_sic_codes(sic_file, CONC_VAR, SIC_SCALE).isel(**TILE)
+        codes = codes.sel(time=slice(f"{year}-02-01", f"{year + 1}-03-01")).load()
+        if codes.sizes["time"] < 60:
+            raise RuntimeError(f"❌ {sic_file} has no {year} season to build the fixture from")
+        source = f"{os.path.basename(sic_file)} tile {TILE}"
+    else:
+        sic = synthetic_season(year)
+        codes = code_array(encode_sic(sic.values), sic)
+        source = f"synthetic (seed {year})"
+    ds = codes.to_dataset(name=CONC_VAR)
+    ds.attrs["source"] = source
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    ds.to_netcdf(path, encoding={CONC_VAR: {"zlib": True}})
+    print(f"✅ Saved fixture {path} ({source})")
+
+
+def season(codes, year=YEAR):
+    # retreat / advance windows as advance_retreat_smmr.py
+    feb_end = 29 if calendar.isleap(year + 1) else 28
+    rt = codes.sel(time=slice(f"{year}-08-15", f"{year + 1}-02-{feb_end}"))
+    ad = codes.sel(time=slice(f"{year}-02-01", f"{year}-09-15"))
+    rt = rt.isel(time=((rt.time.dt.dayofyear >= 227) | (rt.time.dt.dayofyear <= 60)).values)
+    ad = ad.isel(time=((ad.time.dt.dayofyear >= 30) & (ad.time.dt.dayofyear <= 260)).values)
+    return rt, ad
+
+
+# === REFERENCE === #
+def find_first_event(data, threshold, window, above=True):
+    condition = data > threshold if above else data < threshold
+    rolling = condition.rolling(time=window).construct("window")
+    hits = rolling.all("window")
+    if not hits.any():
+        return np.nan
+    return int(hits.argmax("time").item())
+
+
+def _run_at(condition, idx):
+    # length of the run of True holding record idx, and whether it starts on record 0
+    start, end = idx, idx
+    while start > 0 and condition[start - 1]:
+        start -= 1
+    while end + 1 < len(condition) and condition[end + 1]:
+        end += 1
+    return end - start + 1, start == 0
+
+
+def _record_days(days):
+    # days each record stands for: spacing to the next record, the last one as the one before
+    return [days[k + 1] - days[k] if k + 1 < len(days) else (days[k] - days[k - 1] if k else 1.0)
+            for k in range(len(days))]
+
+
+def _longest_gap(values, days):
+    # longest stretch in days without a valid record, the window edges counting as valid
+    valid = [days[0] - 1] + [d for v, d in zip(values, days) if np.isfinite(v)] + [days[-1] + 1]
+    return max(b - a for a, b in zip(valid[:-1], valid[1:])) - 1
+
+
+def reference_diagnostics(ts_r, ts_a, i_rt, i_ad, threshold, rt_days, ad_days, rt_after):
+    # per-pixel crossings, event runs, ice days and quality flag on percent floats
+    r, a = ts_r.values, ts_a.values
+    out = {}
+    for name, values, condition in (("advance", a, a > threshold), ("retreat", r, r < threshold)):
+        states = [bool(c) for c, v in zip(condition, values) if np.isfinite(v)]
+        out[f"{name}_crossings"] = sum(s != p for p, s in zip(states[:-1], states[1:]))
+    flag = 0
+    if i_ad is not None:
+        out["advance_run"], at_start = _run_at(a > threshold, i_ad)
+        flag |= QUALITY_FLAGS["advance_at_start"] if at_start else 0
+    if i_rt is not None:
+        out["retreat_run"], at_start = _run_at(r < threshold, i_rt)
+        flag |= QUALITY_FLAGS["retreat_at_start"] if at_start else 0
+    flag |= QUALITY_FLAGS["advance_gap"] if _longest_gap(a, ad_days) > MAX_GAP_DAYS else 0
+    flag |= QUALITY_FLAGS["retreat_gap"] if _longest_gap(r, rt_days) > MAX_GAP_DAYS else 0
+    out["quality_flag"] = flag
+    ice = sum(w for v, w in zip(a, _record_days(ad_days)) if v > threshold)
+    r_after = [v for v, keep in zip(r, rt_after) if keep]
+    days_after = [d for d, keep in zip(rt_days, rt_after) if keep]
+    out["ice_days"] = ice + sum(w for v, w in zip(r_after, _record_days(days_after)) if v > threshold)
+    return out
+
+
+def reference_season(rt, ad, threshold=THRESHOLD, window=WINDOW):
+    # the per-pixel xarray loop the engines replaced, on SIC percent with NaN flags
+    rt = rt.where(rt <= VALID_MAX).astype("float32")
+    ad = ad.where(ad <= VALID_MAX).astype("float32")
+    ny, nx = ad.shape[1:]
+    origin = pd.Timestamp(ad.time.values[0])
+    rt_days = list((pd.DatetimeIndex(rt.time.values) - origin).days.astype(float))
+    ad_days = list((pd.DatetimeIndex(ad.time.values) - origin).days.astype(float))
+    next_origin = (origin + pd.DateOffset(years=1) - origin).days
+    rt_after = [ad_days[-1] < d < next_origin for d in rt_days]  # one year from the advance start
+    out = {name: np.full((ny, nx), np.nan) for name in ("advance", "retreat") + DIAGNOSTIC_FIELDS}
+    for j in range(ny):
+        for i in range(nx):
+            ts_r, ts_a = rt[:, j, i], ad[:, j, i]
+            if ts_r.isnull().all() and ts_a.isnull().all():
+                continue
+            i_rt = i_ad = None
+            if (ts_r > threshold).any():
+                idx = find_first_event(ts_r, threshold, window, above=False)
+                if not np.isnan(idx):
+                    out["retreat"][j, i] = ts_r.time[idx].dt.dayofyear.item()
+                    i_rt = idx
+            if (ts_a > threshold).any():
+                idx = find_first_event(ts_a, threshold, window, above=True)
+                if not np.isnan(idx):
+                    out["advance"][j, i] = ts_a.time[idx].dt.dayofyear.item()
+                    i_ad = idx
+            diagnostics = reference_diagnostics(ts_r, ts_a, i_rt, i_ad, threshold, rt_days, ad_days, rt_after)
+            for name, value in diagnostics.items():
+                out[name][j, i] = value
+    return out
+
+
+def build_golden(path=GOLDEN_FILE, fixture=FIXTURE_FILE):
+    rt, ad = season(open_sic_codes(fixture, CONC_VAR).load())
+    print(f"🔹 Reference detector on {ad.shape[1]} x {ad.shape[2]} pixels...")
+    golden = reference_season(rt, ad)
+    ds = xr.Dataset({name: (("y", "x"), values) for name, values in golden.items()},
+                    coords={"y": ad.y.values, "x": ad.x.values})
+    ds.attrs["description"] = (f"Golden SMMR {YEAR} phase | THRESHOLD={THRESHOLD}, WINDOW={WINDOW} | DOY and "
+                               "diagnostics from the per-pixel reference loop")
+    ds.to_netcdf(path)
+    print(f"✅ Saved golden outputs {path}")
+
+
+# === ENGINES === #
+def engine_runner(name, rt, ad, workdir):
+    # zero-argument callable running one engine on the season -> {name: (y, x)}
+    if name == "numpy":
+        return lambda: detect_season(rt, ad, THRESHOLD, WINDOW, diagnostics=True)
+    if name == "dask":
+        start_backend(0)
+        chunks = {"y": -(-rt.sizes["y"] // 2), "x": -(-rt.sizes["x"] // 2)}
+        rt_lazy, ad_lazy = rt.chunk(chunks), ad.chunk(chunks)
+        return lambda: {k: v.values for k, v in detect_season_lazy(rt_lazy, ad_lazy, THRESHOLD, WINDOW,
+                                                                   diagnostics=True).compute().items()}
+    if name == "bitpack":
+        cache_sic = os.path.join(workdir, os.path.basename(FIXTURE_FILE))  # keep the cache out of the repo
+        shutil.copy(FIXTURE_FILE, cache_sic)
+        cache = open_cache(cache_sic, CONC_VAR, THRESHOLD)
+        return lambda: detect_season_bits(cache, rt["time"], ad["time"], WINDOW, diagnostics=True)
+    raise RuntimeError(f"❌ Unknown engine {name}")
+
+
+def profile(run, repeats=REPEATS):
+    # (best wall time in s, tracemalloc peak in MB, last result)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return min(times), peak, result
+
+
+def compare(result, golden):
+    # {field: mismatched pixels} for every golden field
+    return {name: int((~((result[name] == golden[name].values)
+                         | (np.isnan(result[name]) & np.isnan(golden[name].values)))).sum())
+            for name in golden.data_vars}
+
+
+# === HARNESS === #
+def run_harness(engines=ENGINES, update_golden=UPDATE_GOLDEN, update_baseline=UPDATE_BASELINE):
+    if update_golden or not os.path.exists(FIXTURE_FILE):
+        build_fixture()
+    if update_golden or not os.path.exists(GOLDEN_FILE):
+        build_golden()
+    golden = xr.open_dataset(GOLDEN_FILE).load()
+    rt, ad = season(open_sic_codes(FIXTURE_FILE, CONC_VAR).load())
+    baseline, same_env = {}, False
+    if os.path.exists(BASELINE_FILE) and not update_baseline:
+        with open(BASELINE_FILE) as f:
+            stored = json.load(f)
+        baseline = stored["engines"]
+        same_env = (stored.get("machine"), stored.get("numpy")) == (platform.platform(), np.__version__)
+        if not same_env:
+            print(f"⚠️ Baseline recorded on {stored.get('machine')} with numpy {stored.get('numpy')}; "
+                  "timings are advisory only")
+
+    rows, failed = [], False
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in engines:
+            seconds, peak, result = profile(engine_runner(name, rt, ad, workdir))
+            mismatches = compare(result, golden)
+            bad = {k: v for k, v in mismatches.items() if v}
+            row = {"date": date.today().isoformat(), "engine": name, "seconds": seconds, "peak_mb": peak,
+                   "mismatched_pixels": sum(bad.values()), "time_ratio": np.nan, "memory_ratio": np.nan}
+            status = "✅" if not bad else "❌"
+            print(f"{status} {name}: {seconds * 1e3:.1f} ms, peak {peak:.1f} MB"
+                  + (f", mismatches {bad}" if bad else ", identical to golden"))
+            failed |= bool(bad)
+            if name in baseline:
+                ref = baseline[name]
+                row["time_ratio"], row["memory_ratio"] = seconds / ref["seconds"], peak / ref["peak_mb"]
+                print(f"   vs baseline: time x{row['time_ratio']:.2f}, memory x{row['memory_ratio']:.2f}")
+                if row["time_ratio"] > 1 + TIME_TOLERANCE or row["memory_ratio"] > 1 + MEMORY_TOLERANCE:
+                    print(f"⚠️ {name} is slower or larger than the baseline beyond the tolerance")
+                    failed |= same_env
+            rows.append(row)
+
+    history = pd.DataFrame(rows)
+    history.to_csv(HISTORY_FILE, mode="a", header=not os.path.exists(HISTORY_FILE), index=False)
+    if update_baseline or not os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "w") as f:
+            json.dump({"created": date.today().isoformat(), "machine": platform.platform(),
+                       "python": platform.python_version(), "numpy": np.__version__,
+                       "engines": {r["engine"]: {"seconds": r["seconds"], "peak_mb": r["peak_mb"]} for r in rows}},
+                      f, indent=2)
+        print(f"✅ Saved baseline {BASELINE_FILE}")
+    return not failed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_harness() else 1)
@@ -0,0 +1,91 @@
+import numpy as np
+import xarray as xr
+from xarray.backends import BackendArray
+from xarray.core import indexing
+
+# Compact SIC storage: uint8 percent codes 0..100 with reserved codes for the non-ice
+# flags, a quarter of the float32 cube. The netCDF attributes carry scale_factor, so
+# a default xr.open_dataset still decodes to the 0-1 fraction (flags decode above 1,
+# where the existing "< 1.1" masks drop them); the detectors open the file with
+# mask_and_scale=False and test thresholds directly on the integer codes.
+
+VALID_MAX = 100
+POLE_HOLE = 251
+LAND = 254
+MISSING = 255
+SCALE_FACTOR = 0.01  # code -> fraction
+CODE_ATTRS = {
+    "scale_factor": SCALE_FACTOR,
+    "valid_range": np.array([0, VALID_MAX], dtype="uint8"),
+    "flag_values": np.array([POLE_HOLE, LAND, MISSING], dtype="uint8"),
+    "flag_meanings": "pole_hole land missing",
+    "units": "1",
+}
+
+
+# === ENCODE / DECODE === #
+def encode_sic(values, scale=1.0, pole_mask=None):
+    # float SIC on a 0..scale range (1 for fractions, 100 for percent) -> uint8 codes.
+    # Flag values follow the NSIDC convention (110% missing, 120% land); NaN is missing.
+    percent = np.asarray(values, dtype="float32") * (100.0 / scale)
+    codes = np.full(percent.shape, MISSING, dtype="uint8")
+    with np.errstate(invalid="ignore"):
+        valid = (percent >= 0) & (percent < 105)
+        codes[valid] = np.rint(np.minimum(percent[valid], VALID_MAX)).astype("uint8")
+        codes[(percent >= 115) & (percent < 125)] = LAND
+    if pole_mask is not None:
+        codes[np.broadcast_to(pole_mask, codes.shape)] = POLE_HOLE
+    return codes
+
+
+def decode_sic(codes):
+    # uint8 codes -> float32 fraction, NaN for every reserved code
+    codes = np.asarray(codes)
+    return np.where(codes <= VALID_MAX, codes * np.float32(SCALE_FACTOR), np.float32(np.nan)).astype("float32")
+
+
+def exceedance(codes, threshold):
+    # (above, below) masks of codes against a threshold in percent; reserved codes
+    # are neither, as NaN is in the float comparisons
+    above = (codes > threshold) & (codes <= VALID_MAX)
+    below = codes < threshold
+    return above, below
+
+
+# === FILES === #
+def code_array(codes, template, name=None):
+    # DataArray of codes shaped and labelled like template, with the code attributes
+    return xr.DataArray(codes, dims=template.dims, coords=template.coords, name=name or template.name,
+                        attrs=dict(CODE_ATTRS))
+
+
+class _LegacyCodes(BackendArray):
+    # uint8 codes of a float SIC variable, encoded slice by slice as it is indexed
+    def __init__(self, sic, scale):
+        self.sic = sic
+        self.scale = scale
+        self.shape = sic.shape
+        self.dtype = np.dtype("uint8")
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(key, self.shape, indexing.IndexingSupport.OUTER, self._encode)
+
+    def _encode(self, key):
+        return encode_sic(self.sic.variable[key].values, self.scale)
+
+
+def open_sic_codes(path, var, legacy_scale=1.0, chunks=None):
+    # SIC as uint8 codes. Float files from before the uint8 merge are encoded on the
+    # fly, so a season slice only reads its own days: through dask when chunks are
+    # given, otherwise lazily on indexing (no dask needed).
+    sic = xr.open_dataset(path, mask_and_scale=False, chunks=chunks)[var]
+    if sic.dtype == np.uint8:
+        return sic
+    sic = xr.open_dataset(path, chunks=chunks)[var]
+    if chunks is None:
+        data = indexing.LazilyIndexedArray(_LegacyCodes(sic, legacy_scale))
+        return xr.DataArray(xr.Variable(sic.dims, data, attrs=dict(CODE_ATTRS)), coords=sic.coords, name=sic.name)
+    codes = xr.apply_ufunc(encode_sic, sic, kwargs={"scale": legacy_scale}, dask="parallelized",
+                           output_dtypes=["uint8"])
+    codes.attrs = dict(CODE_ATTRS)
+    return codes
@@ -4,96 +4,101 @@ import os
 import calendar
 from tqdm import tqdm
 import gc
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from backend import detect_season_lazy, open_sic, start_backend
+from detect import QUALITY_FLAGS, circumpolar_metrics, detect_season
+from paths import ROOT, SMMR_MERGED_FILE
+from sic_codes import open_sic_codes
+from zonal import cell_areas
 
 # === CONFIGURATION === #
-INPUT_FILE = "/Users/fridaperez/Developer/repos/sea-ice-phase/data/merged/SMMR_merged_1979_06302024.nc"
-OUTPUT_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/results/SMMR_phase/"
+INPUT_FILE = SMMR_MERGED_FILE
+OUTPUT_DIR = os.path.join(ROOT, "results/SMMR_phase/")
 CONC_VAR = "N07_ICECON"
-THRESHOLD = 0.15  # SMMR is 0-1
+THRESHOLD = 15  # percent, tested on the uint8 SIC codes
+SIC_SCALE = 1.0  # legacy float files are 0-1
 WINDOW = 5
-
-# === HELPER FUNCTION === #
-def find_first_event(data, threshold, window, above=True):
-    condition = data > threshold if above else data < threshold
-    rolling = condition.rolling(time=window).construct("window")
-    hits = rolling.all("window")
-    if not hits.any():
-        return np.nan
-    return int(hits.argmax("time").item())
-
-# === LOAD DATA === #
-ds = xr.open_dataset(INPUT_FILE)
-ice = ds[CONC_VAR].astype("float32")
-ice = ice.where(ice < 1.1)  # mask land and missing
-
-all_years = np.unique(ds.time.dt.year.values)
-x, y = ds.x.size, ds.y.size
-
-# === MAIN LOOP === #
-for year in tqdm(all_years[:-1], desc="Processing SMMR phase years"):
-    next_year = year + 1
-
-    # Define windows
-    retreat_start = f"{year}-08-15"
-    retreat_end = f"{next_year}-02-29" if calendar.isleap(next_year) else f"{next_year}-02-28"
-    advance_start = f"{year}-02-01"
-    advance_end = f"{year}-09-15"
-
-    try:
-        data_retreat = ice.sel(time=slice(retreat_start, retreat_end))
-        data_advance = ice.sel(time=slice(advance_start, advance_end))
-    except KeyError:
-        continue
-
-    if data_retreat.time.size < 60 or data_advance.time.size < 60:
-        continue
-
-    doy_retreat = data_retreat.time.dt.dayofyear
-    doy_advance = data_advance.time.dt.dayofyear
-
-    advance = np.full((y, x), np.nan)
-    retreat = np.full((y, x), np.nan)
-
-    for j in range(y):
-        for i in range(x):
-            ts_r = data_retreat[:, j, i]
-            ts_a = data_advance[:, j, i]
-            if ts_r.isnull().all() and ts_a.isnull().all():
-                continue
-
-            try:
-                # --- RETREAT ---
-                rt = ts_r.where((doy_retreat >= 227) | (doy_retreat <= 60), drop=True)
-                if (rt > THRESHOLD).any():
-                    idx_rt = find_first_event(rt, THRESHOLD, WINDOW, above=False)
-                    if not np.isnan(idx_rt):
-                        retreat[j, i] = rt.time[idx_rt].dt.dayofyear.item()
-
-                # --- ADVANCE ---
-                ad = ts_a.where((doy_advance >= 30) & (doy_advance <= 260), drop=True)
-                if (ad > THRESHOLD).any():
-                    idx_ad = find_first_event(ad, THRESHOLD, WINDOW, above=True)
-                    if not np.isnan(idx_ad):
-                        advance[j, i] = ad.time[idx_ad].dt.dayofyear.item()
-
-            except Exception:
-                continue
-
-    out_ds = xr.Dataset(
-        {
-            f"advance_{year}": (("y", "x"), advance),
-            f"retreat_{year}": (("y", "x"), retreat),
-        },
-        coords={"x": ds.x, "y": ds.y},
-        attrs={
-            "description": f"SMMR Advance & Retreat | THRESHOLD={THRESHOLD}, WINDOW={WINDOW}, Year={year}"
-        }
-    )
-
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    out_file = os.path.join(OUTPUT_DIR, f"seaice_phases_SMMR_{year}.nc")
-    out_ds.to_netcdf(out_file)
-    print(f"✅ Saved {out_file}")
-
-    del advance, retreat, out_ds, data_retreat, data_advance
-    gc.collect()
+DIAGNOSTICS = True  # crossings, event run lengths, ice days and quality flag per pixel
+BACKEND = "numpy"  # "dask": spatially chunked SIC, detection per chunk on the dask scheduler
+N_WORKERS = 0  # dask only: 0 = single process, >0 = LocalCluster workers
+
+def run(input_file=INPUT_FILE, output_dir=OUTPUT_DIR, backend=BACKEND, n_workers=N_WORKERS,
+        threshold=THRESHOLD, window=WINDOW, diagnostics=DIAGNOSTICS):
+    # === LOAD DATA === #
+    ds = xr.open_dataset(input_file)
+    client = None
+    if backend == "dask":
+        client = start_backend(n_workers)
+        ice = open_sic(input_file, CONC_VAR, SIC_SCALE)
+    else:
+        ice = open_sic_codes(input_file, CONC_VAR, SIC_SCALE)  # land / missing are reserved codes
+
+    all_years = np.unique(ds.time.dt.year.values)
+    areas = cell_areas(ds.x.values, ds.y.values)
+    metrics = []
+
+    # === MAIN LOOP === #
+    for year in tqdm(all_years[:-1], desc="Processing SMMR phase years"):
+        next_year = year + 1
+
+        # Define windows
+        retreat_start = f"{year}-08-15"
+        retreat_end = f"{next_year}-02-29" if calendar.isleap(next_year) else f"{next_year}-02-28"
+        advance_start = f"{year}-02-01"
+        advance_end = f"{year}-09-15"
+
+        try:
+            data_retreat = ice.sel(time=slice(retreat_start, retreat_end))
+            data_advance = ice.sel(time=slice(advance_start, advance_end))
+        except KeyError:
+            continue
+
+        if data_retreat.time.size < 60 or data_advance.time.size < 60:
+            continue
+
+        doy_retreat = data_retreat.time.dt.dayofyear
+        doy_advance = data_advance.time.dt.dayofyear
+
+        # --- RETREAT / ADVANCE, all pixels at once ---
+        rt = data_retreat.isel(time=((doy_retreat >= 227) | (doy_retreat <= 60)).values)
+        ad = data_advance.isel(time=((doy_advance >= 30) & (doy_advance <= 260)).values)
+        if backend == "dask":
+            lazy = detect_season_lazy(rt, ad, threshold, window, metrics=True, diagnostics=diagnostics)
+            fields = {name: values.values for name, values in lazy.compute().items()}
+        else:
+            fields = detect_season(rt, ad, threshold, window, metrics=True, diagnostics=diagnostics)
+        metrics.append({"Year": year, **circumpolar_metrics(fields, areas)})
+
+        out_ds = xr.Dataset(
+            {
+                f"{name}_{year}": (("y", "x"), values) for name, values in fields.items()
+            },
+            coords={"x": ds.x, "y": ds.y},
+            attrs={
+                "description": f"SMMR Advance & Retreat | THRESHOLD={threshold}, WINDOW={window}, Year={year}",
+                "quality_flags": ", ".join(f"{k}={v}" for k, v in QUALITY_FLAGS.items()),
+            }
+        )
+
+        os.makedirs(output_dir, exist_ok=True)
+        out_file = os.path.join(output_dir, f"seaice_phases_SMMR_{year}.nc")
+        out_ds.to_netcdf(out_file)
+        print(f"✅ Saved {out_file}")
+
+        del fields, out_ds, data_retreat, data_advance, rt, ad
+        gc.collect()
+
+    # === CIRCUMPOLAR PHASE METRICS === #
+    summary_file = os.path.join(output_dir, "summary_phase_metrics_SMMR.csv")
+    pd.DataFrame(metrics).to_csv(summary_file, index=False)
+    print(f"✅ Saved {summary_file}")
+    if client is not None:
+        client.close()
+
+
+if __name__ == "__main__":  # dask workers re-import this script
+    run()
@@ -1,27 +1,42 @@
 import os
+import sys
 from datetime import datetime
-import earthaccess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from paths import SMMR_DOWNLOAD_DIR
 
 # ---- CONFIG ---- #
-TEMP_DOWNLOAD_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/data/bootstrap_smmr/test_downloads/"
-start_date = "2024-01-01"
-end_date = datetime.today().strftime("%Y-%m-%d")
-
-# ---- LOGIN ---- #
-earthaccess.login()
-
-# ---- SEARCH & DOWNLOAD ---- #
-results = earthaccess.search_data(
-    short_name="NSIDC-0079",
-    temporal=(start_date, end_date),
-    bounding_box=(-180, -90, 180, -50),
-)
-
-print(f"Found {len(results)} granules.")
-downloaded_files = earthaccess.download(results, TEMP_DOWNLOAD_DIR)
-
-# ---- FILTER & DELETE NON-SH ---- #
-for f in downloaded_files:
-    if "PS_N25km" in os.path.basename(f):  # Northern Hemisphere
-        print("❌ Deleting NH granule:", os.path.basename(f))
-        os.remove(f)
+TEMP_DOWNLOAD_DIR = SMMR_DOWNLOAD_DIR
+START_DATE = "2024-01-01"
+END_DATE = datetime.today().strftime("%Y-%m-%d")
+
+
+def download_smmr(start_date=START_DATE, end_date=END_DATE, output_dir=TEMP_DOWNLOAD_DIR):
+    import earthaccess
+
+    # ---- LOGIN ---- #
+    earthaccess.login()
+
+    # ---- SEARCH & DOWNLOAD ---- #
+    results = earthaccess.search_data(
+        short_name="NSIDC-0079",
+        temporal=(start_date, end_date),
+        bounding_box=(-180, -90, 180, -50),
+    )
+
+    print(f"Found {len(results)} granules.")
+    downloaded_files = earthaccess.download(results, output_dir)
+
+    # ---- FILTER & DELETE NON-SH ---- #
+    kept = []
+    for f in downloaded_files:
+        if "PS_N25km" in os.path.basename(f):  # Northern Hemisphere
+            print("❌ Deleting NH granule:", os.path.basename(f))
+            os.remove(f)
+        else:
+            kept.append(f)
+    return kept
+
+
+if __name__ == "__main__":
+    download_smmr()
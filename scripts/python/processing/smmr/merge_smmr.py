@@ -1,28 +1,61 @@
+import glob
+import os
+import sys
+
 import xarray as xr
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from paths import SMMR_BASE_FILE, SMMR_DOWNLOAD_DIR, SMMR_MERGED_FILE
+from sic_codes import code_array, encode_sic
+
 # ---- INPUT FILES ---- #
-base_file = "/Users/fridaperez/Developer/repos/phase_project/Stammerjohn_2008/merged_bootsstrap.nc"
-new_file = "/Users/fridaperez/Developer/repos/sea-ice-phase/data/bootstrap_smmr/merged_bootstrap_extended_SH.nc"
+BASE_FILE = SMMR_BASE_FILE
+NEW_FILE = SMMR_DOWNLOAD_DIR  # a merged NetCDF, or the directory download_smmr.py fills
 
 # ---- OUTPUT FILE ---- #
-final_merged_file = "/data/bootstrap_smmr/SMMR_merged_1979_06302024.nc"
+FINAL_MERGED_FILE = SMMR_MERGED_FILE  # advance_retreat_smmr.py input
+SIC_SCALE = 1.0  # bootstrap SIC is 0-1 (1.1 missing, 1.2 land)
+
+
+def _icecon(ds):
+    # one daily granule -> its *_ICECON field, named the same whichever satellite it came from
+    var = [v for v in ds.data_vars if v.endswith("_ICECON")][0]
+    return ds[[var]].rename({var: "SH_ICECON"})
+
+
+def open_new(new_file):
+    if not os.path.isdir(new_file):
+        return xr.open_dataset(new_file)
+    granules = sorted(glob.glob(os.path.join(new_file, "*.nc")))
+    if not granules:
+        raise RuntimeError(f"❌ No granules in {new_file}; run download_smmr.py first")
+    print(f"🔹 Concatenating {len(granules)} granules from {new_file}")
+    return xr.open_mfdataset(granules, preprocess=_icecon, combine="nested", concat_dim="time")
+
+
+def merge_smmr(base_file=BASE_FILE, new_file=NEW_FILE, final_merged_file=FINAL_MERGED_FILE):
+    # ---- LOAD ---- #
+    ds_base = xr.open_dataset(base_file)
+    ds_new = open_new(new_file)
+
+    # ---- Match variable name ---- #
+    var_base = [v for v in ds_base.data_vars if v.endswith("_ICECON")][0]
+    var_new = [v for v in ds_new.data_vars if v.endswith("_ICECON")][0]
 
-# ---- LOAD ---- #
-ds_base = xr.open_dataset(base_file)
-ds_new = xr.open_dataset(new_file)
+    if var_base != var_new:
+        print(f"⚠️ Variable names differ: {var_base} vs {var_new}. Renaming...")
+        ds_new = ds_new.rename({var_new: var_base})
 
-# ---- Match variable name ---- #
-var_base = [v for v in ds_base.data_vars if v.endswith("_ICECON")][0]
-var_new = [v for v in ds_new.data_vars if v.endswith("_ICECON")][0]
+    # ---- MERGE & SORT ---- #
+    merged = xr.concat([ds_base[var_base], ds_new[var_base]], dim="time")
+    merged = merged.sortby("time")
+    merged = code_array(encode_sic(merged.values, SIC_SCALE), merged)  # uint8 percent codes
 
-if var_base != var_new:
-    print(f"⚠️ Variable names differ: {var_base} vs {var_new}. Renaming...")
-    ds_new = ds_new.rename({var_new: var_base})
+    # ---- SAVE ---- #
+    os.makedirs(os.path.dirname(final_merged_file), exist_ok=True)
+    merged.to_dataset(name=var_base).to_netcdf(final_merged_file)
+    print(f"✅ Final merged file written to: {final_merged_file}")
 
-# ---- MERGE & SORT ---- #
-merged = xr.concat([ds_base[var_base], ds_new[var_base]], dim="time")
-merged = merged.sortby("time")
 
-# ---- SAVE ---- #
-merged.to_dataset(name=var_base).to_netcdf(final_merged_file)
-print(f"✅ Final merged file written to: {final_merged_file}")
+if __name__ == "__main__":
+    merge_smmr()
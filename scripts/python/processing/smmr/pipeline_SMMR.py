@@ -1,12 +1,16 @@
 import subprocess
 import os
+import sys
 import shutil
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from paths import ROOT, SMMR_BASE_FILE
+
 # ---- CONFIG ---- #
 SCRIPT_DIR = "/scripts/python/"
-DATA_DIR = "/Users/fridaperez/Developer/repos/sea-ice-phase/data/bootstrap_smmr/"
-PHASE_DIR = "/Users/fridaperez/Developer/repos/phase_project/Stammerjohn_2008/"
+DATA_DIR = os.path.join(ROOT, "data/bootstrap_smmr/")
+PHASE_DIR = os.path.dirname(SMMR_BASE_FILE)
 
 END_DATE = datetime.today().strftime("%Y-%m-%d")
 
@@ -1,10 +1,13 @@
+import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from scipy.ndimage import uniform_filter1d
+from paths import ROOT
 
-# Load the summary CSV exported from R
-summary_path = "/Users/fridaperez/Desktop/summary_phase_metrics.csv"
+# Circumpolar phase metrics written by the detection pass (smmr/advance_retreat_smmr.py):
+# area-weighted means of the per-pixel freeze/melt durations and event SIC slopes
+summary_path = os.path.join(ROOT, "results/SMMR_phase/summary_phase_metrics_SMMR.csv")
 summary = pd.read_csv(summary_path)
 
 # Helper function to calculate rolling mean anomalies and std deviation
@@ -44,6 +47,6 @@ plot_anomaly(filtered["Year"], filtered["Anom_Freeze_Duration_6yr"], std_freeze,
 plot_anomaly(filtered["Year"], filtered["Anom_Melt_Duration_6yr"], std_melt,
              "6-Year Mean Anomaly: Melt Duration", "Anomaly (days)", "darkorange")
 plot_anomaly(filtered["Year"], filtered["Anom_Rate_Retreat_6yr"], std_ret,
-             "6-Year Mean Anomaly: Rate of Retreat", "Anomaly (10⁶ km²/day)", "tomato")
+             "6-Year Mean Anomaly: Rate of Retreat", "Anomaly (SIC/day)", "tomato")
 plot_anomaly(filtered["Year"], filtered["Anom_Rate_Advance_6yr"], std_adv,
-             "6-Year Mean Anomaly: Rate of Advance", "Anomaly (10⁶ km²/day)", "navy")
+             "6-Year Mean Anomaly: Rate of Advance", "Anomaly (SIC/day)", "navy")
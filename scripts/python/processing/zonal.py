@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+import xarray as xr
+from pyproj import Proj
+
+from climatology import FIELDS
+from paths import ROOT
+from phase_io import load_phase_stack, season_fields
+from query import GRID_CRS, xy_to_lonlat
+
+# Regional (sector) statistics of the phase fields. The region-label raster and the
+# true cell areas are computed once from the grid; every (year, region) aggregate then
+# comes from bincount over a combined year*region key, so all sectors and seasons are
+# reduced in one pass instead of one boolean mask per sector and year.
+# Area weighting uses the real cell area: the 25 km polar stereographic cells shrink
+# away from the 70°S true-scale latitude (areal scale from the projection).
+
+# === CONFIG === #
+PHASE_DIR = os.path.join(ROOT, "results/SMMR_phase/")
+OUT_DIR = os.path.join(ROOT, "results/zonal/")
+SENSOR = "SMMR"
+
+# Standard Antarctic sectors (Parkinson & Cavalieri 2012), longitude bounds in °E
+SECTORS = {
+    "Weddell": (-60, 20),
+    "Indian": (20, 90),
+    "Pacific": (90, 160),
+    "Ross": (160, -130),
+    "Amundsen-Bellingshausen": (-130, -60),
+}
+
+
+# === GRID GEOMETRY === #
+def sector_labels(x, y, sectors=SECTORS):
+    # (y, x) int16 raster: index into sectors, -1 where no sector matches
+    gx, gy = np.meshgrid(x, y)
+    lon, _ = xy_to_lonlat(gx, gy)
+    labels = np.full(gx.shape, -1, dtype="int16")
+    for i, (west, east) in enumerate(sectors.values()):
+        if west < east:
+            inside = (lon >= west) & (lon < east)
+        else:  # crosses the dateline
+            inside = (lon >= west) | (lon < east)
+        labels[inside & (labels < 0)] = i
+    return labels
+
+
+def cell_areas(x, y):
+    # (y, x) true cell area in km²: nominal dx*dy divided by the projection's areal scale
+    gx, gy = np.meshgrid(x, y)
+    lon, lat = xy_to_lonlat(gx, gy)
+    nominal = abs(x[1] - x[0]) * abs(y[1] - y[0]) / 1e6
+    return nominal / Proj(GRID_CRS).get_factors(lon, lat).areal_scale
+
+
+# === ZONAL REDUCTION === #
+def zonal_stats(cube, labels, areas, n_regions):
+    # cube: (year, y, x). Returns (year, region) arrays of the area-weighted mean, std,
+    # median and the valid area (km²), from one bincount pass over all cells.
+    n_years = cube.shape[0]
+    values = cube.reshape(n_years, -1)
+    labels = np.broadcast_to(labels.ravel(), values.shape)
+    weights = np.broadcast_to(areas.ravel(), values.shape)
+    ok = np.isfinite(values) & (labels >= 0)
+
+    key = (np.arange(n_years)[:, None] * n_regions + labels)[ok]
+    v, w = values[ok], weights[ok]
+    n_groups = n_years * n_regions
+
+    area = np.bincount(key, weights=w, minlength=n_groups)
+    sum_wv = np.bincount(key, weights=w * v, minlength=n_groups)
+    sum_wv2 = np.bincount(key, weights=w * v * v, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sum_wv / area
+        std = np.sqrt(np.maximum(sum_wv2 / area - mean ** 2, 0))
+
+    # weighted median: sort by (group, value) once, first value whose cumulative weight
+    # reaches half of its group's area
+    order = np.lexsort((v, key))
+    cum_w = np.cumsum(w[order])
+    group_start = np.concatenate([[0.0], np.cumsum(area)[:-1]])
+    median = np.full(n_groups, np.nan)
+    filled = area > 0
+    pos = np.searchsorted(cum_w, group_start[filled] + area[filled] / 2, side="left")
+    median[filled] = v[order][np.minimum(pos, len(v) - 1)]
+
+    shape = (n_years, n_regions)
+    mean[~filled] = np.nan
+    std[~filled] = np.nan
+    return {"mean": mean.reshape(shape), "std": std.reshape(shape),
+            "median": median.reshape(shape), "valid_area": area.reshape(shape)}
+
+
+def regional_phase_stats(fields, sectors=SECTORS, circumpolar=True):
+    # fields: {name: (year, y, x) DataArray}; Dataset with {field}_{stat}(year, region)
+    template = fields[FIELDS[0]]
+    labels = sector_labels(template.x.values, template.y.values, sectors)
+    areas = cell_areas(template.x.values, template.y.values)
+    regions = list(sectors)
+    if circumpolar:
+        regions.append("Circumpolar")
+
+    data = {}
+    for name in FIELDS:
+        cube = fields[name].transpose("year", "y", "x").values
+        stats = zonal_stats(cube, labels, areas, len(sectors))
+        if circumpolar:
+            total = zonal_stats(cube, np.zeros_like(labels), areas, 1)
+            stats = {k: np.concatenate([stats[k], total[k]], axis=1) for k in stats}
+        for stat, values in stats.items():
+            if stat == "valid_area":
+                data[f"{name}_valid_area"] = (("year", "region"), values, {"units": "km2"})
+            else:
+                data[f"{name}_{stat}"] = (("year", "region"), values)
+    return xr.Dataset(data, coords={"year": template["year"].values, "region": regions})
+
+
+if __name__ == "__main__":
+    advance, retreat = load_phase_stack(PHASE_DIR, SENSOR)
+    stats = regional_phase_stats(season_fields(advance, retreat))
+    stats.attrs["description"] = (f"{SENSOR} area-weighted regional phase statistics | sectors: "
+                                  + "; ".join(f"{k} {w}..{e}°E" for k, (w, e) in SECTORS.items()))
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    out_nc = os.path.join(OUT_DIR, f"zonal_phase_stats_{SENSOR}.nc")
+    out_csv = os.path.join(OUT_DIR, f"zonal_phase_stats_{SENSOR}.csv")
+    stats.to_netcdf(out_nc)
+    stats.to_dataframe().reset_index().to_csv(out_csv, index=False)
+    print(f"✅ Saved {out_nc}")
+    print(f"✅ Saved {out_csv}")
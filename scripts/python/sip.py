@@ -0,0 +1,214 @@
+import argparse
+import importlib
+import os
+import runpy
+import sys
+import time
+
+# Single entry point for the sea-ice-phase pipeline:
+#
+#   python scripts/python/sip.py [--root DIR] [--config sip.toml] <command> ...
+#
+#   ingest  {smmr,amsre}   download granules (and convert AMSR-E HE5 to daily NetCDF)
+#   merge   {smmr,amsre}   merge the daily / yearly SIC into one uint8-coded record
+#   detect  {smmr,amsre}   advance / retreat phases per season
+#   trends  [--sensor]     lazy climatology + trend products from the phase files
+#   cluster NAME           run a cluster/ script
+#   figures NAME... | --list
+#
+# Only the standard library is imported here. Each command imports its pipeline module
+# inside the handler, so `detect` never loads cartopy / sklearn / matplotlib, and cron jobs
+# pay for xarray and nothing else. Paths default to the module CONFIG blocks, which are
+# built from paths.ROOT; --root (or root = "..." in the config file) sets
+# SEA_ICE_PHASE_ROOT before any of them is imported. Every other option can also be set
+# in a config-file section named after the command, e.g.
+#
+#   root = "/user/geog/falejandraperez/sea-ice-phase"
+#   [detect]
+#   backend = "dask"
+#   workers = 8
+#
+# Options given on the command line win over the config file, which wins over the
+# module defaults.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROCESSING_DIR = os.path.join(HERE, "processing")
+CLUSTER_DIR = os.path.join(HERE, "cluster")
+PLOTTING_DIR = os.path.join(HERE, "plotting")
+SENSORS = ("smmr", "amsre")
+
+
+# === HELPERS === #
+def _import(name, subdir=""):
+    # pipeline module from processing/ (or processing/<subdir>/), imported on demand
+    for path in (PROCESSING_DIR, os.path.join(PROCESSING_DIR, subdir)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return importlib.import_module(name)
+
+
+def _given(args, **names):
+    # keyword arguments for the options actually set; the rest keep the module defaults
+    return {kw: getattr(args, dest) for kw, dest in names.items() if getattr(args, dest) is not None}
+
+
+def _scripts(directory):
+    return sorted(f[:-3] for f in os.listdir(directory) if f.endswith(".py"))
+
+
+def _run_script(directory, name):
+    # run a cluster / plotting script as `python <script>` would
+    path = os.path.join(directory, f"{name}.py")
+    if not os.path.exists(path):
+        raise RuntimeError(f"❌ No such script: {path}")
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    argv = sys.argv
+    sys.argv = [path]
+    try:
+        print(f"🔹 Running {os.path.relpath(path, HERE)}")
+        runpy.run_path(path, run_name="__main__")
+    finally:
+        sys.argv = argv
+
+
+# === COMMANDS === #
+def cmd_ingest(args):
+    if args.sensor == "smmr":
+        module = _import("download_smmr", "smmr")
+        module.download_smmr(**_given(args, start_date="start", end_date="end", output_dir="raw_dir"))
+        return
+    if args.download:
+        module = _import("download_amsre", "amsre")
+        module.download_amsre(**_given(args, start_date="start", end_date="end", output_dir="raw_dir"))
+    module = _import("convert_amsre", "amsre")
+    module.convert_amsre(**_given(args, raw_dir="raw_dir", out_dir="daily_dir"))
+
+
+def cmd_merge(args):
+    if args.sensor == "smmr":
+        module = _import("merge_smmr", "smmr")
+        module.merge_smmr(**_given(args, base_file="base", new_file="new", final_merged_file="out"))
+    else:
+        module = _import("merge_amsre", "amsre")
+        module.merge_amsre(**_given(args, daily_dir="daily_dir", merged_file="out"))
+
+
+def cmd_detect(args):
+    module = _import(f"advance_retreat_{args.sensor}", args.sensor)
+    module.run(**_given(args, input_file="input", output_dir="output_dir", backend="backend",
+                        n_workers="workers", threshold="threshold", window="window",
+                        diagnostics="diagnostics"))
+
+
+def cmd_trends(args):
+    module = _import("backend")
+    module.write_products(**_given(args, phase_dir="phase_dir", out_file="out", sensor="sensor",
+                                   n_workers="workers"))
+
+
+def cmd_cluster(args):
+    _run_script(CLUSTER_DIR, args.name)
+
+
+def cmd_figures(args):
+    if args.list or not args.names:
+        print("\n".join(_scripts(PLOTTING_DIR)))
+        return
+    for name in args.names:
+        _run_script(PLOTTING_DIR, name)
+
+
+# === PARSER === #
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sip", description="Antarctic sea-ice phase pipeline")
+    parser.add_argument("--root", help="sea-ice-phase tree holding data/ and results/ (SEA_ICE_PHASE_ROOT)")
+    parser.add_argument("--config", help="TOML file: root plus one [section] of options per command")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("ingest", help="download raw granules (AMSR-E: and convert to daily NetCDF)")
+    p.add_argument("sensor", choices=SENSORS)
+    p.add_argument("--start", help="first date, YYYY-MM-DD")
+    p.add_argument("--end", help="last date, YYYY-MM-DD (default: today)")
+    p.add_argument("--raw-dir", help="download directory")
+    p.add_argument("--daily-dir", help="AMSR-E: converted daily NetCDF directory")
+    p.add_argument("--no-download", dest="download", action="store_false",
+                   help="AMSR-E: only convert the granules already in --raw-dir")
+    p.set_defaults(func=cmd_ingest)
+
+    p = commands.add_parser("merge", help="merge SIC into a single uint8-coded record")
+    p.add_argument("sensor", choices=SENSORS)
+    p.add_argument("--base", help="SMMR: historical bootstrap record")
+    p.add_argument("--new", help="SMMR: recent bootstrap record, or granule directory, to append")
+    p.add_argument("--daily-dir", help="AMSR-E: daily NetCDF directory")
+    p.add_argument("--out", help="merged output file")
+    p.set_defaults(func=cmd_merge)
+
+    p = commands.add_parser("detect", help="advance / retreat detection per season")
+    p.add_argument("sensor", choices=SENSORS)
+    p.add_argument("--input", help="merged SIC file")
+    p.add_argument("--output-dir", help="phase output directory")
+    p.add_argument("--backend", choices=("numpy", "dask"))
+    p.add_argument("--workers", type=int, help="dask LocalCluster workers (0 = in-process)")
+    p.add_argument("--threshold", type=int, help="SIC threshold, percent")
+    p.add_argument("--window", type=int, help="consecutive days required")
+    p.add_argument("--no-diagnostics", dest="diagnostics", action="store_const", const=False,
+                   help="skip crossings / run lengths / ice days / quality flag")
+    p.set_defaults(func=cmd_detect)
+
+    p = commands.add_parser("trends", help="phase climatology and trend products (dask backend)")
+    p.add_argument("--sensor", type=str.upper, help="SMMR or AMSRE")
+    p.add_argument("--phase-dir",
+                   help="directory of seaice_phases_<SENSOR>_<year>.nc (default results/<SENSOR>_phase/)")
+    p.add_argument("--out", help="output NetCDF (default results/climatology/phase_products_lazy_<SENSOR>.nc)")
+    p.add_argument("--workers", type=int, help="dask LocalCluster workers (0 = in-process)")
+    p.set_defaults(func=cmd_trends)
+
+    p = commands.add_parser("cluster", help="run a cluster/ script")
+    p.add_argument("name", choices=_scripts(CLUSTER_DIR))
+    p.set_defaults(func=cmd_cluster)
+
+    p = commands.add_parser("figures", help="run plotting/ scripts")
+    p.add_argument("names", nargs="*", metavar="NAME")
+    p.add_argument("--list", action="store_true", help="list the plotting scripts")
+    p.set_defaults(func=cmd_figures)
+    return parser, commands
+
+
+def load_config(path, parser, commands):
+    # root -> parser default; [command] sections -> that subparser's defaults
+    import tomllib
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+    if "root" in config:
+        parser.set_defaults(root=config.pop("root"))
+    for name, section in config.items():
+        if name not in commands.choices or not isinstance(section, dict):
+            raise RuntimeError(f"❌ {path}: unknown config section '{name}'")
+        subparser = commands.choices[name]
+        dests = {action.dest for action in subparser._actions}
+        section = {key.replace("-", "_"): value for key, value in section.items()}
+        unknown = sorted(set(section) - dests)
+        if unknown:
+            raise RuntimeError(f"❌ {path}: unknown option(s) for '{name}': {', '.join(unknown)}")
+        subparser.set_defaults(**section)
+
+
+def main(argv=None):
+    parser, commands = build_parser()
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("--config")
+    known, _ = pre.parse_known_args(argv)
+    if known.config:
+        load_config(known.config, parser, commands)
+    args = parser.parse_args(argv)
+    if args.root:
+        os.environ["SEA_ICE_PHASE_ROOT"] = os.path.abspath(os.path.expanduser(args.root))
+
+    start = time.perf_counter()
+    args.func(args)
+    print(f"✅ sip {args.command} finished in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()